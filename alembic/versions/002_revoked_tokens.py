@@ -0,0 +1,43 @@
+"""Add revoked_tokens table for access token revocation
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.String(length=64), nullable=False),
+        sa.Column("expires_at", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "revoked_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index(
+        op.f("ix_revoked_tokens_expires_at"),
+        "revoked_tokens",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_revoked_tokens_expires_at"), table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
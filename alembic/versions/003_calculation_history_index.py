@@ -0,0 +1,37 @@
+"""Add composite index for per-user calculation history
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build without locking writes on PostgreSQL; CONCURRENTLY cannot run
+    # inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_calculations_user_id_created_at_id",
+            "calculations",
+            ["user_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_calculations_user_id_created_at_id",
+            table_name="calculations",
+            postgresql_concurrently=True,
+        )
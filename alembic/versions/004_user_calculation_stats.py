@@ -0,0 +1,52 @@
+"""Add user_calculation_stats table maintained from calculations
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_calculation_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("result_sum", sa.Float(), nullable=False),
+        sa.Column("result_min", sa.Float(), nullable=True),
+        sa.Column("result_max", sa.Float(), nullable=True),
+        sa.Column("last_calculated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "type"),
+    )
+    # Seed from existing history; the application keeps it current from here
+    op.execute(
+        """
+        INSERT INTO user_calculation_stats
+            (user_id, type, count, result_sum, result_min, result_max,
+             last_calculated_at)
+        SELECT user_id, type, COUNT(*), SUM(result), MIN(result), MAX(result),
+               MAX(created_at)
+        FROM calculations
+        WHERE user_id IS NOT NULL AND result IS NOT NULL
+        GROUP BY user_id, type
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("user_calculation_stats")
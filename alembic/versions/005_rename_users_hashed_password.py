@@ -0,0 +1,71 @@
+"""Rename users.hashed_password to password_hash without locking the table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 13:00:00.000000
+
+001 created the column as hashed_password while the User model maps
+password_hash. Instead of an in-place rename, which would break whichever
+application version is not deployed yet, this expands and contracts:
+add password_hash, relax hashed_password so the application can insert
+without it, copy hashes over in resumable batches, then require
+password_hash and drop hashed_password. Databases created from the models
+already have password_hash and are left untouched.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+from app.online_migrations import (
+    add_column_online,
+    clear_checkpoint,
+    drop_column_online,
+    run_backfill,
+    set_nullable_online,
+)
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+PASSWORD_TYPE = sa.String(length=255)
+
+
+def _user_columns():
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+
+
+def _move_password_column(source: str, target: str):
+    """Expand to target, copy source into it in batches, contract source"""
+    columns = _user_columns()
+    if source not in columns:
+        return
+    if target not in columns:
+        add_column_online(op, "users", sa.Column(target, PASSWORD_TYPE, nullable=True))
+    set_nullable_online(op, "users", source, True, existing_type=PASSWORD_TYPE)
+
+    users = sa.table("users", sa.column("id"), sa.column(source), sa.column(target))
+    name = f"005_users_{target}"
+    run_backfill(
+        op,
+        name,
+        users,
+        {target: users.c[source]},
+        where=users.c[target].is_(None),
+        pause_seconds=0.05,
+    )
+
+    set_nullable_online(op, "users", target, False, existing_type=PASSWORD_TYPE)
+    drop_column_online(op, "users", source)
+    clear_checkpoint(op.get_bind(), name)
+
+
+def upgrade():
+    _move_password_column("hashed_password", "password_hash")
+
+
+def downgrade():
+    _move_password_column("password_hash", "hashed_password")
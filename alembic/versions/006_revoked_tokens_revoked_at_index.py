@@ -0,0 +1,26 @@
+"""Index revoked_tokens.revoked_at for incremental filter refreshes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+
+from alembic import op
+from app.online_migrations import create_index_online, drop_index_online
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online(
+        op, op.f("ix_revoked_tokens_revoked_at"), "revoked_tokens", ["revoked_at"]
+    )
+
+
+def downgrade():
+    drop_index_online(op, op.f("ix_revoked_tokens_revoked_at"), "revoked_tokens")
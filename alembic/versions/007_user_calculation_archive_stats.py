@@ -0,0 +1,75 @@
+"""Add user_calculation_archive_stats for archived calculations
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 15:00:00.000000
+
+Archival deletes calculations but keeps them counted in
+user_calculation_stats; this table keeps their aggregates so recomputing a
+group from the calculations table adds them back. Counts and sums of rows
+archived before this revision are seeded as the difference between the
+stats and the live table. Their min, max and latest time are only known
+where they lie outside the live rows' range, and are left NULL otherwise.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created from the models already have the table
+    if "user_calculation_archive_stats" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "user_calculation_archive_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(length=20), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("result_sum", sa.Float(), nullable=False),
+        sa.Column("result_min", sa.Float(), nullable=True),
+        sa.Column("result_max", sa.Float(), nullable=True),
+        sa.Column("last_calculated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "type"),
+    )
+    op.execute(
+        """
+        INSERT INTO user_calculation_archive_stats
+            (user_id, type, count, result_sum, result_min, result_max,
+             last_calculated_at)
+        SELECT s.user_id, s.type,
+               s.count - COALESCE(h.n, 0),
+               s.result_sum - COALESCE(h.total, 0),
+               CASE WHEN h.low IS NULL OR s.result_min < h.low
+                    THEN s.result_min END,
+               CASE WHEN h.high IS NULL OR s.result_max > h.high
+                    THEN s.result_max END,
+               CASE WHEN h.latest IS NULL OR s.last_calculated_at > h.latest
+                    THEN s.last_calculated_at END
+        FROM user_calculation_stats s
+        LEFT JOIN (
+            SELECT user_id, type, COUNT(*) AS n, SUM(result) AS total,
+                   MIN(result) AS low, MAX(result) AS high,
+                   MAX(created_at) AS latest
+            FROM calculations
+            WHERE user_id IS NOT NULL AND result IS NOT NULL
+            GROUP BY user_id, type
+        ) h ON h.user_id = s.user_id AND h.type = s.type
+        WHERE s.count > COALESCE(h.n, 0)
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("user_calculation_archive_stats")
@@ -0,0 +1,168 @@
+"""Command line entry points for maintenance jobs.
+
+Usage:
+    python -m app.cli backfill-results [--chunk-size N] [--checkpoint PATH]
+    python -m app.cli import-users FILE [--batch-size N] [--workers N]
+    python -m app.cli archive-calculations [--older-than-days N] [--archive-dir PATH]
+    python -m app.cli calibrate-bcrypt [--target-ms MS]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.archive_service import archive_calculations
+from app.services.auth_service import PasswordWorkerPool, calibrate_bcrypt_rounds
+from app.services.backfill_service import BACKFILL_CHUNK_SIZE, backfill_null_results
+from app.services.user_service import USER_IMPORT_BATCH_SIZE, create_users_bulk
+
+
+def _backfill_results(args: argparse.Namespace) -> int:
+    def progress(report):
+        print(
+            f"chunk {report.chunks}: processed={report.processed} "
+            f"updated={report.updated} failed={report.failed} "
+            f"last_id={report.last_id} ({report.rows_per_second:,.0f} rows/s)"
+        )
+
+    report = backfill_null_results(
+        SessionLocal,
+        chunk_size=args.chunk_size,
+        start_after_id=args.start_after,
+        checkpoint_path=args.checkpoint,
+        max_chunks=args.max_chunks,
+        on_progress=progress,
+    )
+    for failure in report.failures:
+        print(f"failed id={failure.id}: {failure.error}", file=sys.stderr)
+    print(
+        f"done: processed={report.processed} updated={report.updated} "
+        f"failed={report.failed} in {report.elapsed_seconds:.1f}s "
+        f"({report.rows_per_second:,.0f} rows/s)"
+    )
+    return 0
+
+
+def _read_user_records(path: str) -> Iterator[dict]:
+    """Stream user records from a CSV (with a header row) or JSON Lines file"""
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _import_users(args: argparse.Namespace) -> int:
+    # Only the blocking map() is used, so queue limits and timeouts don't apply
+    pool = PasswordWorkerPool(workers=args.workers, max_pending=0, timeout=0)
+    db = SessionLocal()
+    try:
+        results = create_users_bulk(
+            db,
+            _read_user_records(args.file),
+            batch_size=args.batch_size,
+            hash_pool=pool,
+        )
+    finally:
+        db.close()
+        pool.shutdown()
+
+    failed = [result for result in results if result.status != "created"]
+    for result in failed:
+        print(
+            f"record {result.index} ({result.username}): {result.error}",
+            file=sys.stderr,
+        )
+    print(f"done: created={len(results) - len(failed)} failed={len(failed)}")
+    return 1 if failed else 0
+
+
+def _archive_calculations(args: argparse.Namespace) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+    report = archive_calculations(
+        SessionLocal,
+        older_than=cutoff,
+        archive_dir=args.archive_dir,
+        chunk_size=args.chunk_size,
+        max_chunks=args.max_chunks,
+    )
+    print(
+        f"done: archived={report.archived} chunks={report.chunks} "
+        f"files={report.files} in {report.elapsed_seconds:.1f}s"
+    )
+    return 0
+
+
+def _calibrate_bcrypt(args: argparse.Namespace) -> int:
+    rounds = calibrate_bcrypt_rounds(args.target_ms / 1000)
+    print(f"BCRYPT_ROUNDS={rounds}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-results", help="Compute results for calculations stored without one"
+    )
+    backfill.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    backfill.add_argument("--start-after", type=int, default=None)
+    backfill.add_argument(
+        "--checkpoint", default=None, help="File used to resume an interrupted run"
+    )
+    backfill.add_argument("--max-chunks", type=int, default=None)
+    backfill.set_defaults(handler=_backfill_results)
+
+    import_users = commands.add_parser(
+        "import-users", help="Create users from a CSV or JSON Lines file"
+    )
+    import_users.add_argument(
+        "file", help="CSV with username,email,password columns, or .jsonl"
+    )
+    import_users.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    import_users.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes used for password hashing",
+    )
+    import_users.set_defaults(handler=_import_users)
+
+    archive = commands.add_parser(
+        "archive-calculations",
+        help="Move old calculations into compressed Parquet files",
+    )
+    archive.add_argument(
+        "--older-than-days", type=int, default=settings.archive_after_days
+    )
+    archive.add_argument("--archive-dir", default=settings.archive_dir)
+    archive.add_argument("--chunk-size", type=int, default=settings.archive_chunk_size)
+    archive.add_argument("--max-chunks", type=int, default=None)
+    archive.set_defaults(handler=_archive_calculations)
+
+    calibrate = commands.add_parser(
+        "calibrate-bcrypt",
+        help="Print the highest bcrypt cost that fits a per-hash time budget",
+    )
+    calibrate.add_argument("--target-ms", type=float, default=250.0)
+    calibrate.set_defaults(handler=_calibrate_bcrypt)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,282 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql import Select
+
+from app.config import settings
 
 load_dotenv()
 
+# Async drivers used for each sync database backend
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# INSERT constructs, by dialect name, that support ON CONFLICT clauses
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use the matching async driver"""
+    scheme, separator, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ASYNC_DRIVERS:
+        return f"{ASYNC_DRIVERS[backend]}{separator}{rest}"
+    return url
+
+
+class PoolMetrics:
+    """Counters describing how connections are checked out of a pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self, pool) -> dict:
+        """Return the counters together with the pool's live occupancy"""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "avg_wait_ms": (
+                    self.total_wait_seconds / attempts * 1000 if attempts else 0.0
+                ),
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout and counts checkouts that hit pool_timeout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, pool_class=InstrumentedQueuePool) -> dict:
+    """Build create_engine keyword arguments from the pool settings"""
+    options = {"echo": settings.db_echo}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (
+        None,
+        "",
+        ":memory:",
+    ):
+        # In-memory SQLite uses a single shared connection, not a queue pool
+        return options
+    options.update(
+        poolclass=pool_class,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+
+def sqlite_pragmas() -> Dict[str, Union[int, str]]:
+    """
+    PRAGMAs of the SQLite performance profile, built from the settings.
+
+    WAL journaling lets readers run alongside the single writer, and with WAL
+    synchronous=NORMAL only syncs at checkpoints, which stays crash-safe
+    (the last commits may be lost on power failure, never corrupted).
+    busy_timeout makes a writer wait for the lock instead of failing with
+    "database is locked", and mmap, a larger page cache and in-memory temp
+    tables cut syscalls and disk I/O for reads and sorts.
+    """
+    return {
+        "journal_mode": "WAL",
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        # Negative values are KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "temp_store": "MEMORY",
+    }
+
+
+def configure_sqlite(engine: Union[Engine, AsyncEngine]) -> bool:
+    """
+    Apply the SQLite profile to every new connection of an engine.
+
+    Does nothing for other databases or when SQLITE_PROFILE is off.
+
+    Returns:
+        bool: Whether the profile was installed
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not settings.sqlite_profile or sync_engine.dialect.name != "sqlite":
+        return False
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return True
+
+
+def pool_metrics(engine) -> Optional[dict]:
+    """Return checkout metrics for an engine, or None if it is not instrumented"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    if not isinstance(pool, _InstrumentedPoolMixin):
+        return None
+    return pool.metrics.snapshot(pool)
+
+
+class RoutingSession(Session):
+    """
+    Session that can send reads to a read replica.
+
+    Statements go to the session's primary bind unless they are plain
+    SELECTs issued inside ``replica_reads``. Once the session has written
+    anything, every later statement uses the primary as well, so a request
+    always reads its own writes.
+    """
+
+    def __init__(self, *args, replica_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica_bind is not None:
+            if self._flushing or (
+                clause is not None
+                and not (isinstance(clause, Select) and clause._for_update_arg is None)
+            ):
+                # Writes and locking reads pin the session to the primary
+                self.info["wrote_to_primary"] = True
+            elif (
+                clause is not None
+                and self.info.get("replica_reads")
+                and not self.info.get("wrote_to_primary")
+            ):
+                return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@contextmanager
+def replica_reads(db) -> Iterator[None]:
+    """
+    Let SELECTs issued by db inside the block use the read replica.
+
+    Has no effect without a configured replica or after the session wrote.
+
+    Args:
+        db: Session or AsyncSession created from a routing session factory
+    """
+    previous = db.info.get("replica_reads", False)
+    db.info["replica_reads"] = True
+    try:
+        yield
+    finally:
+        db.info["replica_reads"] = previous
+
+
 # Database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./calculation_app.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+DATABASE_REPLICA_URL = settings.database_replica_url
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,  # Set to False in production
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+replica_engine = (
+    create_engine(DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL))
+    if DATABASE_REPLICA_URL
+    else None
 )
+configure_sqlite(engine)
+if replica_engine is not None:
+    configure_sqlite(replica_engine)
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replica_bind=replica_engine,
+)
+
+# Async engine and session factory for event-loop native request handling.
+# Attributes are kept after commit because async sessions cannot lazy-load.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+)
+async_replica_engine = (
+    create_async_engine(
+        to_async_url(DATABASE_REPLICA_URL),
+        **engine_options(DATABASE_REPLICA_URL, InstrumentedAsyncAdaptedQueuePool),
+    )
+    if DATABASE_REPLICA_URL
+    else None
+)
+configure_sqlite(async_engine)
+if async_replica_engine is not None:
+    configure_sqlite(async_replica_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    replica_bind=async_replica_engine.sync_engine if async_replica_engine else None,
+)
 
 # Create Base class
 Base = declarative_base()
@@ -32,9 +292,31 @@ def get_db():
         db.close()
 
 
+# Async dependency to get DB session
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for work that outlives the request, e.g. background tasks
+
+
+def get_session_factory():
+    return SessionLocal
+
+
 # Test database setup
 TEST_DATABASE_URL = os.getenv(
     "TEST_DATABASE_URL", "sqlite:///./test_calculation_app.db"
 )
 test_engine = create_engine(TEST_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+async_test_engine = create_async_engine(to_async_url(TEST_DATABASE_URL))
+# Tests run under the same connection profile as the application
+configure_sqlite(test_engine)
+configure_sqlite(async_test_engine)
+AsyncTestingSessionLocal = async_sessionmaker(
+    async_test_engine, autoflush=False, expire_on_commit=False
+)
@@ -1,5 +1,16 @@
 # Models package initialization
 from app.models.calculation_model import Calculation  # noqa: F401
+from app.models.calculation_stats_model import (  # noqa: F401
+    UserCalculationArchiveStats,
+    UserCalculationStats,
+)
+from app.models.revoked_token_model import RevokedToken  # noqa: F401
 from app.models.user_model import User  # noqa: F401
 
-__all__ = ["Calculation", "User"]
+__all__ = [
+    "Calculation",
+    "RevokedToken",
+    "User",
+    "UserCalculationArchiveStats",
+    "UserCalculationStats",
+]
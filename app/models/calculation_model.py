@@ -1,12 +1,17 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.database import Base
+from app.services.calculation_factory import CalculationFactory
 
 
 class Calculation(Base):
     __tablename__ = "calculations"
+    __table_args__ = (
+        # Serves keyset-paginated per-user history, newest first
+        Index("ix_calculations_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     a = Column(Float, nullable=False)
@@ -28,18 +33,7 @@ class Calculation(Base):
 
     def calculate_result(self):
         """Calculate and return the result based on operation type"""
-        if self.type == "Add":
-            return self.a + self.b
-        elif self.type == "Sub":
-            return self.a - self.b
-        elif self.type == "Multiply":
-            return self.a * self.b
-        elif self.type == "Divide":
-            if self.b == 0:
-                raise ValueError("Division by zero is not allowed")
-            return self.a / self.b
-        else:
-            raise ValueError(f"Unsupported operation type: {self.type}")
+        return CalculationFactory.get_operation(self.type).calculate(self.a, self.b)
 
     def save_result(self):
         """Calculate and store the result in the database"""
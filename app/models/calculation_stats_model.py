@@ -0,0 +1,53 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+
+from app.database import Base
+
+
+class UserCalculationStats(Base):
+    """Per-user, per-operation aggregates of stored calculation results.
+
+    Rows are maintained incrementally by app.services.calculation_stats as
+    calculations are written, so reads never aggregate the history itself.
+    Only calculations with an owner and a stored result are counted.
+    """
+
+    __tablename__ = "user_calculation_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    result_sum = Column(Float, nullable=False, default=0.0)
+    result_min = Column(Float, nullable=True)
+    result_max = Column(Float, nullable=True)
+    last_calculated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<UserCalculationStats(user_id={self.user_id}, type='{self.type}', "
+            f"count={self.count})>"
+        )
+
+
+class UserCalculationArchiveStats(Base):
+    """Aggregates of calculations moved out of the table into the archive.
+
+    Archival deletes rows without updating user_calculation_stats, so they
+    stay counted there. Their contribution is kept here as well, so a
+    re-aggregation from the calculations table can add it back in.
+    """
+
+    __tablename__ = "user_calculation_archive_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    result_sum = Column(Float, nullable=False, default=0.0)
+    result_min = Column(Float, nullable=True)
+    result_max = Column(Float, nullable=True)
+    last_calculated_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<UserCalculationArchiveStats(user_id={self.user_id}, "
+            f"type='{self.type}', count={self.count})>"
+        )
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    # exp claim of the revoked token (Unix seconds); the row is useless after it
+    expires_at = Column(BigInteger, nullable=False, index=True)
+    # Lets other processes fetch only revocations newer than their last refresh
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}', expires_at={self.expires_at})>"
@@ -0,0 +1,374 @@
+"""
+Helpers for Alembic migrations that must not lock large tables.
+
+Plain ``op.create_index`` or a single ``UPDATE`` over ``calculations`` holds
+locks for as long as the whole table takes to process. These helpers split
+such changes into short steps instead:
+
+- index builds use CREATE/DROP INDEX CONCURRENTLY on PostgreSQL,
+- backfills update one keyset batch per transaction, pause between
+  batches and record a checkpoint so an interrupted migration resumes
+  where it stopped,
+- NOT NULL is added on PostgreSQL through a validated CHECK constraint, so
+  the table is scanned without blocking writes,
+- DDL on PostgreSQL runs with a lock_timeout, so a statement waiting behind
+  a long transaction fails fast instead of queueing every other query
+  behind it.
+
+Other dialects fall back to the plain operation (SQLite rebuilds the table
+in batch mode where it has to).
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+# Longest a DDL statement may wait for its lock on PostgreSQL
+DDL_LOCK_TIMEOUT = "5s"
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Progress of batched backfills, keyed by backfill name
+checkpoints = sa.Table(
+    "online_migration_checkpoints",
+    sa.MetaData(),
+    sa.Column("name", sa.String(100), primary_key=True),
+    sa.Column("last_key", sa.BigInteger(), nullable=True),
+    sa.Column("finished", sa.Boolean(), nullable=False, default=False),
+    sa.Column("updated_at", sa.Float(), nullable=False),
+)
+
+
+@dataclass
+class BackfillProgress:
+    """Progress of a batched backfill"""
+
+    name: str
+    last_key: Optional[int] = None
+    batches: int = 0
+    rows: int = 0
+    elapsed_seconds: float = 0.0
+    finished: bool = False
+
+    def to_dict(self) -> dict:
+        """Return the progress as a JSON-serialisable dict"""
+        return asdict(self)
+
+
+def _is_postgresql(op) -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+@contextmanager
+def lock_timeout(op, timeout: str = DDL_LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    Run the enclosed DDL outside a transaction with a short lock_timeout.
+
+    Each statement commits on its own, so locks are held for one statement
+    at a time. The timeout only applies on PostgreSQL.
+
+    Args:
+        op: Alembic operations object
+        timeout (str): PostgreSQL interval, e.g. "5s"
+    """
+    with op.get_context().autocommit_block():
+        if not _is_postgresql(op):
+            yield
+            return
+        op.execute(f"SET lock_timeout = '{timeout}'")
+        try:
+            yield
+        finally:
+            op.execute("RESET lock_timeout")
+
+
+def create_index_online(
+    op, name: str, table: str, columns: Sequence[str], **kwargs: Any
+) -> None:
+    """
+    Create an index without blocking writes to the table.
+
+    On PostgreSQL the index is built CONCURRENTLY. A concurrent build that
+    failed part way leaves an INVALID index behind; it is dropped first so a
+    rerun builds a usable one. Existing valid indexes are left alone.
+
+    Args:
+        op: Alembic operations object
+        name (str): Index name
+        table (str): Table name
+        columns (Sequence[str]): Indexed columns
+        **kwargs: Passed to op.create_index, e.g. unique=True
+    """
+    if not _is_postgresql(op):
+        op.create_index(name, table, list(columns), if_not_exists=True, **kwargs)
+        return
+    with lock_timeout(op):
+        invalid = op.get_bind().scalar(
+            sa.text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        )
+        if invalid:
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
+        op.create_index(
+            name,
+            table,
+            list(columns),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+            **kwargs,
+        )
+
+
+def drop_index_online(op, name: str, table: str) -> None:
+    """
+    Drop an index without blocking reads and writes of the table.
+
+    Args:
+        op: Alembic operations object
+        name (str): Index name
+        table (str): Table name
+    """
+    if not _is_postgresql(op):
+        op.drop_index(name, table_name=table, if_exists=True)
+        return
+    with lock_timeout(op):
+        op.drop_index(
+            name, table_name=table, postgresql_concurrently=True, if_exists=True
+        )
+
+
+def set_nullable_online(
+    op, table: str, column: str, nullable: bool, existing_type: sa.types.TypeEngine
+) -> None:
+    """
+    Add or drop a column's NOT NULL constraint with minimal locking.
+
+    On PostgreSQL, dropping NOT NULL only changes the catalog. Adding it
+    first validates a NOT VALID check constraint, which scans the table
+    without blocking writes, so SET NOT NULL can skip its own scan under
+    the exclusive lock. SQLite cannot alter columns in place and rebuilds
+    the table.
+
+    Args:
+        op: Alembic operations object
+        table (str): Table name
+        column (str): Column name
+        nullable (bool): Whether the column should accept NULL
+        existing_type: Column type, needed to rebuild SQLite tables
+    """
+    if not _is_postgresql(op):
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, existing_type=existing_type, nullable=nullable)
+        return
+    with lock_timeout(op):
+        if nullable:
+            op.alter_column(table, column, nullable=True)
+            return
+        constraint = f"{table}_{column}_not_null"
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}")
+        op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+            f"CHECK ({column} IS NOT NULL) NOT VALID"
+        )
+        op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}")
+        op.alter_column(table, column, nullable=False)
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {constraint}")
+
+
+def add_column_online(op, table: str, column: sa.Column) -> None:
+    """
+    Add a column without rewriting the table.
+
+    The column must be nullable (or have a constant default on PostgreSQL
+    11+) so adding it only changes the catalog; backfill it afterwards and
+    tighten it with set_nullable_online.
+
+    Args:
+        op: Alembic operations object
+        table (str): Table name
+        column (sa.Column): Column to add
+    """
+    if not _is_postgresql(op):
+        op.add_column(table, column)
+        return
+    with lock_timeout(op):
+        op.add_column(table, column)
+
+
+def drop_column_online(op, table: str, column: str) -> None:
+    """
+    Drop a column; on PostgreSQL this only changes the catalog.
+
+    Args:
+        op: Alembic operations object
+        table (str): Table name
+        column (str): Column name
+    """
+    if not _is_postgresql(op):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
+        return
+    with lock_timeout(op):
+        op.drop_column(table, column)
+
+
+def _autocommit(connection: Connection) -> bool:
+    return connection.get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+
+
+def _commit(connection: Connection) -> None:
+    if not _autocommit(connection) and connection.in_transaction():
+        connection.commit()
+
+
+def _load_checkpoint(connection: Connection, name: str) -> Optional[sa.Row]:
+    checkpoints.create(connection, checkfirst=True)
+    return connection.execute(
+        sa.select(checkpoints).where(checkpoints.c.name == name)
+    ).first()
+
+
+def _save_checkpoint(
+    connection: Connection, name: str, last_key: Optional[int], finished: bool
+) -> None:
+    values = {"last_key": last_key, "finished": finished, "updated_at": time.time()}
+    updated = connection.execute(
+        checkpoints.update().where(checkpoints.c.name == name).values(values)
+    )
+    if not updated.rowcount:
+        connection.execute(checkpoints.insert().values(name=name, **values))
+
+
+def clear_checkpoint(connection: Connection, name: str) -> None:
+    """
+    Forget a backfill's progress so the next run starts from the beginning.
+
+    Runs in the caller's transaction.
+
+    Args:
+        connection (Connection): Database connection
+        name (str): Backfill name
+    """
+    checkpoints.create(connection, checkfirst=True)
+    connection.execute(checkpoints.delete().where(checkpoints.c.name == name))
+
+
+def backfill_in_batches(
+    connection: Connection,
+    name: str,
+    table: sa.sql.TableClause,
+    values: Dict[str, Any],
+    where: Optional[sa.sql.ColumnElement] = None,
+    key: str = "id",
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause_seconds: float = 0.0,
+    max_batches: Optional[int] = None,
+    on_progress: Optional[Callable[[BackfillProgress], None]] = None,
+) -> BackfillProgress:
+    """
+    UPDATE a large table in short keyset batches with resumable progress.
+
+    Rows are walked in key order up to the largest key present when the run
+    starts; rows added later are expected to be written correctly by the
+    application. Each batch and its checkpoint commit together (or, on an
+    AUTOCOMMIT connection, as consecutive statements), so a rerun after an
+    interruption redoes at most one batch. The UPDATE must therefore be
+    idempotent, which ``where`` usually ensures (e.g. "target IS NULL").
+
+    The connection must either be in AUTOCOMMIT mode, as inside Alembic's
+    autocommit_block (see run_backfill), or not be part of a transaction
+    owned by someone else, because batches are committed as they finish.
+
+    Args:
+        connection (Connection): Database connection
+        name (str): Unique name of this backfill, used for its checkpoint
+        table: Table or sa.table() clause to update
+        values (Dict[str, Any]): Column values or expressions to set
+        where: Extra filter selecting the rows that still need the update
+        key (str): Integer, indexed, unique column to walk by
+        batch_size (int): Keys covered per batch
+        pause_seconds (float): Sleep between batches to leave I/O for
+            regular traffic and let replicas keep up
+        max_batches (Optional[int]): Stop after this many batches
+        on_progress: Called with the progress after every batch
+
+    Returns:
+        BackfillProgress: Where the backfill stopped and what it did
+    """
+    key_column = table.c[key]
+    stored = _load_checkpoint(connection, name)
+    progress = BackfillProgress(name=name)
+    if stored is not None:
+        progress.last_key = stored.last_key
+        progress.finished = stored.finished
+    _commit(connection)
+    if progress.finished:
+        return progress
+
+    upper = connection.scalar(sa.select(sa.func.max(key_column)))
+    started = time.perf_counter()
+    while upper is not None and (max_batches is None or progress.batches < max_batches):
+        if progress.last_key is not None and progress.last_key >= upper:
+            break
+        bounds = sa.select(key_column).order_by(key_column)
+        if progress.last_key is not None:
+            bounds = bounds.where(key_column > progress.last_key)
+        batch_end = connection.scalar(bounds.offset(batch_size - 1).limit(1))
+        batch_end = upper if batch_end is None else min(batch_end, upper)
+
+        statement = table.update().values(values).where(key_column <= batch_end)
+        if progress.last_key is not None:
+            statement = statement.where(key_column > progress.last_key)
+        if where is not None:
+            statement = statement.where(where)
+        progress.rows += connection.execute(statement).rowcount
+        progress.last_key = batch_end
+        progress.batches += 1
+        _save_checkpoint(connection, name, batch_end, finished=False)
+        _commit(connection)
+
+        progress.elapsed_seconds = time.perf_counter() - started
+        if on_progress:
+            on_progress(progress)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    if upper is None or (progress.last_key is not None and progress.last_key >= upper):
+        progress.finished = True
+        _save_checkpoint(connection, name, progress.last_key, finished=True)
+        _commit(connection)
+    progress.elapsed_seconds = time.perf_counter() - started
+    return progress
+
+
+def run_backfill(
+    op, name: str, table: sa.sql.TableClause, values: Dict[str, Any], **kwargs
+) -> BackfillProgress:
+    """
+    Run backfill_in_batches from a migration, one transaction per batch.
+
+    The migration's transaction is committed first (see Alembic's
+    autocommit_block), so the steps before the backfill stay applied if it
+    is interrupted; they should be safe to repeat.
+
+    Args:
+        op: Alembic operations object
+        name (str): Unique name of this backfill
+        table: Table or sa.table() clause to update
+        values (Dict[str, Any]): Column values or expressions to set
+        **kwargs: Passed to backfill_in_batches
+
+    Returns:
+        BackfillProgress: Where the backfill stopped and what it did
+    """
+    with op.get_context().autocommit_block():
+        return backfill_in_batches(op.get_bind(), name, table, values, **kwargs)
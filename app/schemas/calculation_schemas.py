@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
@@ -87,3 +87,53 @@ class CalculationResponse(BaseModel):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class CalculationCreated(BaseModel):
+    """Schema for a computed calculation that is stored or queued for storage"""
+
+    id: Optional[int] = None
+    a: float
+    b: float
+    type: str
+    result: float
+    user_id: Optional[int] = None
+    queued: bool = False
+
+
+class CalculationBatchItemResult(BaseModel):
+    """Schema for the outcome of a single item in a batch request"""
+
+    index: int
+    status: str  # "created" or "error"
+    id: Optional[int] = None
+    result: Optional[float] = None
+    error: Optional[str] = None
+
+
+class CalculationBatchResponse(BaseModel):
+    """Schema for the response of a batch calculation request"""
+
+    created: int
+    failed: int
+    items: List[CalculationBatchItemResult]
+
+
+class CalculationPage(BaseModel):
+    """Schema for one page of a user's calculation history"""
+
+    items: List[CalculationRead]
+    next_cursor: Optional[str] = None
+
+
+class CalculationStatsRead(BaseModel):
+    """Schema for a user's aggregated results of one operation type"""
+
+    type: str
+    count: int
+    result_sum: float
+    result_min: Optional[float]
+    result_max: Optional[float]
+    last_calculated_at: Optional[datetime]
+
+    model_config = ConfigDict(from_attributes=True)
@@ -60,3 +60,11 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+
+
+class UserImportResult(BaseModel):
+    index: int
+    username: Optional[str] = None
+    status: str  # "created" or "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
@@ -0,0 +1,6 @@
+from pydantic import ValidationError
+
+
+def validation_error_message(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into a single readable message."""
+    return "; ".join(err["msg"].removeprefix("Value error, ") for err in error.errors())
@@ -0,0 +1,293 @@
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.calculation_model import Calculation
+from app.services.calculation_stats import (
+    StatsContribution,
+    as_utc,
+    record_archived_calculations,
+)
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("a", pa.float64()),
+        ("b", pa.float64()),
+        ("type", pa.string()),
+        ("result", pa.float64()),
+        ("user_id", pa.int64()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+        ("updated_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+_COLUMNS = [Calculation.__table__.c[field.name] for field in ARCHIVE_SCHEMA]
+
+
+@dataclass
+class ArchiveReport:
+    """Outcome of an archival run"""
+
+    archived: int = 0
+    chunks: int = 0
+    files: int = 0
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        """Return the report as a JSON-serialisable dict"""
+        return asdict(self)
+
+
+def _month(value: datetime) -> str:
+    return as_utc(value).strftime("%Y-%m")
+
+
+def _user_bucket(user_id: Optional[int], bucket_size: int) -> str:
+    if user_id is None:
+        return "none"
+    return str(user_id // bucket_size * bucket_size)
+
+
+def _partition_dir(archive_dir: str, month: str, bucket: str) -> str:
+    return os.path.join(archive_dir, f"month={month}", f"user_bucket={bucket}")
+
+
+def _write_partition(path: str, rows: List[Dict[str, Any]]) -> None:
+    """Atomically write rows to a Parquet file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pylist(rows, schema=ARCHIVE_SCHEMA)
+    # Dot-prefixed, so readers of the partition skip a half-written file
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    pq.write_table(table, tmp_path, compression=settings.archive_compression)
+    os.replace(tmp_path, path)
+
+
+def _archive_chunk(
+    db: Session,
+    cutoff: datetime,
+    after_id: Optional[int],
+    chunk_size: int,
+    archive_dir: str,
+    bucket_size: int,
+    report: ArchiveReport,
+) -> Optional[int]:
+    """Archive and delete one id-ordered chunk; return its last id"""
+    query = select(*_COLUMNS).where(Calculation.created_at < cutoff)
+    if after_id is not None:
+        query = query.where(Calculation.id > after_id)
+    rows = db.execute(query.order_by(Calculation.id).limit(chunk_size)).all()
+    if not rows:
+        return None
+
+    partitions: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        record = dict(row._mapping)
+        record["created_at"] = as_utc(record["created_at"])
+        record["updated_at"] = as_utc(record["updated_at"])
+        key = (_month(record["created_at"]), _user_bucket(row.user_id, bucket_size))
+        partitions.setdefault(key, []).append(record)
+
+    # Naming files after the chunk's id range makes a rerun after a crash
+    # between writing and deleting overwrite, not duplicate, the files
+    name = f"part-{rows[0].id}-{rows[-1].id}.parquet"
+    for (month, bucket), records in partitions.items():
+        _write_partition(
+            os.path.join(_partition_dir(archive_dir, month, bucket), name), records
+        )
+
+    # Core delete: archived rows stay counted in user_calculation_stats, and
+    # their archive aggregates keep them counted when a group is recomputed
+    record_archived_calculations(
+        db,
+        [StatsContribution(r.user_id, r.type, r.result, r.created_at) for r in rows],
+    )
+    db.execute(delete(Calculation).where(Calculation.id.in_([r.id for r in rows])))
+    db.commit()
+
+    report.archived += len(rows)
+    report.chunks += 1
+    report.files += len(partitions)
+    return rows[-1].id
+
+
+def archive_calculations(
+    session_factory: Callable[[], Session],
+    older_than: Optional[datetime] = None,
+    archive_dir: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    bucket_size: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> ArchiveReport:
+    """
+    Move calculations created before a cutoff into the Parquet archive.
+
+    Rows are read in id order and written as zstd-compressed Parquet, one
+    file per chunk under ``month=YYYY-MM/user_bucket=<first user id>/``, so
+    history reads can prune by partition. They are deleted with the chunk's
+    commit; a file is always in place before its rows are deleted, so an
+    interrupted run loses nothing. Archived rows keep counting towards
+    user_calculation_stats, including after the stats are re-aggregated
+    (see record_archived_calculations).
+
+    Args:
+        session_factory: Callable returning a new database session
+        older_than (Optional[datetime]): Cutoff, defaults to
+            ARCHIVE_AFTER_DAYS before now
+        archive_dir (Optional[str]): Archive root, defaults to ARCHIVE_DIR
+        chunk_size (Optional[int]): Rows archived and deleted per transaction
+        bucket_size (Optional[int]): Width of the user id partition ranges
+        max_chunks (Optional[int]): Stop after this many chunks
+
+    Returns:
+        ArchiveReport: Rows, chunks and files written
+    """
+    if older_than is None:
+        older_than = datetime.now(timezone.utc) - timedelta(
+            days=settings.archive_after_days
+        )
+    archive_dir = archive_dir or settings.archive_dir
+    chunk_size = chunk_size or settings.archive_chunk_size
+    bucket_size = bucket_size or settings.archive_user_bucket_size
+
+    report = ArchiveReport()
+    started = time.perf_counter()
+    last_id = None
+    while max_chunks is None or report.chunks < max_chunks:
+        db = session_factory()
+        try:
+            last_id = _archive_chunk(
+                db, older_than, last_id, chunk_size, archive_dir, bucket_size, report
+            )
+        finally:
+            db.close()
+        if last_id is None:
+            break
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
+
+
+def _user_months(archive_dir: str, bucket: str) -> List[str]:
+    """Months holding files for a user bucket, newest first"""
+    if not os.path.isdir(archive_dir):
+        return []
+    months = []
+    for entry in os.listdir(archive_dir):
+        if entry.startswith("month=") and os.path.isdir(
+            _partition_dir(archive_dir, entry[6:], bucket)
+        ):
+            months.append(entry[6:])
+    return sorted(months, reverse=True)
+
+
+def read_archived_user_calculations(
+    user_id: int,
+    limit: int,
+    before: Optional[Tuple[datetime, int]] = None,
+    not_before: Optional[datetime] = None,
+    archive_dir: Optional[str] = None,
+    bucket_size: Optional[int] = None,
+) -> List[Calculation]:
+    """
+    Read a user's archived calculations, newest first.
+
+    Only the user's id bucket is opened, months after ``before`` or before
+    ``not_before`` are skipped, and reading stops at the first month that
+    completes the page.
+
+    Args:
+        user_id (int): Owner of the calculations
+        limit (int): Maximum number of rows to return
+        before (Optional[Tuple[datetime, int]]): Exclusive (created_at, id)
+            upper bound, as in a history cursor
+        not_before (Optional[datetime]): Rows older than this are not needed
+        archive_dir (Optional[str]): Archive root, defaults to ARCHIVE_DIR
+        bucket_size (Optional[int]): Width of the user id partition ranges
+
+    Returns:
+        List[Calculation]: Detached calculations rebuilt from the archive
+    """
+    archive_dir = archive_dir or settings.archive_dir
+    bucket = _user_bucket(user_id, bucket_size or settings.archive_user_bucket_size)
+    first_month = _month(before[0]) if before is not None else None
+    last_month = _month(not_before) if not_before is not None else None
+
+    rows: List[Dict[str, Any]] = []
+    for month in _user_months(archive_dir, bucket):
+        if first_month is not None and month > first_month:
+            continue
+        if last_month is not None and month < last_month:
+            break
+        table = pq.read_table(
+            _partition_dir(archive_dir, month, bucket),
+            schema=ARCHIVE_SCHEMA,
+            filters=pc.field("user_id") == user_id,
+        )
+        candidates = table.to_pylist()
+        if before is not None:
+            bound = (as_utc(before[0]), before[1])
+            candidates = [
+                row for row in candidates if (row["created_at"], row["id"]) < bound
+            ]
+        candidates.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+        rows.extend(candidates)
+        # Every older month only holds older rows
+        if len(rows) >= limit:
+            break
+    return [Calculation(**row) for row in rows[:limit]]
+
+
+def iter_archived_calculations(
+    chunk_size: int,
+    user_id: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    bucket_size: Optional[int] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream archived calculations, oldest month first.
+
+    Files are scanned batch by batch, so memory stays flat however large the
+    archive is. A user's rows are read from their id bucket only.
+
+    Args:
+        chunk_size (int): Maximum rows per yielded batch
+        user_id (Optional[int]): Only read this user's calculations
+        archive_dir (Optional[str]): Archive root, defaults to ARCHIVE_DIR
+        bucket_size (Optional[int]): Width of the user id partition ranges
+
+    Yields:
+        pa.RecordBatch: Non-empty batches with the ARCHIVE_SCHEMA columns
+    """
+    archive_dir = archive_dir or settings.archive_dir
+    if user_id is None:
+        months = sorted(
+            entry[6:]
+            for entry in (os.listdir(archive_dir) if os.path.isdir(archive_dir) else [])
+            if entry.startswith("month=")
+        )
+        paths = [os.path.join(archive_dir, f"month={month}") for month in months]
+        row_filter = None
+    else:
+        bucket = _user_bucket(user_id, bucket_size or settings.archive_user_bucket_size)
+        paths = [
+            _partition_dir(archive_dir, month, bucket)
+            for month in reversed(_user_months(archive_dir, bucket))
+        ]
+        row_filter = pc.field("user_id") == user_id
+
+    for path in paths:
+        # Dot-prefixed files still being written are ignored by the scan
+        dataset = ds.dataset(path, schema=ARCHIVE_SCHEMA, format="parquet")
+        for batch in dataset.to_batches(filter=row_filter, batch_size=chunk_size):
+            if batch.num_rows:
+                yield batch
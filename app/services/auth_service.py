@@ -1,13 +1,96 @@
+import asyncio
+import hashlib
+import itertools
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Iterable, List, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.orm import Session
 
 from app.config import settings
+from app.services.cache import CacheStats, LRUCache
+from app.services.token_revocation import revocation_list
 
 # Configure bcrypt context - simplified for compatibility
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if settings.bcrypt_rounds is not None:
+    pwd_context.update(bcrypt__rounds=settings.bcrypt_rounds)
+
+# Bounds for bcrypt cost calibration; below 10 a hash is too cheap to brute-force
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+
+
+def get_bcrypt_rounds() -> int:
+    """Return the bcrypt cost factor used for new hashes"""
+    return pwd_context.handler("bcrypt").default_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    """
+    Change the bcrypt cost factor for new hashes.
+
+    Existing hashes with a lower cost are upgraded on the next successful
+    login (see verify_and_update_password); higher-cost hashes are kept.
+
+    Args:
+        rounds (int): bcrypt cost factor (log2 of the iteration count)
+    """
+    pwd_context.update(bcrypt__rounds=rounds)
+
+
+def time_bcrypt_hash(rounds: int, samples: int = 3) -> float:
+    """Return the fastest of samples bcrypt hash timings at rounds, in seconds"""
+    handler = pwd_context.handler("bcrypt").using(rounds=rounds)
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash("calibration-password")
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_bcrypt_rounds(
+    target_seconds: float,
+    min_rounds: int = MIN_BCRYPT_ROUNDS,
+    max_rounds: int = MAX_BCRYPT_ROUNDS,
+) -> int:
+    """
+    Pick the highest bcrypt cost whose hash time fits the time budget.
+
+    Each extra round doubles the work, so the cost is extrapolated from one
+    cheap measurement and then confirmed on this machine. Run it once per
+    deployment (python -m app.cli calibrate-bcrypt) rather than in every
+    worker: workers measuring either side of a step would pick different
+    costs for the same hashes.
+
+    Args:
+        target_seconds (float): Per-hash time budget on one core
+        min_rounds (int): Lowest cost ever returned
+        max_rounds (int): Highest cost ever returned
+
+    Returns:
+        int: Cost factor to pin as BCRYPT_ROUNDS
+    """
+    # Below ~8 rounds fixed overheads dominate and skew the extrapolation
+    base_rounds = min(max(min_rounds, 8), max_rounds)
+    base_seconds = time_bcrypt_hash(base_rounds)
+    rounds = base_rounds
+    while (
+        rounds < max_rounds
+        and base_seconds * 2 ** (rounds + 1 - base_rounds) <= target_seconds
+    ):
+        rounds += 1
+    # Confirm the estimate, stepping down while the real cost misses the budget
+    while rounds > min_rounds and time_bcrypt_hash(rounds, samples=1) > target_seconds:
+        rounds -= 1
+    return rounds
 
 
 def hash_password(password: str) -> str:
@@ -23,6 +106,11 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _hash_password_with_rounds(password: str, rounds: int) -> str:
+    # Worker processes hold their own pwd_context, so the cost is passed along
+    return pwd_context.handler("bcrypt").using(rounds=rounds).hash(password)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain text password against a hashed password.
@@ -37,10 +125,209 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash uses a lower cost than new hashes.
+
+    Only upgrades count: passlib's needs_update also flags hashes above the
+    configured cost, which would downgrade them on login.
+
+    Args:
+        hashed_password (str): Stored bcrypt hash
+
+    Returns:
+        bool: True if the hash should be replaced after a successful login
+    """
+    handler = pwd_context.handler("bcrypt")
+    return handler.from_string(hashed_password).rounds < get_bcrypt_rounds()
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if the stored hash uses a lower cost.
+
+    Args:
+        plain_password (str): Plain text password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matched, and a
+        replacement hash when the stored one needs upgrading
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if not needs_rehash(hashed_password):
+        return True, None
+    return True, hash_password(plain_password)
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when too many password hashing jobs are already queued"""
+
+
+class PasswordWorkerPool:
+    """
+    Bounded process pool for CPU-heavy password hashing.
+
+    Jobs run in separate processes so bcrypt uses other cores instead of the
+    event loop or the request threadpool. The number of queued and running
+    jobs is capped; callers beyond the cap fail fast instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running"""
+        return self._pending
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # Spawned workers avoid forking a process that runs threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in a worker process and await its result.
+
+        Raises:
+            PasswordHashingBusyError: If max_pending jobs are already in flight
+            TimeoutError: If the job does not finish within the timeout
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashingBusyError("Password hashing queue is full")
+            if self._executor is None:
+                self._executor = self._create_executor()
+            self._pending += 1
+            future = self._executor.submit(func, *args)
+        # The slot is only freed once the worker is done with the job
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+    def map(self, func, *iterables: Iterable, chunksize: int = 16) -> List:
+        """
+        Run func over iterables across the worker processes for batch jobs.
+
+        Unlike run, this blocks the caller and is not subject to max_pending,
+        so it is meant for offline work such as bulk imports.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor()
+            executor = self._executor
+        return list(executor.map(func, *iterables, chunksize=chunksize))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes; a later job starts a fresh pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_worker_pool = PasswordWorkerPool(
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    timeout=settings.password_hash_timeout,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a plain text password in the password worker pool.
+
+    Args:
+        password (str): Plain text password to hash
+
+    Returns:
+        str: Hashed password
+    """
+    return await password_worker_pool.run(
+        _hash_password_with_rounds, password, get_bcrypt_rounds()
+    )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain text password in the password worker pool.
+
+    Args:
+        plain_password (str): Plain text password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        bool: True if password matches, False otherwise
+    """
+    return await password_worker_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Async counterpart of verify_and_update_password using the worker pool.
+
+    Args:
+        plain_password (str): Plain text password to verify
+        hashed_password (str): Hashed password to compare against
+
+    Returns:
+        Tuple[bool, Optional[str]]: Whether the password matched, and a
+        replacement hash when the stored one needs upgrading
+    """
+    if not await verify_password_async(plain_password, hashed_password):
+        return False, None
+    if not needs_rehash(hashed_password):
+        return True, None
+    return True, await hash_password_async(plain_password)
+
+
+def hash_passwords(
+    passwords: Iterable[str], pool: Optional[PasswordWorkerPool] = None
+) -> List[str]:
+    """
+    Hash many plain text passwords in parallel across worker processes.
+
+    Args:
+        passwords (Iterable[str]): Plain text passwords to hash
+        pool (Optional[PasswordWorkerPool]): Pool to use, defaults to the
+            shared password worker pool
+
+    Returns:
+        List[str]: Hashed passwords, in input order
+    """
+    pool = pool or password_worker_pool
+    return pool.map(
+        _hash_password_with_rounds, passwords, itertools.repeat(get_bcrypt_rounds())
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Create a JWT access token.
 
+    Every token gets a unique jti claim so it can be revoked individually.
+
     Args:
         data (dict): Data to encode in the token
         expires_delta (Optional[timedelta]): Token expiration time
@@ -54,30 +341,107 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(
         to_encode, settings.secret_key, algorithm=settings.algorithm
     )
     return encoded_jwt
 
 
-def verify_token(token: str, credentials_exception):
+# (username, jti) of already-verified tokens keyed by token digest, each
+# entry expiring together with its token
+_verified_tokens: Optional[LRUCache] = (
+    LRUCache(settings.token_cache_size) if settings.token_cache_size > 0 else None
+)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def verify_token(token: str, credentials_exception, db: Optional[Session] = None):
     """
     Verify and decode a JWT token.
 
+    Tokens that verified successfully are remembered until their exp claim,
+    so repeated requests with the same token skip signature verification.
+    Revocation is checked on every call; the Bloom filter in front of the
+    revocation list answers most checks without touching the database.
+
     Args:
         token (str): JWT token to verify
         credentials_exception: Exception to raise if verification fails
+        db (Optional[Session]): Session used if a revocation lookup is needed
 
     Returns:
         str: Username from token payload
     """
+    cache = _verified_tokens
+    cached = cache.get(_token_digest(token)) if cache is not None else None
+    if cached is not None:
+        username, jti = cached
+    else:
+        try:
+            payload = jwt.decode(
+                token, settings.secret_key, algorithms=[settings.algorithm]
+            )
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
+        jti = payload.get("jti")
+        expires_at = payload.get("exp")
+        if cache is not None and expires_at is not None:
+            cache.put(_token_digest(token), (username, jti), expires_at=expires_at)
+    # Tokens issued before jti claims existed cannot be revoked
+    if jti is not None and revocation_list.is_revoked(jti, db):
+        if cache is not None:
+            cache.pop(_token_digest(token))
+        raise credentials_exception
+    return username
+
+
+def revoke_token(db: Session, token: str) -> bool:
+    """
+    Revoke an access token until it expires.
+
+    Args:
+        db (Session): Database session
+        token (str): JWT token to revoke
+
+    Returns:
+        bool: True if the token was revoked, False if it had already expired
+
+    Raises:
+        ValueError: If the token is invalid or has no jti claim
+    """
     try:
         payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
+            token,
+            settings.secret_key,
+            algorithms=[settings.algorithm],
+            options={"verify_exp": False},
         )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
     except JWTError:
-        raise credentials_exception
+        raise ValueError("Invalid token")
+    jti, expires_at = payload.get("jti"), payload.get("exp")
+    if jti is None or expires_at is None:
+        raise ValueError("Token cannot be revoked without jti and exp claims")
+    if expires_at <= time.time():
+        return False
+    revocation_list.revoke(db, jti, expires_at)
+    if _verified_tokens is not None:
+        _verified_tokens.pop(_token_digest(token))
+    return True
+
+
+def token_cache_info() -> Optional[CacheStats]:
+    """Return hit/miss counters of the verified token cache, if enabled"""
+    return _verified_tokens.stats() if _verified_tokens is not None else None
+
+
+def flush_token_cache() -> None:
+    """Forget every verified token, e.g. after rotating the secret key"""
+    if _verified_tokens is not None:
+        _verified_tokens.clear()
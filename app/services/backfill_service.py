@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.models.calculation_model import Calculation
+from app.services.calculation_factory import CalculationFactory
+from app.services.calculation_stats import (
+    StatsContribution,
+    apply_calculation_stats_delta,
+)
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# Failed rows kept in a report; later failures are only counted
+MAX_REPORTED_FAILURES = 100
+
+
+@dataclass
+class BackfillFailure:
+    """A row whose result could not be computed"""
+
+    id: int
+    error: str
+
+
+@dataclass
+class BackfillReport:
+    """Progress and outcome of a result backfill run"""
+
+    processed: int = 0
+    updated: int = 0
+    chunks: int = 0
+    last_id: Optional[int] = None
+    elapsed_seconds: float = 0.0
+    finished: bool = False
+    failed: int = 0
+    # The first MAX_REPORTED_FAILURES failed rows
+    failures: List[BackfillFailure] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        """Throughput of the run so far"""
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.processed / self.elapsed_seconds
+
+    def record_failure(self, row_id: int, error: str) -> None:
+        """Count a failed row, keeping its details while under the cap"""
+        self.failed += 1
+        if len(self.failures) < MAX_REPORTED_FAILURES:
+            self.failures.append(BackfillFailure(row_id, error))
+
+    def snapshot(self) -> "BackfillReport":
+        """Return a copy that later progress of the run does not change"""
+        return replace(self, failures=list(self.failures))
+
+    def to_dict(self) -> dict:
+        """Return the report as a JSON-serialisable dict"""
+        data = asdict(self)
+        data["rows_per_second"] = self.rows_per_second
+        return data
+
+
+def _read_checkpoint(path: str) -> Optional[int]:
+    """Return the last processed id stored in a checkpoint file, if any"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f).get("last_id")
+
+
+def _write_checkpoint(path: str, last_id: int) -> None:
+    """Atomically record the last processed id"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": last_id}, f)
+    os.replace(tmp_path, path)
+
+
+def _write_results(db: Session, updates: List[dict]) -> Set[int]:
+    """
+    Store computed results on rows that still have none.
+
+    The update only matches rows whose result is still NULL, so a row filled
+    in meanwhile (e.g. by a concurrent backfill) is neither overwritten nor
+    counted twice in the stats. Returns the ids that were actually written.
+    """
+    results = {u["id"]: u["result"] for u in updates}
+    if db.get_bind().dialect.update_returning:
+        statement = (
+            update(Calculation)
+            .where(Calculation.id.in_(results), Calculation.result.is_(None))
+            .values(result=case(results, value=Calculation.id))
+            .returning(Calculation.id)
+        )
+        return set(
+            db.execute(
+                statement, execution_options={"synchronize_session": False}
+            ).scalars()
+        )
+    written = set()
+    for row_id, result in results.items():
+        statement = (
+            update(Calculation)
+            .where(Calculation.id == row_id, Calculation.result.is_(None))
+            .values(result=result)
+        )
+        if db.execute(
+            statement, execution_options={"synchronize_session": False}
+        ).rowcount:
+            written.add(row_id)
+    return written
+
+
+def _backfill_chunk(
+    db: Session, after_id: Optional[int], chunk_size: int, report: BackfillReport
+) -> int:
+    """Compute and store results for one keyset chunk; return its row count."""
+    query = select(
+        Calculation.id,
+        Calculation.a,
+        Calculation.b,
+        Calculation.type,
+        Calculation.user_id,
+        Calculation.created_at,
+    )
+    query = query.where(Calculation.result.is_(None))
+    if after_id is not None:
+        query = query.where(Calculation.id > after_id)
+    rows = db.execute(query.order_by(Calculation.id).limit(chunk_size)).all()
+    if not rows:
+        return 0
+
+    supported = []
+    for row in rows:
+        if CalculationFactory.is_operation_supported(row.type):
+            supported.append(row)
+        else:
+            report.record_failure(row.id, f"Unsupported operation type: {row.type}")
+
+    updates = []
+    contributions = []
+    if supported:
+        batch = CalculationFactory.calculate_batch(
+            [row.a for row in supported],
+            [row.b for row in supported],
+            [row.type for row in supported],
+        )
+        for row, result, failed in zip(supported, batch.results, batch.errors):
+            if failed:
+                report.record_failure(row.id, "Division by zero is not allowed")
+            else:
+                updates.append({"id": row.id, "result": float(result)})
+                contributions.append(
+                    StatsContribution(
+                        row.user_id, row.type, float(result), row.created_at
+                    )
+                )
+
+    written = _write_results(db, updates) if updates else set()
+    if written:
+        # Bulk updates bypass the flush events that maintain the stats
+        apply_calculation_stats_delta(
+            db,
+            added=[c for c, u in zip(contributions, updates) if u["id"] in written],
+        )
+    db.commit()
+
+    report.processed += len(rows)
+    report.updated += len(written)
+    report.chunks += 1
+    report.last_id = rows[-1].id
+    return len(rows)
+
+
+def backfill_null_results(
+    session_factory: Callable[[], Session],
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+    start_after_id: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    max_chunks: Optional[int] = None,
+    on_progress: Optional[Callable[[BackfillReport], None]] = None,
+) -> BackfillReport:
+    """
+    Fill in Calculation.result for rows stored without one.
+
+    Rows with a NULL result are walked in id order using keyset pagination,
+    computed column-wise through CalculationFactory and written back with one
+    batched UPDATE per chunk. Each chunk is committed on its own, so an
+    interrupted run loses at most one chunk of work. Rows that cannot be
+    computed are recorded in the report and left NULL.
+
+    Args:
+        session_factory: Callable returning a new database session
+        chunk_size (int): Rows fetched and updated per chunk
+        start_after_id (Optional[int]): Only process rows with a larger id
+        checkpoint_path (Optional[str]): File recording the last processed id;
+            a run without start_after_id resumes from it
+        max_chunks (Optional[int]): Stop after this many chunks
+        on_progress: Called with the report after every chunk
+
+    Returns:
+        BackfillReport: Counts, failures and throughput of the run
+    """
+    if start_after_id is None and checkpoint_path:
+        start_after_id = _read_checkpoint(checkpoint_path)
+
+    report = BackfillReport(last_id=start_after_id)
+    started = time.perf_counter()
+    while max_chunks is None or report.chunks < max_chunks:
+        db = session_factory()
+        try:
+            count = _backfill_chunk(db, report.last_id, chunk_size, report)
+        finally:
+            db.close()
+        report.elapsed_seconds = time.perf_counter() - started
+        if not count:
+            report.finished = True
+            break
+        if checkpoint_path:
+            _write_checkpoint(checkpoint_path, report.last_id)
+        if on_progress:
+            on_progress(report)
+    return report
+
+
+class BackfillAlreadyRunningError(RuntimeError):
+    """Raised when a backfill job is started while another one is running"""
+
+
+# Outcome of the most recent in-process backfill run
+last_backfill_report: Optional[BackfillReport] = None
+
+# Held while an in-process backfill job runs
+_job_lock = threading.Lock()
+
+
+def claim_backfill_job() -> bool:
+    """
+    Reserve the in-process backfill job slot.
+
+    Lets a caller refuse a second job before scheduling one; pass
+    claimed=True to run_backfill_job, which releases the slot when done.
+
+    Returns:
+        bool: False if a backfill job is already running
+    """
+    return _job_lock.acquire(blocking=False)
+
+
+def run_backfill_job(
+    session_factory: Callable[[], Session],
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+    claimed: bool = False,
+) -> BackfillReport:
+    """
+    Run a full backfill, publishing progress to last_backfill_report.
+
+    Only one job runs per process at a time. Runs in other processes (e.g.
+    the CLI) may overlap; they never write or count the same row twice.
+
+    Args:
+        session_factory: Callable returning a new database session
+        chunk_size (int): Rows fetched and updated per chunk
+        claimed (bool): The caller already holds the slot (claim_backfill_job)
+
+    Raises:
+        BackfillAlreadyRunningError: If another job is running in this process
+    """
+    global last_backfill_report
+    if not claimed and not claim_backfill_job():
+        raise BackfillAlreadyRunningError("A backfill is already running")
+
+    def publish(report: BackfillReport) -> None:
+        global last_backfill_report
+        # Readers get a copy; the run keeps updating its own report
+        last_backfill_report = report.snapshot()
+
+    try:
+        report = backfill_null_results(
+            session_factory, chunk_size=chunk_size, on_progress=publish
+        )
+    finally:
+        _job_lock.release()
+    last_backfill_report = report
+    return report
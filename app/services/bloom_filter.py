@@ -0,0 +1,52 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Thread-safe Bloom filter over string keys.
+
+    Membership tests never give false negatives; false positives occur at
+    roughly ``error_rate`` once ``capacity`` keys have been added. Keys cannot
+    be removed, so a filter is rebuilt to forget them.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str):
+        # Kirsch-Mitzenmacher double hashing: k positions from one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> None:
+        """Add key to the filter"""
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self._count += 1
+
+    def __contains__(self, key: str) -> bool:
+        """Return False if key was never added, True if it probably was"""
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def __len__(self) -> int:
+        """Number of keys added"""
+        return self._count
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Optional
+
+
+class CacheStats(NamedTuple):
+    """Snapshot of cache counters, modelled on functools' CacheInfo"""
+
+    hits: int
+    misses: int
+    evictions: int
+    currsize: int
+    maxsize: int
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction.
+
+    Entries may carry an absolute expiry time (``time.time()`` seconds); an
+    expired entry is dropped and counted as a miss when it is next read.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, marking it most recently used"""
+        with self._lock:
+            try:
+                value, expires_at = self._data[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(
+        self, key: Hashable, value: Any, expires_at: Optional[float] = None
+    ) -> None:
+        """Store value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            elif len(self._data) >= self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+            self._data[key] = (value, expires_at)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key from the cache and return its value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            return CacheStats(
+                self._hits,
+                self._misses,
+                self._evictions,
+                len(self._data),
+                self.maxsize,
+                self._expirations,
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
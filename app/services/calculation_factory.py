@@ -1,4 +1,23 @@
-from typing import Protocol
+import math
+from typing import Hashable, NamedTuple, Optional, Protocol, Sequence, Set, Union
+
+import numpy as np
+
+from app.config import settings
+from app.services.cache import CacheStats, LRUCache
+from app.services.shared_cache import SharedResultCache
+
+
+class BatchCalculationResult(NamedTuple):
+    """Column-wise result of a batch calculation.
+
+    ``results`` holds the computed values and ``errors`` is a boolean mask of
+    rows that could not be computed (e.g. division by zero). Errored rows have
+    ``NaN`` in ``results``.
+    """
+
+    results: np.ndarray
+    errors: np.ndarray
 
 
 class CalculationOperation(Protocol):
@@ -8,6 +27,10 @@ class CalculationOperation(Protocol):
         """Perform the calculation operation"""
         ...
 
+    def calculate_batch(self, a: np.ndarray, b: np.ndarray) -> BatchCalculationResult:
+        """Perform the calculation operation over whole operand columns"""
+        ...
+
 
 class AddOperation:
     """Addition operation implementation"""
@@ -15,6 +38,9 @@ class AddOperation:
     def calculate(self, a: float, b: float) -> float:
         return a + b
 
+    def calculate_batch(self, a: np.ndarray, b: np.ndarray) -> BatchCalculationResult:
+        return BatchCalculationResult(np.add(a, b), np.zeros(a.shape, dtype=bool))
+
 
 class SubOperation:
     """Subtraction operation implementation"""
@@ -22,6 +48,9 @@ class SubOperation:
     def calculate(self, a: float, b: float) -> float:
         return a - b
 
+    def calculate_batch(self, a: np.ndarray, b: np.ndarray) -> BatchCalculationResult:
+        return BatchCalculationResult(np.subtract(a, b), np.zeros(a.shape, dtype=bool))
+
 
 class MultiplyOperation:
     """Multiplication operation implementation"""
@@ -29,6 +58,9 @@ class MultiplyOperation:
     def calculate(self, a: float, b: float) -> float:
         return a * b
 
+    def calculate_batch(self, a: np.ndarray, b: np.ndarray) -> BatchCalculationResult:
+        return BatchCalculationResult(np.multiply(a, b), np.zeros(a.shape, dtype=bool))
+
 
 class DivideOperation:
     """Division operation implementation"""
@@ -38,6 +70,27 @@ class DivideOperation:
             raise ValueError("Division by zero is not allowed")
         return a / b
 
+    def calculate_batch(self, a: np.ndarray, b: np.ndarray) -> BatchCalculationResult:
+        errors = b == 0
+        results = np.full(a.shape, np.nan)
+        np.divide(a, b, out=results, where=~errors)
+        return BatchCalculationResult(results, errors)
+
+
+def _operand_key(value: float) -> Hashable:
+    """Normalise an operand into a cache key that respects IEEE 754 quirks.
+
+    NaN never compares equal to itself, so every NaN maps to one key, and
+    -0.0 compares equal to 0.0 but can produce a differently signed result,
+    so it gets a key of its own.
+    """
+    value = float(value)
+    if value != value:
+        return "nan"
+    if value == 0.0 and math.copysign(1.0, value) < 0:
+        return "-0.0"
+    return value
+
 
 class CalculationFactory:
     """Factory class for creating calculation operations"""
@@ -49,6 +102,13 @@ class CalculationFactory:
         "Divide": DivideOperation(),
     }
 
+    # Optional memoization of scalar results, see configure_cache and
+    # configure_shared_cache
+    _cache: Optional[LRUCache] = None
+    _shared_cache: Optional[SharedResultCache] = None
+    # Operation types registered with shared_cache=True
+    _shared_operations: Set[str] = set()
+
     @classmethod
     def get_operation(cls, operation_type: str) -> CalculationOperation:
         """Get the appropriate operation instance for the given type"""
@@ -57,11 +117,169 @@ class CalculationFactory:
             raise ValueError(f"Unsupported operation type: {operation_type}")
         return operation
 
+    @classmethod
+    def register_operation(
+        cls,
+        operation_type: str,
+        operation: CalculationOperation,
+        shared_cache: bool = False,
+    ) -> None:
+        """
+        Register an operation under a type name.
+
+        Every dispatch path (scalar, batch, expressions and the Calculation
+        model) resolves operations through this registry, so an operation
+        only needs to be registered once.
+
+        Args:
+            operation_type (str): Type name, e.g. "Add"
+            operation (CalculationOperation): Operation implementation
+            shared_cache (bool): Also look results up in the host-wide shared
+                cache. Each lookup is a blocking SQLite read, so only opt in
+                operations that cost more than that to compute.
+        """
+        cls._operations[operation_type] = operation
+        if shared_cache:
+            cls._shared_operations.add(operation_type)
+        else:
+            cls._shared_operations.discard(operation_type)
+        # Other processes' shared entries are left alone; every worker
+        # registers the same operations at import
+        if cls._cache is not None:
+            cls._cache.clear()
+
     @classmethod
     def calculate(cls, a: float, b: float, operation_type: str) -> float:
         """Perform calculation using the factory pattern"""
         operation = cls.get_operation(operation_type)
-        return operation.calculate(a, b)
+        type_name = getattr(operation_type, "value", operation_type)
+        cache = cls._cache
+        shared_cache = (
+            cls._shared_cache if type_name in cls._shared_operations else None
+        )
+        if cache is None and shared_cache is None:
+            return operation.calculate(a, b)
+
+        key = (type_name, _operand_key(a), _operand_key(b))
+        cached = cache.get(key) if cache is not None else None
+        if cached is None:
+            # Another worker on the host may already have computed it
+            if shared_cache is not None:
+                cached = shared_cache.get(key)
+            if cached is None:
+                try:
+                    cached = (True, operation.calculate(a, b))
+                except ValueError as e:
+                    # Remember the failure too so repeated bad input stays cheap
+                    cached = (False, str(e))
+                if shared_cache is not None:
+                    shared_cache.put(key, cached)
+            if cache is not None:
+                cache.put(key, cached)
+        succeeded, value = cached
+        if not succeeded:
+            raise ValueError(value)
+        return value
+
+    @classmethod
+    def configure_cache(cls, maxsize: int) -> None:
+        """
+        Enable a bounded LRU cache of scalar results keyed by (type, a, b).
+
+        Args:
+            maxsize (int): Maximum number of cached results; 0 disables caching
+        """
+        cls._cache = LRUCache(maxsize) if maxsize > 0 else None
+
+    @classmethod
+    def configure_shared_cache(cls, path: Optional[str], maxsize: int) -> None:
+        """
+        Enable a result cache shared by all processes on the host.
+
+        It is consulted after the in-process cache and before computing, so
+        a result is computed once per host rather than once per worker. Only
+        operations registered with shared_cache=True use it; the built-in
+        arithmetic is cheaper than a lookup.
+
+        Args:
+            path (Optional[str]): SQLite file holding the cache; None disables it
+            maxsize (int): Maximum number of cached results; 0 disables it
+        """
+        if path and maxsize > 0:
+            cls._shared_cache = SharedResultCache(path, maxsize)
+        else:
+            cls._shared_cache = None
+
+    @classmethod
+    def cache_info(cls) -> Optional[CacheStats]:
+        """Return hit/miss/eviction counters, or None if caching is disabled"""
+        return cls._cache.stats() if cls._cache is not None else None
+
+    @classmethod
+    def shared_cache_info(cls) -> Optional[CacheStats]:
+        """Return shared cache counters, or None if it is disabled"""
+        if cls._shared_cache is None:
+            return None
+        return cls._shared_cache.stats()
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached results and reset the counters"""
+        if cls._cache is not None:
+            cls._cache.clear()
+        if cls._shared_cache is not None:
+            cls._shared_cache.clear()
+
+    @classmethod
+    def calculate_batch(
+        cls,
+        a: Union[np.ndarray, Sequence[float]],
+        b: Union[np.ndarray, Sequence[float]],
+        operation_types: Union[np.ndarray, Sequence[str]],
+    ) -> BatchCalculationResult:
+        """
+        Perform calculations over columns of operands in vectorized form.
+
+        Rows are grouped by operation type and each group is evaluated with a
+        single masked kernel, so the per-row dispatch cost is paid once per
+        operation type instead of once per row. Overflow yields inf (and
+        inf - inf yields NaN) without a warning; callers check the results.
+
+        Args:
+            a: First operand column
+            b: Second operand column
+            operation_types: Operation type column (strings or CalculationType)
+
+        Returns:
+            BatchCalculationResult: Result column and per-row error mask
+
+        Raises:
+            ValueError: If the columns differ in length or a type is unsupported
+        """
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        if (
+            not isinstance(operation_types, np.ndarray)
+            or operation_types.dtype == object
+        ):
+            # Normalise enum members to their values; str() of a member is
+            # "CalculationType.ADD", not "Add"
+            operation_types = np.array(
+                [getattr(t, "value", t) for t in operation_types], dtype=str
+            )
+        if not (a.shape == b.shape == operation_types.shape) or a.ndim != 1:
+            raise ValueError("Operand and type columns must be 1-D and equal length")
+
+        results = np.full(a.shape, np.nan)
+        errors = np.zeros(a.shape, dtype=bool)
+        with np.errstate(over="ignore", invalid="ignore"):
+            for operation_type in np.unique(operation_types):
+                operation = cls.get_operation(str(operation_type))
+                mask = operation_types == operation_type
+                batch = operation.calculate_batch(a[mask], b[mask])
+                results[mask] = batch.results
+                errors[mask] = batch.errors
+        return BatchCalculationResult(results, errors)
 
     @classmethod
     def get_supported_operations(cls) -> list:
@@ -72,3 +290,9 @@ class CalculationFactory:
     def is_operation_supported(cls, operation_type: str) -> bool:
         """Check if an operation type is supported"""
         return operation_type in cls._operations
+
+
+CalculationFactory.configure_cache(settings.calculation_cache_size)
+CalculationFactory.configure_shared_cache(
+    settings.calculation_shared_cache_path, settings.calculation_shared_cache_size
+)
@@ -0,0 +1,471 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from pydantic import ValidationError
+from sqlalchemy import String, insert, select, tuple_, type_coerce
+from sqlalchemy.orm import Session, joinedload, raiseload
+
+from app.database import replica_reads
+from app.models.calculation_model import Calculation
+from app.schemas.calculation_schemas import (
+    CalculationBatchItemResult,
+    CalculationCreate,
+)
+from app.schemas.validation import validation_error_message
+from app.services.archive_service import read_archived_user_calculations
+from app.services.calculation_factory import CalculationFactory
+from app.services.calculation_stats import (
+    StatsContribution,
+    apply_calculation_stats_delta,
+    as_utc,
+)
+
+# Rows sent per INSERT statement; keeps parameter lists under driver limits
+INSERT_CHUNK_SIZE = 1000
+
+# Longest NDJSON line accepted by the streaming endpoint
+MAX_NDJSON_LINE_BYTES = 64 * 1024
+
+# Page size bounds for calculation history
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+
+def insert_calculations(
+    db: Session, rows: Sequence[Dict[str, Any]], chunk_size: int = INSERT_CHUNK_SIZE
+) -> List[int]:
+    """
+    Insert calculation rows as batched multi-row INSERT statements.
+
+    Rows are sent through a single executemany per chunk instead of one
+    add/flush per row. The caller owns the transaction and must commit.
+
+    Args:
+        db (Session): Database session
+        rows (Sequence[Dict[str, Any]]): Column values for each calculation
+        chunk_size (int): Maximum number of rows per INSERT statement
+
+    Returns:
+        List[int]: Primary keys of the inserted rows, in input order
+    """
+    statement = insert(Calculation).returning(
+        Calculation.id, sort_by_parameter_order=True
+    )
+    ids: List[int] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        ids.extend(db.scalars(statement, chunk).all())
+    return ids
+
+
+def persist_calculations(
+    db: Session, rows: Sequence[Dict[str, Any]], chunk_size: int = INSERT_CHUNK_SIZE
+) -> List[int]:
+    """
+    Insert computed calculation rows and fold them into the user stats.
+
+    Core inserts bypass the flush events that maintain user_calculation_stats,
+    so the stats delta is applied here. The caller must commit.
+
+    Args:
+        db (Session): Database session
+        rows (Sequence[Dict[str, Any]]): Column values for each calculation
+        chunk_size (int): Maximum number of rows per INSERT statement
+
+    Returns:
+        List[int]: Primary keys of the inserted rows, in input order
+    """
+    ids = insert_calculations(db, rows, chunk_size)
+    now = datetime.now(timezone.utc)
+    apply_calculation_stats_delta(
+        db,
+        added=[
+            StatsContribution(
+                row.get("user_id"),
+                row["type"],
+                row.get("result"),
+                row.get("created_at") or now,
+            )
+            for row in rows
+        ],
+    )
+    return ids
+
+
+def non_finite_error(a: float, b: float, result: float) -> Optional[str]:
+    """
+    Explain why a calculation cannot be stored, if its values are not finite.
+
+    NaN and infinity pass operand validation and arise from overflow, but JSON
+    has no encoding for them.
+
+    Args:
+        a (float): First operand
+        b (float): Second operand
+        result (float): Computed result
+
+    Returns:
+        Optional[str]: Error message, or None if every value is finite
+    """
+    if not (math.isfinite(a) and math.isfinite(b)):
+        return "Operands must be finite numbers"
+    if not math.isfinite(result):
+        return "Result is not a finite number"
+    return None
+
+
+def build_calculation_row(
+    calculation: CalculationCreate, user_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compute a validated calculation into the column values it is stored with.
+
+    Args:
+        calculation (CalculationCreate): Validated calculation input
+        user_id (Optional[int]): Owner of the calculation
+
+    Returns:
+        Dict[str, Any]: Values for insert_calculations / persist_calculations
+    """
+    return {
+        "a": calculation.a,
+        "b": calculation.b,
+        "type": calculation.type.value,
+        "result": CalculationFactory.calculate(
+            calculation.a, calculation.b, calculation.type
+        ),
+        "user_id": user_id,
+    }
+
+
+def create_calculation(db: Session, row: Dict[str, Any]) -> int:
+    """
+    Store one computed calculation row and commit.
+
+    Args:
+        db (Session): Database session
+        row (Dict[str, Any]): Values from build_calculation_row
+
+    Returns:
+        int: Primary key of the new calculation
+    """
+    calc_id = persist_calculations(db, [row])[0]
+    db.commit()
+    return calc_id
+
+
+def create_calculations_bulk(
+    db: Session,
+    items: Sequence[Any],
+    user_id: Optional[int] = None,
+    chunk_size: int = INSERT_CHUNK_SIZE,
+) -> List[CalculationBatchItemResult]:
+    """
+    Validate, compute and store a batch of calculations.
+
+    Each item is validated with CalculationCreate on its own so a bad item
+    is reported in its status instead of rejecting the whole batch. Valid
+    items are computed column-wise through CalculationFactory and written
+    with batched inserts in a single transaction; items with non-finite
+    operands or results are reported as errors and not stored.
+
+    Args:
+        db (Session): Database session
+        items (Sequence[Any]): Raw calculation payloads or CalculationCreate
+        user_id (Optional[int]): Owner to attach to the stored calculations
+        chunk_size (int): Maximum number of rows per INSERT statement
+
+    Returns:
+        List[CalculationBatchItemResult]: Status of every item, in input order
+    """
+    statuses: List[CalculationBatchItemResult] = []
+    valid: List[CalculationBatchItemResult] = []
+    a: List[float] = []
+    b: List[float] = []
+    types: List[str] = []
+
+    for index, item in enumerate(items):
+        try:
+            calc = CalculationCreate.model_validate(item)
+        except ValidationError as e:
+            statuses.append(
+                CalculationBatchItemResult(
+                    index=index, status="error", error=validation_error_message(e)
+                )
+            )
+            continue
+        status = CalculationBatchItemResult(index=index, status="created")
+        statuses.append(status)
+        valid.append(status)
+        a.append(calc.a)
+        b.append(calc.b)
+        types.append(calc.type.value)
+
+    if not valid:
+        return statuses
+
+    batch = CalculationFactory.calculate_batch(a, b, types)
+    rows: List[Dict[str, Any]] = []
+    pending: List[CalculationBatchItemResult] = []
+    for i, status in enumerate(valid):
+        if batch.errors[i]:
+            error = "Division by zero is not allowed"
+        else:
+            error = non_finite_error(a[i], b[i], batch.results[i])
+        if error is not None:
+            status.status = "error"
+            status.error = error
+            continue
+        status.result = float(batch.results[i])
+        pending.append(status)
+        rows.append(
+            {
+                "a": a[i],
+                "b": b[i],
+                "type": types[i],
+                "result": status.result,
+                "user_id": user_id,
+            }
+        )
+
+    ids = persist_calculations(db, rows, chunk_size)
+    db.commit()
+    for status, calc_id in zip(pending, ids):
+        status.id = calc_id
+    return statuses
+
+
+def _evaluate_ndjson_line(line_number: int, line: bytes) -> Dict[str, Any]:
+    """Validate and evaluate one NDJSON calculation request."""
+    try:
+        calc = CalculationCreate.model_validate_json(line)
+    except ValidationError as e:
+        return {"line": line_number, "error": validation_error_message(e)}
+    result = CalculationFactory.calculate(calc.a, calc.b, calc.type)
+    error = non_finite_error(calc.a, calc.b, result)
+    if error is not None:
+        return {"line": line_number, "error": error}
+    return {
+        "line": line_number,
+        "a": calc.a,
+        "b": calc.b,
+        "type": calc.type.value,
+        "result": result,
+    }
+
+
+async def stream_calculations_ndjson(
+    chunks: AsyncIterable[bytes], max_line_bytes: int = MAX_NDJSON_LINE_BYTES
+) -> AsyncIterator[bytes]:
+    """
+    Evaluate a stream of newline-delimited JSON calculation requests.
+
+    Input is consumed chunk by chunk and only the current partial line is
+    buffered, so memory use does not grow with the size of the stream. Each
+    non-blank input line produces one output line carrying either the result
+    or an error, tagged with its 1-based input line number.
+
+    Args:
+        chunks (AsyncIterable[bytes]): Raw request body chunks
+        max_line_bytes (int): Longest accepted line; the stream stops with an
+            error line if it is exceeded
+
+    Yields:
+        bytes: NDJSON-encoded results for the lines completed by each chunk
+    """
+    buffer = b""
+    line_number = 0
+
+    def evaluate(lines: List[bytes]) -> bytes:
+        nonlocal line_number
+        output = []
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                item = _evaluate_ndjson_line(line_number, line)
+                output.append(json.dumps(item, allow_nan=False))
+        return "".join(f"{item}\n" for item in output).encode()
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        encoded = evaluate(lines)
+        if encoded:
+            yield encoded
+        if len(buffer) > max_line_bytes:
+            error = {"line": line_number + 1, "error": "Line exceeds maximum length"}
+            yield f"{json.dumps(error)}\n".encode()
+            return
+
+    encoded = evaluate([buffer])
+    if encoded:
+        yield encoded
+
+
+def _history_sort_column(db: Session):
+    """Column holding created_at as it is compared in history cursors"""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite stores timestamps as text, and CURRENT_TIMESTAMP omits the
+        # microseconds SQLAlchemy would bind, so compare the stored text
+        return type_coerce(Calculation.created_at, String)
+    return Calculation.created_at
+
+
+def _cursor_value(db: Session, created_at: datetime) -> Any:
+    """Cursor sort key for a timestamp that did not come from the hot table"""
+    if db.get_bind().dialect.name == "sqlite":
+        # Match the text CURRENT_TIMESTAMP stores for rows created in-app
+        text = created_at.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        if created_at.microsecond:
+            text += f".{created_at.microsecond:06d}"
+        return text
+    return created_at
+
+
+def _cursor_datetime(created_at: Any) -> datetime:
+    """A decoded cursor timestamp as an aware datetime"""
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return as_utc(created_at)
+
+
+def encode_history_cursor(created_at: Any, calculation_id: int) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, calculation_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_history_cursor(db: Session, cursor: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_history_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, calculation_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(created_at, str) or not isinstance(calculation_id, int):
+            raise ValueError
+        if db.get_bind().dialect.name != "sqlite":
+            created_at = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    return created_at, calculation_id
+
+
+def list_calculations(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    with_owner: bool = False,
+) -> List[Calculation]:
+    """
+    List calculations by id, optionally with their owners.
+
+    With with_owner, Calculation.user is loaded through a LEFT OUTER JOIN in
+    the same statement instead of one query per row. Without it, touching
+    Calculation.user raises instead of quietly issuing a query per row.
+
+    Args:
+        db (Session): Database session
+        skip (int): Number of calculations to skip
+        limit (int): Maximum number of calculations to return
+        user_id (Optional[int]): Only list this user's calculations
+        with_owner (bool): Eagerly load Calculation.user
+
+    Returns:
+        List[Calculation]: Calculations ordered by id
+    """
+    loader = joinedload if with_owner else raiseload
+    query = select(Calculation).options(loader(Calculation.user))
+    if user_id is not None:
+        query = query.where(Calculation.user_id == user_id)
+    query = query.order_by(Calculation.id).offset(skip).limit(limit)
+    with replica_reads(db):
+        return list(db.scalars(query))
+
+
+def get_user_calculations_page(
+    db: Session,
+    user_id: int,
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Calculation], Optional[str]]:
+    """
+    Fetch one page of a user's calculations, newest first.
+
+    Pages are addressed by a (created_at, id) keyset cursor rather than an
+    OFFSET, so with the (user_id, created_at, id) index every page is a
+    single index range scan however deep the client has scrolled. Archived
+    calculations are merged in from the user's archive partitions, reading
+    only months the page can still reach.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the calculations
+        limit (int): Maximum number of calculations to return
+        cursor (Optional[str]): next_cursor of the previous page
+
+    Returns:
+        Tuple[List[Calculation], Optional[str]]: The page and the cursor of
+            the next one, or None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sort_column = _history_sort_column(db)
+    query = select(Calculation, sort_column.label("sort_key")).where(
+        Calculation.user_id == user_id
+    )
+    before = None
+    if cursor is not None:
+        created_at, calculation_id = decode_history_cursor(db, cursor)
+        query = query.where(
+            tuple_(sort_column, Calculation.id) < tuple_(created_at, calculation_id)
+        )
+        before = (_cursor_datetime(created_at), calculation_id)
+    query = query.order_by(sort_column.desc(), Calculation.id.desc())
+    # One extra row tells whether another page follows
+    with replica_reads(db):
+        hot = [
+            (as_utc(calculation.created_at), calculation.id, calculation, sort_key)
+            for calculation, sort_key in db.execute(query.limit(limit + 1))
+        ]
+
+    # A full hot page leaves room only for archived rows newer than its end
+    not_before = hot[-1][0] if len(hot) > limit else None
+    archived = [
+        (as_utc(calculation.created_at), calculation.id, calculation, None)
+        for calculation in read_archived_user_calculations(
+            user_id, limit + 1, before=before, not_before=not_before
+        )
+    ]
+    rows = hot
+    if archived:
+        rows = sorted(hot + archived, key=lambda row: row[:2], reverse=True)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        created_at, calculation_id, _, sort_key = rows[-1]
+        if sort_key is None:
+            sort_key = _cursor_value(db, created_at)
+        next_cursor = encode_history_cursor(sort_key, calculation_id)
+    return [row[2] for row in rows], next_cursor
@@ -0,0 +1,458 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import (
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    inspect,
+    select,
+    tuple_,
+    union,
+    union_all,
+)
+from sqlalchemy.orm import Session
+
+from app.database import UPSERT_INSERTS, replica_reads
+from app.models.calculation_model import Calculation
+from app.models.calculation_stats_model import (
+    UserCalculationArchiveStats,
+    UserCalculationStats,
+)
+
+_STATS = UserCalculationStats.__table__
+_ARCHIVED = UserCalculationArchiveStats.__table__
+
+GroupKey = Tuple[int, str]
+
+
+class StatsContribution(NamedTuple):
+    """What one calculation adds to (or removes from) its stats group"""
+
+    user_id: Optional[int]
+    type: str
+    result: Optional[float]
+    created_at: Optional[datetime]
+
+    @property
+    def counted(self) -> bool:
+        """Only owned calculations with a stored result are aggregated"""
+        return self.user_id is not None and self.result is not None
+
+
+class _GroupDelta:
+    """Net change to one (user_id, type) stats row"""
+
+    def __init__(self):
+        self.count = 0
+        self.result_sum = 0.0
+        self.added_min: Optional[float] = None
+        self.added_max: Optional[float] = None
+        self.added_last: Optional[datetime] = None
+        self.removed: List[StatsContribution] = []
+
+    def add(self, item: StatsContribution) -> None:
+        self.count += 1
+        self.result_sum += item.result
+        self.added_min = _min(self.added_min, item.result)
+        self.added_max = _max(self.added_max, item.result)
+        self.added_last = _max(self.added_last, as_utc(item.created_at))
+
+    def remove(self, item: StatsContribution) -> None:
+        self.count -= 1
+        self.result_sum -= item.result
+        self.removed.append(item)
+
+
+def _min(a, b):
+    return b if a is None or (b is not None and b < a) else a
+
+
+def _max(a, b):
+    return b if a is None or (b is not None and b > a) else a
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Make naive timestamps (SQLite returns them) comparable with aware ones"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _group_deltas(
+    added: Iterable[StatsContribution], removed: Iterable[StatsContribution]
+) -> Dict[GroupKey, _GroupDelta]:
+    deltas: Dict[GroupKey, _GroupDelta] = defaultdict(_GroupDelta)
+    for item in added:
+        if item.counted:
+            deltas[(item.user_id, item.type)].add(item)
+    for item in removed:
+        if item.counted:
+            deltas[(item.user_id, item.type)].remove(item)
+    return deltas
+
+
+def _needs_recompute(row, removed: List[StatsContribution]) -> bool:
+    """Whether removing rows may have taken away a stored min, max or last"""
+    if row is None:
+        return True
+    stored_last = as_utc(row.last_calculated_at)
+    for item in removed:
+        if row.result_min is None or item.result <= row.result_min:
+            return True
+        if row.result_max is None or item.result >= row.result_max:
+            return True
+        created_at = as_utc(item.created_at)
+        if stored_last is None or created_at is None or created_at >= stored_last:
+            return True
+    return False
+
+
+def _dialect_name(db) -> str:
+    """Dialect of a Session or Connection"""
+    if isinstance(db, Session):
+        return db.get_bind().dialect.name
+    return db.dialect.name
+
+
+def _upsert_statement(db, rows: List[Dict[str, Any]], table=_STATS):
+    """INSERT new stats rows, merging counts and extremes into existing ones"""
+    dialect_insert = UPSERT_INSERTS.get(_dialect_name(db))
+    if dialect_insert is None:
+        return None
+    statement = dialect_insert(table).values(rows)
+    new = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.type],
+        set_={
+            "count": table.c["count"] + new["count"],
+            "result_sum": table.c.result_sum + new.result_sum,
+            "result_min": case(
+                (table.c.result_min.is_(None), new.result_min),
+                (new.result_min < table.c.result_min, new.result_min),
+                else_=table.c.result_min,
+            ),
+            "result_max": case(
+                (table.c.result_max.is_(None), new.result_max),
+                (new.result_max > table.c.result_max, new.result_max),
+                else_=table.c.result_max,
+            ),
+            "last_calculated_at": case(
+                (table.c.last_calculated_at.is_(None), new.last_calculated_at),
+                (
+                    new.last_calculated_at > table.c.last_calculated_at,
+                    new.last_calculated_at,
+                ),
+                else_=table.c.last_calculated_at,
+            ),
+        },
+    )
+
+
+def _merge_rows(db, rows: List[Dict[str, Any]], table=_STATS) -> None:
+    """Read-modify-write fallback for dialects without ON CONFLICT"""
+    for row in rows:
+        key = (row["user_id"], row["type"])
+        stored = db.execute(
+            select(table).where(tuple_(table.c.user_id, table.c.type) == key)
+        ).first()
+        if stored is not None:
+            stored = stored._mapping
+        if stored is None:
+            db.execute(table.insert().values(row))
+            continue
+        db.execute(
+            table.update()
+            .where(tuple_(table.c.user_id, table.c.type) == key)
+            .values(
+                count=stored["count"] + row["count"],
+                result_sum=stored["result_sum"] + row["result_sum"],
+                result_min=_min(stored["result_min"], row["result_min"]),
+                result_max=_max(stored["result_max"], row["result_max"]),
+                last_calculated_at=_max(
+                    as_utc(stored["last_calculated_at"]),
+                    as_utc(row["last_calculated_at"]),
+                ),
+            )
+        )
+
+
+def _upsert_rows(db, rows: List[Dict[str, Any]], table=_STATS) -> None:
+    statement = _upsert_statement(db, rows, table)
+    if statement is not None:
+        db.execute(statement)
+    else:
+        _merge_rows(db, rows, table)
+
+
+def _recompute_groups(db, keys: List[GroupKey]) -> None:
+    """
+    Replace stats rows with a fresh aggregate of their calculations.
+
+    Archived calculations are no longer in the table; their stored
+    aggregates are folded in so they keep counting.
+    """
+    key_filter = tuple_(_STATS.c.user_id, _STATS.c.type).in_(keys)
+    db.execute(delete(_STATS).where(key_filter))
+    hot = (
+        select(
+            Calculation.user_id.label("user_id"),
+            Calculation.type.label("type"),
+            func.count().label("count"),
+            func.sum(Calculation.result).label("result_sum"),
+            func.min(Calculation.result).label("result_min"),
+            func.max(Calculation.result).label("result_max"),
+            func.max(Calculation.created_at).label("last_calculated_at"),
+        )
+        .where(tuple_(Calculation.user_id, Calculation.type).in_(keys))
+        .where(Calculation.result.is_not(None))
+        .group_by(Calculation.user_id, Calculation.type)
+    )
+    archived = select(
+        _ARCHIVED.c.user_id,
+        _ARCHIVED.c.type,
+        _ARCHIVED.c["count"],
+        _ARCHIVED.c.result_sum,
+        _ARCHIVED.c.result_min,
+        _ARCHIVED.c.result_max,
+        _ARCHIVED.c.last_calculated_at,
+    ).where(tuple_(_ARCHIVED.c.user_id, _ARCHIVED.c.type).in_(keys))
+    groups = union_all(hot, archived).subquery()
+    aggregate = select(
+        groups.c.user_id,
+        groups.c.type,
+        func.sum(groups.c["count"]),
+        func.sum(groups.c.result_sum),
+        func.min(groups.c.result_min),
+        func.max(groups.c.result_max),
+        func.max(groups.c.last_calculated_at),
+    ).group_by(groups.c.user_id, groups.c.type)
+    db.execute(
+        _STATS.insert().from_select(
+            [
+                "user_id",
+                "type",
+                "count",
+                "result_sum",
+                "result_min",
+                "result_max",
+                "last_calculated_at",
+            ],
+            aggregate,
+        )
+    )
+
+
+def _delta_rows(
+    deltas: Dict[GroupKey, _GroupDelta], skip: Iterable[GroupKey] = ()
+) -> List[Dict[str, Any]]:
+    return [
+        {
+            "user_id": user_id,
+            "type": type_,
+            "count": delta.count,
+            "result_sum": delta.result_sum,
+            "result_min": delta.added_min,
+            "result_max": delta.added_max,
+            "last_calculated_at": delta.added_last,
+        }
+        for (user_id, type_), delta in deltas.items()
+        if (user_id, type_) not in skip
+    ]
+
+
+def apply_calculation_stats_delta(
+    db,
+    added: Iterable[StatsContribution] = (),
+    removed: Iterable[StatsContribution] = (),
+) -> None:
+    """
+    Fold added and removed calculations into user_calculation_stats.
+
+    Counts and sums are adjusted in place and new extremes are merged with
+    one upsert for all touched groups. A group is re-aggregated from its
+    calculations only when a removed row could have been its min, max or
+    latest entry. Runs in the caller's transaction; the caller commits.
+
+    Use this for writes that bypass the ORM unit of work (Core inserts and
+    bulk updates); ORM flushes are handled automatically.
+
+    Args:
+        db: Session or Connection to write with
+        added (Iterable[StatsContribution]): Calculations now counted
+        removed (Iterable[StatsContribution]): Calculations no longer counted,
+            with the values they were counted with
+    """
+    deltas = _group_deltas(added, removed)
+    if not deltas:
+        return
+
+    removal_keys = [key for key, delta in deltas.items() if delta.removed]
+    recompute = []
+    if removal_keys:
+        stored = {
+            (row.user_id, row.type): row
+            for row in db.execute(
+                select(_STATS).where(
+                    tuple_(_STATS.c.user_id, _STATS.c.type).in_(removal_keys)
+                )
+            )
+        }
+        recompute = [
+            key
+            for key in removal_keys
+            if _needs_recompute(stored.get(key), deltas[key].removed)
+        ]
+
+    rows = _delta_rows(deltas, skip=recompute)
+    if rows:
+        _upsert_rows(db, rows)
+    if recompute:
+        _recompute_groups(db, recompute)
+    if removal_keys:
+        db.execute(
+            delete(_STATS).where(
+                and_(
+                    tuple_(_STATS.c.user_id, _STATS.c.type).in_(removal_keys),
+                    _STATS.c["count"] <= 0,
+                )
+            )
+        )
+
+
+def record_archived_calculations(db, archived: Iterable[StatsContribution]) -> None:
+    """
+    Keep archived calculations counted after their rows are deleted.
+
+    Call it in the transaction that deletes the rows with a Core statement,
+    which leaves user_calculation_stats unchanged. Their aggregates are
+    added to user_calculation_archive_stats, which re-aggregations read
+    back in.
+
+    Args:
+        db: Session or Connection to write with; the caller commits
+        archived (Iterable[StatsContribution]): Calculations being archived
+    """
+    rows = _delta_rows(_group_deltas(archived, ()))
+    if rows:
+        _upsert_rows(db, rows, _ARCHIVED)
+
+
+def rebuild_user_calculation_stats(db, user_id: Optional[int] = None) -> None:
+    """
+    Recompute stats from the calculations table and the archived aggregates,
+    for one user or everyone.
+
+    Args:
+        db: Session or Connection to write with; the caller commits
+        user_id (Optional[int]): Only rebuild this user's rows
+    """
+    hot = select(Calculation.user_id, Calculation.type)
+    hot = hot.where(Calculation.user_id.is_not(None))
+    archived = select(_ARCHIVED.c.user_id, _ARCHIVED.c.type)
+    stale = delete(_STATS)
+    if user_id is not None:
+        hot = hot.where(Calculation.user_id == user_id)
+        archived = archived.where(_ARCHIVED.c.user_id == user_id)
+        stale = stale.where(_STATS.c.user_id == user_id)
+    keys = [tuple(row) for row in db.execute(union(hot, archived))]
+    db.execute(stale)
+    if keys:
+        _recompute_groups(db, keys)
+
+
+def get_user_calculation_stats(db: Session, user_id: int) -> List[UserCalculationStats]:
+    """
+    Get a user's calculation statistics per operation type.
+
+    Args:
+        db (Session): Database session
+        user_id (int): Owner of the calculations
+
+    Returns:
+        List[UserCalculationStats]: One row per operation type used
+    """
+    query = select(UserCalculationStats).where(UserCalculationStats.user_id == user_id)
+    with replica_reads(db):
+        return list(db.scalars(query.order_by(UserCalculationStats.type)))
+
+
+def _contribution(calculation: Calculation, **overrides) -> StatsContribution:
+    """Current values of a calculation, loading any expired attributes"""
+    fields = {name: getattr(calculation, name) for name in StatsContribution._fields}
+    fields.update(overrides)
+    return StatsContribution(**fields)
+
+
+def _previous_values(calculation: Calculation) -> Optional[Dict[str, Any]]:
+    """Values a dirty calculation was counted with, or None if unchanged"""
+    state = inspect(calculation)
+    previous = {}
+    for name in _TRACKED_ATTRIBUTES:
+        history = state.attrs[name].history
+        if history.has_changes():
+            previous[name] = history.deleted[0] if history.deleted else None
+    return previous or None
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass  # Registering with active_history is what matters
+
+
+# Make SQLAlchemy load the old value when one of these is set on an expired
+# instance, so the flush knows what to subtract from the stats
+_TRACKED_ATTRIBUTES = ("user_id", "type", "result")
+for _name in _TRACKED_ATTRIBUTES:
+    event.listen(
+        getattr(Calculation, _name),
+        "set",
+        _load_old_value,
+        active_history=True,
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_stats_delta(session: Session, flush_context, instances) -> None:
+    # Old values are only readable before the flush writes the new ones
+    added: List[Any] = []
+    removed: List[StatsContribution] = []
+    for obj in session.new:
+        if isinstance(obj, Calculation):
+            added.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Calculation):
+            previous = _previous_values(obj)
+            if previous is not None:
+                # Also loads the unchanged attributes read after the flush
+                removed.append(_contribution(obj, **previous))
+                added.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, Calculation):
+            removed.append(_contribution(obj))
+    session.info["calculation_stats_delta"] = (added, removed)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_stats_delta(session: Session, flush_context) -> None:
+    pending = session.info.pop("calculation_stats_delta", None)
+    if not pending or not any(pending):
+        return
+    added, removed = pending
+    # created_at of new rows comes back from the INSERT; fall back to now
+    # where the dialect could not return it
+    now = datetime.now(timezone.utc)
+    contributions = []
+    for obj in added:
+        values = inspect(obj).dict
+        contributions.append(
+            StatsContribution(
+                values.get("user_id"),
+                values.get("type"),
+                values.get("result"),
+                values.get("created_at") or now,
+            )
+        )
+    apply_calculation_stats_delta(session.connection(), contributions, removed)
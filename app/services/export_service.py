@@ -0,0 +1,115 @@
+import csv
+import io
+from typing import Callable, Iterator, List, Optional, Sequence
+
+import pyarrow as pa
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import replica_reads
+from app.models.calculation_model import Calculation
+from app.services.archive_service import ARCHIVE_SCHEMA, iter_archived_calculations
+
+# Same columns and types as the Parquet archive, so both read alike
+EXPORT_SCHEMA = ARCHIVE_SCHEMA
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+_COLUMNS = [Calculation.__table__.c[field.name] for field in EXPORT_SCHEMA]
+
+
+def _export_partitions(
+    session_factory: Callable[[], Session], user_id: Optional[int], chunk_size: int
+) -> Iterator[Sequence[tuple]]:
+    """Stream archived, then stored, calculation rows as plain tuples"""
+    for batch in iter_archived_calculations(chunk_size, user_id):
+        yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+    query = select(*_COLUMNS).order_by(Calculation.id)
+    if user_id is not None:
+        query = query.where(Calculation.user_id == user_id)
+    # yield_per turns on server-side cursors (stream_results) where the
+    # driver has them, so only one chunk is ever held in memory
+    query = query.execution_options(yield_per=chunk_size)
+    with session_factory() as db, replica_reads(db):
+        yield from db.execute(query).partitions()
+
+
+def _csv_chunks(partitions: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_SCHEMA.names)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _record_batch(rows: Sequence[tuple]) -> pa.RecordBatch:
+    columns: List[Sequence] = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(values, type=field.type)
+            for values, field in zip(columns, EXPORT_SCHEMA)
+        ],
+        schema=EXPORT_SCHEMA,
+    )
+
+
+def _arrow_chunks(partitions: Iterator[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, EXPORT_SCHEMA) as writer:
+        for rows in partitions:
+            writer.write_batch(_record_batch(rows))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    # Schema for an empty export, then the end-of-stream marker
+    yield buffer.getvalue()
+
+
+def export_calculations(
+    session_factory: Callable[[], Session],
+    export_format: str = "csv",
+    user_id: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Stream calculations as CSV or an Arrow IPC stream.
+
+    Archived rows come first, read from the Parquet archive month by month.
+    Rows still in the calculations table follow in id order, fetched through
+    a streaming cursor. Every chunk_size rows are encoded straight from
+    tuples, without building ORM objects or schemas, and yielded as soon as
+    they are encoded, so memory stays flat however many rows are exported.
+
+    Args:
+        session_factory: Callable returning the session to read with; it is
+            held open until the export finishes
+        export_format (str): "csv" or "arrow"
+        user_id (Optional[int]): Only export this user's calculations
+        chunk_size (Optional[int]): Rows fetched and encoded at a time,
+            defaults to EXPORT_CHUNK_SIZE
+
+    Yields:
+        bytes: Encoded output, one piece per chunk
+
+    Raises:
+        ValueError: If export_format is not supported
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    partitions = _export_partitions(
+        session_factory, user_id, chunk_size or settings.export_chunk_size
+    )
+    if export_format == "arrow":
+        return _arrow_chunks(partitions)
+    return _csv_chunks(partitions)
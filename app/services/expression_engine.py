@@ -0,0 +1,339 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.cache import CacheStats, LRUCache
+from app.services.calculation_factory import BatchCalculationResult, CalculationFactory
+
+# Binary operators and the factory operation type each one maps to
+OPERATORS = {"+": "Add", "-": "Sub", "*": "Multiply", "/": "Divide"}
+
+_TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_]\w*)"
+    r"|(?P<op>[-+*/()])"
+    r"|(?P<other>\S)"
+    r")"
+)
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be parsed or evaluated"""
+
+
+@dataclass(frozen=True)
+class Constant:
+    """Numeric literal in an expression tree"""
+
+    value: float
+
+
+@dataclass(frozen=True)
+class Variable:
+    """Named input in an expression tree"""
+
+    name: str
+
+
+@dataclass(frozen=True)
+class Operation:
+    """Binary CalculationOperation applied to two sub-expressions"""
+
+    operation_type: str
+    left: "Node"
+    right: "Node"
+
+
+Node = Union[Constant, Variable, Operation]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    """Split an expression into (kind, value) tokens"""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        if kind == "other":
+            raise ExpressionError(f"Unexpected character: {match.group(kind)!r}")
+        tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser for + - * / expressions with parentheses"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def _peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+        return None
+
+    def _next(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise ExpressionError("Unexpected end of expression")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ExpressionError("Expression is empty")
+        node = self._expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected token: {self._peek()!r}")
+        return node
+
+    def _expression(self) -> Node:
+        node = self._term()
+        while self._peek() in ("+", "-"):
+            operator = self._next()[1]
+            node = Operation(OPERATORS[operator], node, self._term())
+        return node
+
+    def _term(self) -> Node:
+        node = self._factor()
+        while self._peek() in ("*", "/"):
+            operator = self._next()[1]
+            node = Operation(OPERATORS[operator], node, self._factor())
+        return node
+
+    def _factor(self) -> Node:
+        kind, value = self._next()
+        if kind == "number":
+            return Constant(float(value))
+        if kind == "name":
+            return Variable(value)
+        if value == "-":
+            # Multiplying by -1 keeps the sign of zero, unlike 0 - x
+            return Operation("Multiply", Constant(-1.0), self._factor())
+        if value == "+":
+            return self._factor()
+        if value == "(":
+            node = self._expression()
+            if self._next()[1] != ")":
+                raise ExpressionError("Expected ')'")
+            return node
+        raise ExpressionError(f"Unexpected token: {value!r}")
+
+
+def parse_expression(text: str) -> Node:
+    """
+    Parse an arithmetic expression into a tree of factory operations.
+
+    Args:
+        text (str): Expression such as "(a + b) * c / d"
+
+    Returns:
+        Node: Root of the expression tree
+
+    Raises:
+        ExpressionError: If the expression is malformed or nested too deeply
+    """
+    try:
+        return _Parser(text).parse()
+    except RecursionError:
+        raise ExpressionError("Expression is too deeply nested")
+
+
+class CompiledExpression:
+    """
+    Expression compiled into a flat register program.
+
+    Each instruction applies one CalculationOperation to two registers and
+    writes a third, so evaluation is a single loop with no tree walking or
+    per-step type dispatch.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        registers: List[float],
+        loads: List[Tuple[int, str]],
+        instructions: List[Tuple[int, str, int, int]],
+        result: int,
+    ):
+        self.text = text
+        self.variables = tuple(name for _, name in loads)
+        self._registers = registers
+        self._loads = loads
+        self._instructions = [
+            (out, CalculationFactory.get_operation(operation_type), a, b)
+            for out, operation_type, a, b in instructions
+        ]
+        self._result = result
+
+    def __len__(self) -> int:
+        """Number of operations executed per evaluation"""
+        return len(self._instructions)
+
+    def evaluate(self, variables: Mapping[str, float]) -> float:
+        """
+        Evaluate the program for one set of variable values.
+
+        Raises:
+            ExpressionError: If a variable has no value
+            ValueError: If the evaluation divides by zero
+        """
+        registers = self._registers.copy()
+        try:
+            for slot, name in self._loads:
+                registers[slot] = variables[name]
+        except KeyError as e:
+            raise ExpressionError(f"Missing value for variable: {e.args[0]}")
+        for out, operation, a, b in self._instructions:
+            registers[out] = operation.calculate(registers[a], registers[b])
+        return registers[self._result]
+
+    def evaluate_many(
+        self, columns: Mapping[str, Union[np.ndarray, Sequence[float]]]
+    ) -> BatchCalculationResult:
+        """
+        Evaluate the program over columns of variable values.
+
+        Every instruction runs as one vectorized operation kernel. Rows that
+        divide by zero at any step are flagged in the error mask.
+
+        Raises:
+            ExpressionError: If a variable column is missing or lengths differ
+        """
+        try:
+            loaded = {
+                name: np.asarray(columns[name], dtype=np.float64)
+                for _, name in self._loads
+            }
+        except KeyError as e:
+            raise ExpressionError(f"Missing values for variable: {e.args[0]}")
+        lengths = {column.shape for column in loaded.values()}
+        if len(lengths) > 1:
+            raise ExpressionError("Variable columns must have equal length")
+        shape = lengths.pop() if lengths else (1,)
+
+        registers = [np.full(shape, value) for value in self._registers]
+        for slot, name in self._loads:
+            registers[slot] = loaded[name]
+        errors = np.zeros(shape, dtype=bool)
+        for out, operation, a, b in self._instructions:
+            batch = operation.calculate_batch(registers[a], registers[b])
+            registers[out] = batch.results
+            errors |= batch.errors
+        return BatchCalculationResult(registers[self._result], errors)
+
+
+class _Compiler:
+    """Lowers an expression tree into register instructions"""
+
+    def __init__(self):
+        self.registers: List[float] = []
+        self.loads: List[Tuple[int, str]] = []
+        self.instructions: List[Tuple[int, str, int, int]] = []
+        # Structural key -> register, shared by identical sub-expressions
+        self.slots: Dict[Hashable, int] = {}
+
+    def _allocate(self, key: Hashable, value: float = 0.0) -> int:
+        slot = len(self.registers)
+        self.registers.append(value)
+        self.slots[key] = slot
+        return slot
+
+    def lower(self, node: Node) -> Tuple[Hashable, int]:
+        """Return the structural key and register holding node's value"""
+        # Post-order walk on an explicit stack: a flat sum of a thousand
+        # terms is a tree a thousand levels deep
+        lowered: Dict[int, Tuple[Hashable, int]] = {}
+        stack: List[Tuple[Node, bool]] = [(node, False)]
+        while stack:
+            current, children_lowered = stack.pop()
+            if isinstance(current, Operation) and not children_lowered:
+                stack.append((current, True))
+                stack.append((current.right, False))
+                stack.append((current.left, False))
+                continue
+            lowered[id(current)] = self._lower_node(current, lowered)
+        return lowered[id(node)]
+
+    def _lower_node(
+        self, node: Node, lowered: Mapping[int, Tuple[Hashable, int]]
+    ) -> Tuple[Hashable, int]:
+        """Lower one node whose operands are already in lowered"""
+        if isinstance(node, Constant):
+            key = ("const", node.value.hex())
+            if key not in self.slots:
+                self._allocate(key, node.value)
+            return key, self.slots[key]
+        if isinstance(node, Variable):
+            key = ("var", node.name)
+            if key not in self.slots:
+                self.loads.append((self._allocate(key), node.name))
+            return key, self.slots[key]
+
+        left_key, left = lowered[id(node.left)]
+        right_key, right = lowered[id(node.right)]
+        if left_key[0] == "const" and right_key[0] == "const":
+            operation = CalculationFactory.get_operation(node.operation_type)
+            try:
+                value = operation.calculate(self.registers[left], self.registers[right])
+            except ValueError:
+                pass  # Leave e.g. 1 / 0 for evaluation to report
+            else:
+                return self._lower_node(Constant(value), lowered)
+        # Equal sub-expressions already share a register, so operand slots
+        # identify them without nesting keys as deep as the tree
+        key = (node.operation_type, left, right)
+        if key not in self.slots:
+            out = self._allocate(key)
+            self.instructions.append((out, node.operation_type, left, right))
+        return key, self.slots[key]
+
+
+def compile_tree(node: Node, text: str = "") -> CompiledExpression:
+    """
+    Compile an expression tree with constant folding and common
+    sub-expression elimination.
+
+    Args:
+        node (Node): Root of the expression tree
+        text (str): Source text, kept for reference
+
+    Returns:
+        CompiledExpression: Program ready for repeated evaluation
+    """
+    compiler = _Compiler()
+    _, result = compiler.lower(node)
+    return CompiledExpression(
+        text, compiler.registers, compiler.loads, compiler.instructions, result
+    )
+
+
+_compiled_cache = LRUCache(256)
+
+
+def compile_expression(text: str) -> CompiledExpression:
+    """
+    Parse and compile an expression, reusing the program for repeated text.
+
+    Args:
+        text (str): Expression such as "(a + b) * c / d"
+
+    Returns:
+        CompiledExpression: Program ready for repeated evaluation
+
+    Raises:
+        ExpressionError: If the expression is malformed
+    """
+    program = _compiled_cache.get(text)
+    if program is None:
+        program = compile_tree(parse_expression(text), text)
+        _compiled_cache.put(text, program)
+    return program
+
+
+def compiled_cache_info() -> CacheStats:
+    """Return hit/miss/eviction counters for the compiled program cache"""
+    return _compiled_cache.stats()
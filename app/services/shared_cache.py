@@ -0,0 +1,186 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Hashable, Optional, Tuple, Union
+
+from app.services.cache import CacheStats
+
+# (succeeded, result or error message), as cached by CalculationFactory
+CachedResult = Tuple[bool, Union[float, str]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    succeeded INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_results_last_used ON results (last_used);
+"""
+
+
+def _encode_key(key: Hashable) -> str:
+    # Operand keys are floats, "nan" or "-0.0"; repr round-trips floats exactly
+    if isinstance(key, tuple):
+        return "|".join(repr(part) for part in key)
+    return repr(key)
+
+
+class SharedResultCache:
+    """Bounded result cache shared by every process on the host.
+
+    Entries live in a WAL-mode SQLite file, so uvicorn workers (and any other
+    process pointed at the same path) warm one cache between them and readers
+    never block the writer. Eviction is approximately least recently used: a
+    hit refreshes an entry's last-used time at most once per touch_interval,
+    and once every check_interval stores a process trims the oldest entries
+    so the file holds at most maxsize of them. Lookups and stores that fail
+    (for example on a lock held past the busy timeout) are counted in errors
+    and otherwise skipped, so the cache never fails a calculation.
+
+    Hit, miss and eviction counters are per process; currsize is shared.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int,
+        touch_interval: float = 1.0,
+        check_interval: int = 64,
+        busy_timeout: float = 0.1,
+    ):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.path = path
+        self.maxsize = maxsize
+        self.touch_interval = touch_interval
+        self.check_interval = check_interval
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._errors = 0
+        self._stores_since_check = 0
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened after a fork"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            # A cache can afford to lose the last writes on power loss
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(
+        self, key: Hashable, default: Optional[CachedResult] = None
+    ) -> Optional[CachedResult]:
+        """Return the cached result for key, or default"""
+        encoded = _encode_key(key)
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT succeeded, payload, last_used FROM results WHERE key = ?",
+                (encoded,),
+            ).fetchone()
+            if row is not None and row[2] < time.time() - self.touch_interval:
+                connection.execute(
+                    "UPDATE results SET last_used = ? WHERE key = ?",
+                    (time.time(), encoded),
+                )
+        except sqlite3.Error:
+            self._count("_errors")
+            row = None
+        if row is None:
+            self._count("_misses")
+            return default
+        self._count("_hits")
+        succeeded, payload, _ = row
+        return (True, float(payload)) if succeeded else (False, payload)
+
+    def put(self, key: Hashable, value: CachedResult) -> None:
+        """Store a result under key, trimming the oldest entries when over size"""
+        succeeded, payload = value
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (
+                    _encode_key(key),
+                    int(succeeded),
+                    repr(float(payload)) if succeeded else payload,
+                    time.time(),
+                ),
+            )
+        except sqlite3.Error:
+            self._count("_errors")
+            return
+        with self._lock:
+            self._stores_since_check += 1
+            check = self._stores_since_check >= self.check_interval
+            if check:
+                self._stores_since_check = 0
+        if check:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete the least recently used entries beyond maxsize"""
+        try:
+            connection = self._connection()
+            excess = len(self) - self.maxsize
+            if excess <= 0:
+                return 0
+            deleted = connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        except sqlite3.Error:
+            self._count("_errors")
+            return 0
+        self._count("_evictions", deleted)
+        return deleted
+
+    def clear(self) -> None:
+        """Drop every entry for all processes and reset this process's counters"""
+        with self._lock:
+            self._hits = self._misses = self._evictions = self._errors = 0
+            self._stores_since_check = 0
+        try:
+            self._connection().execute("DELETE FROM results")
+        except sqlite3.Error:
+            self._count("_errors")
+
+    @property
+    def errors(self) -> int:
+        """Lookups and stores that failed and were skipped"""
+        return self._errors
+
+    def stats(self) -> CacheStats:
+        """Return this process's counters and the shared entry count"""
+        return CacheStats(
+            self._hits, self._misses, self._evictions, len(self), self.maxsize
+        )
+
+    def __len__(self) -> int:
+        try:
+            return (
+                self._connection().execute("SELECT count(*) FROM results").fetchone()[0]
+            )
+        except sqlite3.Error:
+            return 0
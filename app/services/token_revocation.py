@@ -0,0 +1,265 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import UPSERT_INSERTS, SessionLocal
+from app.models.revoked_token_model import RevokedToken
+from app.services.bloom_filter import BloomFilter
+
+# How far back each refresh re-reads revoked_at, so rows stamped at the start
+# of a transaction that committed later are still picked up
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class RevocationStats(NamedTuple):
+    """Counters showing how often revocation checks avoided the database"""
+
+    filter_size: int
+    filter_negatives: int
+    database_checks: int
+    false_positives: int
+
+
+class TokenRevocationList:
+    """
+    Revoked token ids stored in the revoked_tokens table and mirrored in an
+    in-memory Bloom filter.
+
+    A jti the filter has never seen is confirmed "not revoked" without I/O;
+    only filter hits (real revocations and rare false positives) query the
+    table. Until the filter has been loaded every check goes to the database.
+
+    Revocations made by other processes reach this filter on the next
+    refresh, which reads only the rows revoked since the previous one; until
+    then a token revoked elsewhere is still accepted here.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        capacity: int = settings.token_revocation_capacity,
+        error_rate: float = settings.token_revocation_error_rate,
+    ):
+        self.session_factory = session_factory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        self._lock = threading.Lock()
+        # jtis revoked while a rebuild is reading the table
+        self._pending: Optional[List[str]] = None
+        # Latest revoked_at the filter has seen, in database time
+        self._synced_until: Optional[datetime] = None
+        self._filter_negatives = 0
+        self._database_checks = 0
+        self._false_positives = 0
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the Bloom filter reflects the revoked_tokens table"""
+        return self._filter is not None
+
+    def rebuild(self, db: Optional[Session] = None) -> int:
+        """
+        Reload the Bloom filter from the unexpired rows of revoked_tokens.
+
+        Args:
+            db (Optional[Session]): Session to read with, defaults to a new one
+
+        Returns:
+            int: Number of revoked tokens loaded
+        """
+        with self._lock:
+            self._pending = []
+        query = select(RevokedToken.jti, RevokedToken.revoked_at).where(
+            RevokedToken.expires_at > time.time()
+        )
+        try:
+            if db is None:
+                with self.session_factory() as session:
+                    rows = session.execute(query).all()
+            else:
+                rows = db.execute(query).all()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+
+        # Leave room to grow so the false positive rate holds until the next
+        # rebuild
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        for row in rows:
+            bloom.add(row.jti)
+        with self._lock:
+            for jti in self._pending:
+                bloom.add(jti)
+            self._pending = None
+            self._filter = bloom
+            self._synced_until = _latest(rows, None)
+        return len(rows)
+
+    def refresh(self, db: Optional[Session] = None) -> int:
+        """
+        Add revocations committed since the last refresh to the filter.
+
+        Only rows revoked after the latest one seen (less REFRESH_OVERLAP) are
+        read, so this is cheap enough to run every few seconds. Builds the
+        filter instead if it is not loaded.
+
+        Args:
+            db (Optional[Session]): Session to read with, defaults to a new one
+
+        Returns:
+            int: Number of revocations read
+        """
+        if db is None:
+            with self.session_factory() as session:
+                return self.refresh(session)
+        with self._lock:
+            bloom, synced_until = self._filter, self._synced_until
+        if bloom is None:
+            return self.rebuild(db)
+
+        query = select(RevokedToken.jti, RevokedToken.revoked_at)
+        if synced_until is not None:
+            query = query.where(
+                RevokedToken.revoked_at >= synced_until - REFRESH_OVERLAP
+            )
+        rows = db.execute(query).all()
+        for row in rows:
+            # The overlap re-reads recent rows; don't count them twice
+            if row.jti not in bloom:
+                bloom.add(row.jti)
+        with self._lock:
+            # A concurrent rebuild has replaced the filter and the watermark
+            if self._filter is bloom:
+                self._synced_until = _latest(rows, self._synced_until)
+        return len(rows)
+
+    def load(self, session_factory: Callable[[], Session]) -> bool:
+        """
+        Use session_factory for revocation checks and build the filter.
+
+        A failed load is not fatal: checks keep querying the database until a
+        later rebuild succeeds.
+
+        Returns:
+            bool: Whether the filter was built
+        """
+        self.session_factory = session_factory
+        try:
+            self.rebuild()
+        except SQLAlchemyError:
+            return False
+        return True
+
+    def revoke(self, db: Session, jti: str, expires_at: float) -> None:
+        """
+        Record jti as revoked until expires_at and commit.
+
+        Args:
+            db (Session): Database session
+            jti (str): Token id from the jti claim
+            expires_at (float): Token exp claim in Unix seconds
+        """
+        # Mark the filter first so no check can miss a committed revocation
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(jti)
+            bloom = self._filter
+        if bloom is not None:
+            bloom.add(jti)
+
+        row = {"jti": jti, "expires_at": int(expires_at)}
+        dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            db.execute(
+                dialect_insert(RevokedToken).values(row).on_conflict_do_nothing()
+            )
+        else:
+            db.merge(RevokedToken(**row))
+        db.commit()
+
+    def is_revoked(self, jti: str, db: Optional[Session] = None) -> bool:
+        """
+        Return whether jti has been revoked.
+
+        Args:
+            jti (str): Token id from the jti claim
+            db (Optional[Session]): Session used on a filter hit, defaults to
+                a new session from session_factory
+
+        Returns:
+            bool: True if a revocation for jti is stored
+        """
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            self._filter_negatives += 1
+            return False
+
+        self._database_checks += 1
+        query = select(RevokedToken.jti).where(RevokedToken.jti == jti)
+        if db is None:
+            with self.session_factory() as session:
+                revoked = session.scalar(query) is not None
+        else:
+            revoked = db.scalar(query) is not None
+        if not revoked and bloom is not None:
+            self._false_positives += 1
+        return revoked
+
+    def compact(self, db: Optional[Session] = None) -> int:
+        """
+        Delete revocations of tokens that have expired and rebuild the filter.
+
+        Expired tokens fail verification on their own, so their rows and
+        filter bits are dead weight. The rebuild also picks up revocations
+        made by other processes.
+
+        Args:
+            db (Optional[Session]): Database session, defaults to a new one
+
+        Returns:
+            int: Number of rows deleted
+        """
+        if db is None:
+            with self.session_factory() as session:
+                return self.compact(session)
+        result = db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= time.time())
+        )
+        db.commit()
+        self.rebuild(db)
+        return result.rowcount
+
+    def clear(self) -> None:
+        """Forget the in-memory filter; checks query the database until rebuilt"""
+        with self._lock:
+            self._filter = None
+            self._synced_until = None
+
+    def stats(self) -> RevocationStats:
+        """Return filter size and how many checks needed the database"""
+        bloom = self._filter
+        return RevocationStats(
+            filter_size=len(bloom) if bloom is not None else 0,
+            filter_negatives=self._filter_negatives,
+            database_checks=self._database_checks,
+            false_positives=self._false_positives,
+        )
+
+
+def _latest(rows, since: Optional[datetime]) -> Optional[datetime]:
+    """Return the newest revoked_at among rows, or since if none is newer"""
+    stamps = [row.revoked_at for row in rows if row.revoked_at is not None]
+    if since is not None:
+        stamps.append(since)
+    return max(stamps, default=None)
+
+
+revocation_list = TokenRevocationList()
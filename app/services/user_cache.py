@@ -0,0 +1,123 @@
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.config import settings
+from app.models.user_model import User
+from app.services.cache import CacheStats, LRUCache
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+class UserCache:
+    """
+    In-process cache of user rows indexed by id, username and email.
+
+    Rows are stored as plain column snapshots and re-attached to the caller's
+    session with ``Session.merge(load=False)``, so a hit returns a normal
+    persistent User without querying the users table. A user the session
+    already holds is returned as is, keeping its unflushed changes. Entries expire after
+    ``ttl`` seconds and the cache holds at most ``maxsize`` users.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._rows = LRUCache(maxsize)
+        self._ids = LRUCache(maxsize * 2)
+
+    def _lookup(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the cached snapshot for a user by id, username or email"""
+        user_id = value if field == "id" else self._ids.get((field, value))
+        if user_id is None:
+            return None
+        row = self._rows.get(user_id)
+        # A stale secondary index entry points at a row that has changed
+        if row is None or row[field] != value:
+            return None
+        return row
+
+    def _instance(self, row: Dict[str, Any]) -> User:
+        user = User(**row)
+        make_transient_to_detached(user)
+        return user
+
+    def get(self, db: Session, field: str, value: Any) -> Optional[User]:
+        """Return a session-attached User from the cache, or None on a miss"""
+        row = self._lookup(field, value)
+        if row is None:
+            return None
+        # Merging would copy the snapshot over unflushed changes
+        held = db.identity_map.get(identity_key(User, row["id"]))
+        if held is not None:
+            return held
+        return db.merge(self._instance(row), load=False)
+
+    async def get_async(self, db, field: str, value: Any) -> Optional[User]:
+        """Async-session counterpart of get"""
+        row = self._lookup(field, value)
+        if row is None:
+            return None
+        held = db.identity_map.get(identity_key(User, row["id"]))
+        if held is not None:
+            return held
+        return await db.merge(self._instance(row), load=False)
+
+    def store(self, user: User) -> None:
+        """Cache a user freshly loaded from the database"""
+        state = inspect(user)
+        if not state.persistent or state.modified:
+            return
+        if any(key not in state.dict for key in _USER_COLUMNS):
+            return  # Expired or deferred attributes would need a query
+        row = {key: state.dict[key] for key in _USER_COLUMNS}
+        expires_at = time.time() + self.ttl
+        self._rows.put(row["id"], row, expires_at=expires_at)
+        self._ids.put(("username", row["username"]), row["id"], expires_at)
+        self._ids.put(("email", row["email"]), row["id"], expires_at)
+
+    def invalidate(self, user_id: Hashable) -> None:
+        """Drop a user; secondary index entries die with the row"""
+        self._rows.pop(user_id)
+
+    def clear(self) -> None:
+        """Drop every cached user"""
+        self._rows.clear()
+        self._ids.clear()
+
+    def stats(self) -> CacheStats:
+        """Return hit/miss/eviction counters for cached user rows"""
+        return self._rows.stats()
+
+
+user_cache: Optional[UserCache] = (
+    UserCache(settings.user_cache_size, settings.user_cache_ttl)
+    if settings.user_cache_size > 0
+    else None
+)
+
+
+def _invalidate_on_write(mapper, connection, target: User) -> None:
+    """Write-through invalidation for every ORM insert, update and delete"""
+    if user_cache is None or target.id is None:
+        return
+    user_cache.invalidate(target.id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("written_user_ids", set()).add(target.id)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(User, _event_name, _invalidate_on_write)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    # Invalidate again once the write is visible, in case another session
+    # re-cached the old row between the flush and the commit
+    written = session.info.pop("written_user_ids", None)
+    if user_cache is not None and written:
+        for user_id in written:
+            user_cache.invalidate(user_id)
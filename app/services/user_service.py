@@ -1,11 +1,25 @@
-from typing import Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload
 
+from app.database import UPSERT_INSERTS, replica_reads
 from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate
-from app.services.auth_service import hash_password, verify_password
+from app.schemas.user_schemas import UserCreate, UserImportResult
+from app.schemas.validation import validation_error_message
+from app.services.auth_service import (
+    PasswordWorkerPool,
+    hash_password,
+    hash_password_async,
+    hash_passwords,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
+from app.services.user_cache import user_cache
 
 
 def create_user(db: Session, user: UserCreate) -> User:
@@ -33,12 +47,149 @@ def create_user(db: Session, user: UserCreate) -> User:
         return db_user
     except IntegrityError as e:
         db.rollback()
-        if "username" in str(e.orig):
-            raise ValueError("Username already exists")
-        elif "email" in str(e.orig):
-            raise ValueError("Email already exists")
+        _raise_duplicate_user_error(e)
+
+
+def _raise_duplicate_user_error(error: IntegrityError):
+    """Translate a users-table IntegrityError into a ValueError"""
+    if "username" in str(error.orig):
+        raise ValueError("Username already exists")
+    elif "email" in str(error.orig):
+        raise ValueError("Email already exists")
+    else:
+        raise ValueError("User creation failed")
+
+
+USER_IMPORT_BATCH_SIZE = 500
+
+
+def _validated_batches(
+    records: Iterable[Any], batch_size: int, results: List[UserImportResult]
+) -> Iterator[List[tuple]]:
+    """Validate records lazily, yielding (result, UserCreate) batches"""
+    records = iter(enumerate(records))
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            return
+        batch = []
+        for index, record in chunk:
+            result = UserImportResult(index=index, status="error")
+            results.append(result)
+            try:
+                user = UserCreate.model_validate(record)
+            except ValidationError as e:
+                if isinstance(record, dict):
+                    result.username = record.get("username")
+                result.error = validation_error_message(e)
+                continue
+            result.username = user.username
+            batch.append((result, user))
+        yield batch
+
+
+def _drop_conflicts(db: Session, batch: List[tuple]) -> List[tuple]:
+    """Mark users clashing with stored or earlier rows; return the rest"""
+    usernames = {user.username for _, user in batch}
+    emails = {user.email for _, user in batch}
+    taken = db.execute(
+        select(User.username, User.email).where(
+            or_(User.username.in_(usernames), User.email.in_(emails))
+        )
+    ).all()
+    taken_usernames = {row.username for row in taken}
+    taken_emails = {row.email for row in taken}
+
+    accepted = []
+    for result, user in batch:
+        if user.username in taken_usernames:
+            result.error = "Username already exists"
+        elif user.email in taken_emails:
+            result.error = "Email already exists"
         else:
-            raise ValueError("User creation failed")
+            accepted.append((result, user))
+        # Later rows in the same import lose to the first occurrence
+        taken_usernames.add(user.username)
+        taken_emails.add(user.email)
+    return accepted
+
+
+def _insert_users(db: Session, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Insert user rows in one statement; return ids keyed by username"""
+    dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        # Rows that lost a race with a concurrent writer are skipped here
+        # and reported as conflicts by the caller
+        statement = dialect_insert(User).on_conflict_do_nothing()
+    else:
+        statement = insert(User)
+    statement = statement.returning(User.id, User.username)
+    return {row.username: row.id for row in db.execute(statement, rows)}
+
+
+def create_users_bulk(
+    db: Session,
+    records: Iterable[Any],
+    batch_size: int = USER_IMPORT_BATCH_SIZE,
+    hash_pool: Optional[PasswordWorkerPool] = None,
+) -> List[UserImportResult]:
+    """
+    Create many users with parallel hashing and batched inserts.
+
+    Records are validated with UserCreate as they are read. Each batch is
+    checked for username and email conflicts with one query, hashed across
+    the worker processes and inserted with a single multi-row INSERT, then
+    committed. Conflicting or invalid rows are reported per row and never
+    abort the import.
+
+    Args:
+        db (Session): Database session
+        records (Iterable[Any]): User payloads (dicts or UserCreate)
+        batch_size (int): Users validated, hashed and inserted per batch
+        hash_pool (Optional[PasswordWorkerPool]): Pool used for hashing,
+            defaults to the shared password worker pool
+
+    Returns:
+        List[UserImportResult]: Status of every record, in input order
+    """
+    results: List[UserImportResult] = []
+    for batch in _validated_batches(records, batch_size, results):
+        accepted = _drop_conflicts(db, batch)
+        if not accepted:
+            continue
+        hashes = hash_passwords([user.password for _, user in accepted], hash_pool)
+        ids = _insert_users(
+            db,
+            [
+                {
+                    "username": user.username,
+                    "email": user.email,
+                    "password_hash": password_hash,
+                }
+                for (_, user), password_hash in zip(accepted, hashes)
+            ],
+        )
+        db.commit()
+        for result, user in accepted:
+            if user.username in ids:
+                result.status = "created"
+                result.id = ids[user.username]
+            else:
+                result.error = "User creation failed"
+    return results
+
+
+def _cached_lookup(db: Session, field: str, value, criterion) -> Optional[User]:
+    """Look a user up in the user cache, falling back to the database"""
+    if user_cache is not None:
+        user = user_cache.get(db, field, value)
+        if user is not None:
+            return user
+    with replica_reads(db):
+        user = db.query(User).filter(criterion).first()
+    if user is not None and user_cache is not None:
+        user_cache.store(user)
+    return user
 
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
@@ -52,7 +203,7 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
     Returns:
         Optional[User]: User object if found, None otherwise
     """
-    return db.query(User).filter(User.username == username).first()
+    return _cached_lookup(db, "username", username, User.username == username)
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
@@ -66,7 +217,7 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     Returns:
         Optional[User]: User object if found, None otherwise
     """
-    return db.query(User).filter(User.email == email).first()
+    return _cached_lookup(db, "email", email, User.email == email)
 
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -84,8 +235,13 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = verify_and_update_password(password, user.password_hash)
+    if not verified:
         return None
+    if new_hash is not None:
+        # Transparently upgrade hashes made with an outdated bcrypt cost
+        user.password_hash = new_hash
+        db.commit()
     return user
 
 
@@ -100,4 +256,156 @@ def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     Returns:
         Optional[User]: User object if found, None otherwise
     """
-    return db.query(User).filter(User.id == user_id).first()
+    return _cached_lookup(db, "id", user_id, User.id == user_id)
+
+
+def list_users(
+    db: Session, skip: int = 0, limit: int = 100, with_calculations: bool = False
+) -> List[User]:
+    """
+    List users by id, optionally with their calculations.
+
+    With with_calculations the calculations of the whole page are loaded by
+    one extra SELECT ... WHERE user_id IN (...) instead of one query per
+    user. Without it, touching User.calculations raises instead of quietly
+    issuing a query per row.
+
+    Args:
+        db (Session): Database session
+        skip (int): Number of users to skip
+        limit (int): Maximum number of users to return
+        with_calculations (bool): Eagerly load User.calculations
+
+    Returns:
+        List[User]: Users ordered by id
+    """
+    loader = selectinload if with_calculations else raiseload
+    query = (
+        select(User)
+        .options(loader(User.calculations))
+        .order_by(User.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    with replica_reads(db):
+        return list(db.scalars(query))
+
+
+# Async counterparts for use with AsyncSession. Password hashing is CPU-bound,
+# so it runs in the password worker pool instead of on the event loop.
+
+
+async def create_user_async(db: AsyncSession, user: UserCreate) -> User:
+    """
+    Create a new user in the database using an async session.
+
+    Args:
+        db (AsyncSession): Async database session
+        user (UserCreate): User data to create
+
+    Returns:
+        User: Created user object
+
+    Raises:
+        ValueError: If username or email already exists
+    """
+    hashed_password = await hash_password_async(user.password)
+    db_user = User(
+        username=user.username, email=user.email, password_hash=hashed_password
+    )
+    try:
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+    except IntegrityError as e:
+        await db.rollback()
+        _raise_duplicate_user_error(e)
+
+
+async def _cached_lookup_async(
+    db: AsyncSession, field: str, value, criterion
+) -> Optional[User]:
+    """Async counterpart of _cached_lookup"""
+    if user_cache is not None:
+        user = await user_cache.get_async(db, field, value)
+        if user is not None:
+            return user
+    with replica_reads(db):
+        result = await db.execute(select(User).where(criterion))
+    user = result.scalars().first()
+    if user is not None and user_cache is not None:
+        user_cache.store(user)
+    return user
+
+
+async def get_user_by_username_async(db: AsyncSession, username: str) -> Optional[User]:
+    """
+    Get a user by username using an async session.
+
+    Args:
+        db (AsyncSession): Async database session
+        username (str): Username to search for
+
+    Returns:
+        Optional[User]: User object if found, None otherwise
+    """
+    return await _cached_lookup_async(
+        db, "username", username, User.username == username
+    )
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    """
+    Get a user by email using an async session.
+
+    Args:
+        db (AsyncSession): Async database session
+        email (str): Email to search for
+
+    Returns:
+        Optional[User]: User object if found, None otherwise
+    """
+    return await _cached_lookup_async(db, "email", email, User.email == email)
+
+
+async def get_user_by_id_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    """
+    Get a user by ID using an async session.
+
+    Args:
+        db (AsyncSession): Async database session
+        user_id (int): User ID to search for
+
+    Returns:
+        Optional[User]: User object if found, None otherwise
+    """
+    return await _cached_lookup_async(db, "id", user_id, User.id == user_id)
+
+
+async def authenticate_user_async(
+    db: AsyncSession, username: str, password: str
+) -> Optional[User]:
+    """
+    Authenticate a user with username and password using an async session.
+
+    Args:
+        db (AsyncSession): Async database session
+        username (str): Username to authenticate
+        password (str): Plain text password
+
+    Returns:
+        Optional[User]: User object if authenticated, None otherwise
+    """
+    user = await get_user_by_username_async(db, username)
+    if not user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(
+        password, user.password_hash
+    )
+    if not verified:
+        return None
+    if new_hash is not None:
+        user.password_hash = new_hash
+        await db.commit()
+    return user
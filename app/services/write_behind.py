@@ -0,0 +1,215 @@
+import asyncio
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.calculation_service import persist_calculations
+
+# Queued by stop() so the flusher drains what is left and exits
+_STOP = object()
+
+# Errors caused by the rows themselves, worth retrying with fewer rows
+_ROW_ERRORS = (IntegrityError, DataError)
+
+
+class WriteBehindFullError(RuntimeError):
+    """Raised when the write-behind buffer stays full for the enqueue timeout"""
+
+
+class WriteBehindStats(NamedTuple):
+    """Counters describing the write-behind buffer"""
+
+    running: bool
+    pending: int
+    enqueued: int
+    flushed: int
+    batches: int
+    failed_rows: int
+    last_error: Optional[str]
+
+
+class WriteBehindBuffer:
+    """
+    In-process buffer that persists calculation rows in batches.
+
+    Request handlers enqueue computed rows and return without waiting for the
+    database. A background task writes the buffer as one batched INSERT once
+    max_rows rows are waiting or flush_interval_ms has passed since the first
+    of them arrived, whichever comes first. The buffer holds at most
+    max_pending rows; enqueue waits for room and gives up after
+    enqueue_timeout, so a slow database pushes back on callers instead of
+    growing memory. stop() flushes everything still queued.
+
+    Rows are only as durable as the process until their batch commits: a
+    crash loses what is queued, and a failed batch is counted and dropped.
+    A batch rejected because of its rows (e.g. a constraint violation) is
+    split in halves and retried, so only the offending rows are lost.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_rows: int = settings.write_behind_max_rows,
+        flush_interval_ms: float = settings.write_behind_flush_ms,
+        max_pending: int = settings.write_behind_max_pending,
+        enqueue_timeout: float = settings.write_behind_enqueue_timeout,
+    ):
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = True
+        self._enqueued = 0
+        self._flushed = 0
+        self._batches = 0
+        self._failed_rows = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether rows are currently accepted"""
+        return not self._closed
+
+    def start(self, session_factory: Optional[Callable[[], Session]] = None) -> None:
+        """
+        Start the background flusher on the running event loop.
+
+        Args:
+            session_factory: Callable returning the sessions batches are
+                written with, defaults to the one given at construction
+        """
+        if self.running:
+            return
+        if session_factory is not None:
+            self.session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._closed = False
+        self._flusher = asyncio.create_task(self._run())
+
+    async def enqueue(self, row: Dict[str, Any]) -> None:
+        """
+        Queue a calculation row for the next batch.
+
+        Args:
+            row (Dict[str, Any]): Calculation column values
+
+        Raises:
+            WriteBehindFullError: If the buffer stays full for enqueue_timeout
+            RuntimeError: If the buffer is not running
+        """
+        if self._closed:
+            raise RuntimeError("Write-behind buffer is not running")
+        try:
+            await asyncio.wait_for(self._queue.put(row), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteBehindFullError("Write-behind buffer is full")
+        self._enqueued += 1
+
+    async def stop(self) -> None:
+        """Stop accepting rows, flush everything queued and wait for it"""
+        if self._closed:
+            return
+        self._closed = True
+        # Blocks while the buffer is full; the flusher keeps making room
+        await self._queue.put(_STOP)
+        await self._flusher
+        self._flusher = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._queue.get()
+            if row is _STOP:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval_ms / 1000
+            stopping = False
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+            if stopping:
+                break
+        # Callers that were waiting for room when stop() ran still get in
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            await self._flush(batch)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while not self._queue.empty():
+            row = self._queue.get_nowait()
+            if row is not _STOP:
+                batch.append(row)
+        return batch
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        for start in range(0, len(batch), self.max_rows):
+            chunk = batch[start : start + self.max_rows]
+            written, batches, error = await asyncio.to_thread(
+                self._write_isolating, chunk
+            )
+            self._flushed += written
+            self._batches += batches
+            if written < len(chunk):
+                self._failed_rows += len(chunk) - written
+                self._last_error = error
+
+    def _write_isolating(
+        self, rows: List[Dict[str, Any]]
+    ) -> Tuple[int, int, Optional[str]]:
+        """Write rows, bisecting on row errors; return (written, batches, error)"""
+        try:
+            self._write(rows)
+        except _ROW_ERRORS as e:
+            if len(rows) == 1:
+                return 0, 0, str(e)
+            middle = len(rows) // 2
+            first = self._write_isolating(rows[:middle])
+            second = self._write_isolating(rows[middle:])
+            return (
+                first[0] + second[0],
+                first[1] + second[1],
+                second[2] or first[2],
+            )
+        except Exception as e:
+            # Not caused by particular rows, so smaller batches would fail too
+            return 0, 0, str(e)
+        return len(rows), 1, None
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        with self.session_factory() as db:
+            persist_calculations(db, rows, chunk_size=len(rows))
+            db.commit()
+
+    def stats(self) -> WriteBehindStats:
+        """Return queue depth and how many rows were written or lost"""
+        return WriteBehindStats(
+            running=self.running,
+            pending=self._queue.qsize() if self._queue is not None else 0,
+            enqueued=self._enqueued,
+            flushed=self._flushed,
+            batches=self._batches,
+            failed_rows=self._failed_rows,
+            last_error=self._last_error,
+        )
+
+
+calculation_buffer = WriteBehindBuffer()
@@ -0,0 +1,143 @@
+"""Load-test user lookups through the sync and async database paths.
+
+Builds a small FastAPI app exposing the same lookup twice: a sync endpoint
+using get_db (run in FastAPI's threadpool) and an async endpoint using an
+AsyncSession. Both are driven in-process with many concurrent clients.
+
+The in-process user cache is disabled so both passes measure database
+lookups; with --user-cache it is kept and emptied before each pass.
+
+Usage:
+    python benchmarks/bench_async_db.py --requests 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, to_async_url  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services import user_service  # noqa: E402
+from app.services.user_service import (  # noqa: E402
+    get_user_by_username,
+    get_user_by_username_async,
+)
+
+USER_COUNT = 1000
+
+
+def build_app(url):
+    """Seed a database at url and return an app serving it both ways"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "password_hash": "x",
+                }
+                for i in range(USER_COUNT)
+            ],
+        )
+    session_factory = sessionmaker(bind=engine)
+    async_session_factory = async_sessionmaker(create_async_engine(to_async_url(url)))
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/users/{username}")
+    def sync_lookup(username: str, db=Depends(get_db)):
+        return {"id": get_user_by_username(db, username).id}
+
+    @app.get("/async/users/{username}")
+    async def async_lookup(username: str, db=Depends(get_async_db)):
+        return {"id": (await get_user_by_username_async(db, username)).id}
+
+    return app
+
+
+async def drive(app, prefix, total, concurrency):
+    """Issue total requests with the given concurrency; return latencies"""
+    latencies = []
+    counter = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def worker():
+            for i in counter:
+                start = time.perf_counter()
+                response = await c.get(f"{prefix}/users/user{i % USER_COUNT}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, sorted(latencies)
+
+
+def report(label, elapsed, latencies):
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{label:<6} {len(latencies) / elapsed:>9,.0f} req/s  "
+        f"p50={statistics.median(latencies) * 1000:.1f}ms  p99={p99 * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--database-url", help="Database to seed (defaults to a temp SQLite file)"
+    )
+    parser.add_argument(
+        "--user-cache",
+        action="store_true",
+        help="Serve repeat lookups from the in-process user cache",
+    )
+    args = parser.parse_args()
+    user_cache = user_service.user_cache if args.user_cache else None
+    user_service.user_cache = user_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{tmp}/bench.db"
+        app = build_app(url)
+        print(f"{args.requests:,} lookups, {args.concurrency} concurrent clients")
+        for label, prefix in (("sync", "/sync"), ("async", "/async")):
+            if user_cache is not None:
+                # Keep the first pass from warming the cache for the second
+                user_cache.clear()
+            elapsed, latencies = asyncio.run(
+                drive(app, prefix, args.requests, args.concurrency)
+            )
+            report(label, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Measure bcrypt hash latency and per-core throughput at each cost factor.
+
+Prints the time of one hash and the resulting hashes/sec per core for every
+cost in the range, plus the cost calibrate_bcrypt_rounds would pick for the
+given budget. Use it to choose BCRYPT_ROUNDS.
+
+Usage:
+    python benchmarks/bench_bcrypt_cost.py --max-rounds 14 --target-ms 250
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.auth_service import (  # noqa: E402
+    calibrate_bcrypt_rounds,
+    time_bcrypt_hash,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'cost':>4} {'ms/hash':>10} {'hashes/s/core':>14}")
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        seconds = time_bcrypt_hash(rounds, samples=args.samples)
+        print(f"{rounds:>4} {seconds * 1000:>10.1f} {1 / seconds:>14.1f}")
+
+    chosen = calibrate_bcrypt_rounds(args.target_ms / 1000)
+    print(f"calibrated cost for a {args.target_ms:g}ms budget: {chosen}")
+
+
+if __name__ == "__main__":
+    main()
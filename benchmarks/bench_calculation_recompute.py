@@ -0,0 +1,106 @@
+"""Benchmark recomputing results for a large set of loaded Calculation rows.
+
+Compares the former string-comparison chain in Calculation.calculate_result
+with the registry dispatch it now shares with CalculationFactory, plus the
+column-wise CalculationFactory.calculate_batch path.
+
+Usage:
+    python benchmarks/bench_calculation_recompute.py --rows 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base  # noqa: E402
+from app.models import Calculation  # noqa: E402
+from app.services.calculation_factory import CalculationFactory  # noqa: E402
+
+OPERATION_TYPES = ["Add", "Sub", "Multiply", "Divide"]
+
+
+def legacy_calculate_result(calc):
+    """The if/elif chain Calculation.calculate_result used before the registry"""
+    if calc.type == "Add":
+        return calc.a + calc.b
+    elif calc.type == "Sub":
+        return calc.a - calc.b
+    elif calc.type == "Multiply":
+        return calc.a * calc.b
+    elif calc.type == "Divide":
+        if calc.b == 0:
+            raise ValueError("Division by zero is not allowed")
+        return calc.a / calc.b
+    else:
+        raise ValueError(f"Unsupported operation type: {calc.type}")
+
+
+def load_rows(count):
+    """Seed an in-memory database and load every row as a Calculation"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    rows = [
+        {
+            "a": rng.uniform(-1000, 1000),
+            "b": rng.uniform(1, 1000),
+            "type": rng.choice(OPERATION_TYPES),
+        }
+        for _ in range(count)
+    ]
+    session = sessionmaker(bind=engine)()
+    session.execute(insert(Calculation), rows)
+    session.commit()
+    return session.query(Calculation).all()
+
+
+def measure(label, func, calculations, repeat):
+    """Run func over all rows repeat times and report the best throughput"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(calculations)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {len(calculations) / best:>14,.0f} rows/s  ({best:.3f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    calculations = load_rows(args.rows)
+    print(f"Recomputing {len(calculations):,} loaded Calculation rows")
+
+    measure(
+        "if/elif chain (before)",
+        lambda calcs: [legacy_calculate_result(c) for c in calcs],
+        calculations,
+        args.repeat,
+    )
+    measure(
+        "registry dispatch (after)",
+        lambda calcs: [c.calculate_result() for c in calcs],
+        calculations,
+        args.repeat,
+    )
+    measure(
+        "calculate_batch",
+        lambda calcs: CalculationFactory.calculate_batch(
+            [c.a for c in calcs], [c.b for c in calcs], [c.type for c in calcs]
+        ),
+        calculations,
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
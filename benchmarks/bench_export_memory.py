@@ -0,0 +1,104 @@
+"""Compare peak memory of exporting calculations with and without streaming.
+
+The "materialised" export loads every row as a Calculation, converts it to a
+CalculationRead and writes CSV, which is what a naive endpoint would do. The
+streaming export is export_calculations, which encodes result tuples one
+cursor chunk at a time. Peak Python allocations are measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_export_memory.py --rows 500000 --chunk-size 10000
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base  # noqa: E402
+from app.models import Calculation  # noqa: E402
+from app.schemas.calculation_schemas import CalculationRead  # noqa: E402
+from app.services.export_service import export_calculations  # noqa: E402
+
+OPERATION_TYPES = ["Add", "Sub", "Multiply", "Divide"]
+
+
+def seed(url, count):
+    """Create a database at url holding count calculations"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        for start in range(0, count, 50_000):
+            connection.execute(
+                insert(Calculation),
+                [
+                    {
+                        "a": rng.uniform(-1000, 1000),
+                        "b": rng.uniform(1, 1000),
+                        "type": rng.choice(OPERATION_TYPES),
+                        "result": 0.0,
+                    }
+                    for _ in range(min(50_000, count - start))
+                ],
+            )
+    return sessionmaker(bind=engine)
+
+
+def materialised_export(session_factory, chunk_size):
+    """Load every row as an ORM object and schema before writing any output"""
+    with session_factory() as db:
+        items = [CalculationRead.model_validate(c) for c in db.query(Calculation).all()]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for item in items:
+        writer.writerow(item.model_dump().values())
+    yield buffer.getvalue().encode()
+
+
+def measure(label, export, session_factory, chunk_size):
+    """Drain an export, discarding the output, and report time and peak memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in export(session_factory, chunk_size))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<16} {peak / 2**20:>9.1f} MiB peak  {elapsed:>7.2f}s  "
+        f"{size / 2**20:>8.1f} MiB written"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory = seed(f"sqlite:///{tmp}/export.db", args.rows)
+        print(f"Exporting {args.rows:,} calculations")
+        measure("materialised", materialised_export, session_factory, args.chunk_size)
+        for export_format in ("csv", "arrow"):
+            measure(
+                f"streaming {export_format}",
+                lambda factory, size: export_calculations(
+                    factory, export_format, chunk_size=size
+                ),
+                session_factory,
+                args.chunk_size,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Measure concurrent SQLite insert and read throughput with and without the profile.
+
+Writer threads insert one calculation per transaction, as the request
+handlers do, while reader threads page through a user's history. Each run
+uses a fresh database file; the "default" run opens connections with
+SQLite's stock settings (rollback journal, synchronous=FULL) and the
+"profile" run with the pragmas from app.database.sqlite_pragmas.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py --writers 4 --readers 4 --seconds 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings  # noqa: E402
+from app.database import Base, configure_sqlite, engine_options  # noqa: E402
+from app.models import Calculation, User  # noqa: E402
+
+USER_COUNT = 100
+SEED_ROWS = 50_000
+
+
+def build_engine(path, profile):
+    """Create and seed a database file, with or without the profile"""
+    url = f"sqlite:///{path}"
+    settings.sqlite_profile = profile
+    engine = create_engine(url, **engine_options(url))
+    configure_sqlite(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "username": f"u{i}",
+                    "email": f"u{i}@example.com",
+                    "password_hash": "x",
+                }
+                for i in range(USER_COUNT)
+            ],
+        )
+        connection.execute(
+            insert(Calculation),
+            [
+                {
+                    "a": rng.random(),
+                    "b": 1.0,
+                    "type": "Add",
+                    "result": 0.0,
+                    "user_id": rng.randint(1, USER_COUNT),
+                }
+                for _ in range(SEED_ROWS)
+            ],
+        )
+    return engine
+
+
+def run(engine, writers, readers, seconds):
+    """Run writer and reader threads for a while; return per-kind counts"""
+    counts = {"inserts": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def write():
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            row = {
+                "a": rng.random(),
+                "b": 1.0,
+                "type": "Add",
+                "result": 0.0,
+                "user_id": rng.randint(1, USER_COUNT),
+            }
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(Calculation), row)
+            except OperationalError:
+                bump("errors")
+            else:
+                bump("inserts")
+
+    def read():
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            query = (
+                select(Calculation.id, Calculation.result)
+                .where(Calculation.user_id == rng.randint(1, USER_COUNT))
+                .order_by(Calculation.created_at.desc(), Calculation.id.desc())
+                .limit(50)
+            )
+            try:
+                with engine.connect() as connection:
+                    connection.execute(query).all()
+            except OperationalError:
+                bump("errors")
+            else:
+                bump("reads")
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per run")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, profile in (("default", False), ("profile", True)):
+            engine = build_engine(os.path.join(tmp, f"{label}.db"), profile)
+            try:
+                counts = run(engine, args.writers, args.readers, args.seconds)
+            finally:
+                engine.dispose()
+            print(
+                f"{label:<8} {counts['inserts'] / args.seconds:>10,.0f} inserts/s"
+                f"  {counts['reads'] / args.seconds:>10,.0f} reads/s"
+                f"  {counts['errors']:>5} errors"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,103 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import (
+    BackgroundTasks,
+    Depends,
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import (
+    async_engine,
+    async_replica_engine,
+    engine,
+    get_db,
+    get_session_factory,
+    pool_metrics,
+    replica_engine,
+)
+from app.schemas.calculation_schemas import (
+    CalculationBatchResponse,
+    CalculationCreate,
+    CalculationCreated,
+    CalculationPage,
+    CalculationStatsRead,
+)
+from app.services import backfill_service
+from app.services.auth_service import password_worker_pool
+from app.services.calculation_service import (
+    HISTORY_PAGE_SIZE,
+    MAX_HISTORY_PAGE_SIZE,
+    build_calculation_row,
+    create_calculation,
+    create_calculations_bulk,
+    get_user_calculations_page,
+    non_finite_error,
+    stream_calculations_ndjson,
+)
+from app.services.calculation_stats import get_user_calculation_stats
+from app.services.export_service import EXPORT_MEDIA_TYPES, export_calculations
+from app.services.token_revocation import revocation_list
+from app.services.user_service import get_user_by_id
+from app.services.write_behind import WriteBehindFullError, calculation_buffer
+
+
+async def compact_revocations_periodically(interval: float):
+    """Drop expired revocations and refresh the Bloom filter every interval"""
+    while True:
+        await asyncio.sleep(interval)
+        with suppress(Exception):
+            await asyncio.to_thread(revocation_list.compact)
+
+
+async def refresh_revocations_periodically(interval: float):
+    """Pick up revocations made by other workers every interval"""
+    while True:
+        await asyncio.sleep(interval)
+        with suppress(Exception):
+            await asyncio.to_thread(revocation_list.refresh)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop application-wide background resources"""
+    session_factory = app.dependency_overrides.get(
+        get_session_factory, get_session_factory
+    )()
+    await asyncio.to_thread(revocation_list.load, session_factory)
+    compaction = asyncio.create_task(
+        compact_revocations_periodically(settings.token_revocation_compact_interval)
+    )
+    refresh = asyncio.create_task(
+        refresh_revocations_periodically(settings.token_revocation_refresh_interval)
+    )
+    if settings.write_behind_enabled:
+        calculation_buffer.start(session_factory)
+    yield
+    # Flush queued calculations while the database is still reachable
+    await calculation_buffer.stop()
+    for task in (compaction, refresh):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    password_worker_pool.shutdown()
+
 
 app = FastAPI(
     title="Calculation API",
     description="A FastAPI application for mathematical calculations with user management",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -27,6 +120,164 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics/db-pool")
+async def database_pool_metrics():
+    """Report connection pool occupancy, checkout wait times and timeouts"""
+    metrics = {"sync": pool_metrics(engine), "async": pool_metrics(async_engine)}
+    if replica_engine is not None:
+        metrics["replica"] = pool_metrics(replica_engine)
+        metrics["async_replica"] = pool_metrics(async_replica_engine)
+    return metrics
+
+
+@app.get("/metrics/write-behind")
+async def write_behind_metrics():
+    """Report write-behind queue depth and rows written or lost"""
+    return calculation_buffer.stats()._asdict()
+
+
+@app.post("/calculations", response_model=CalculationCreated, status_code=201)
+async def create_single_calculation(
+    calculation: CalculationCreate,
+    response: Response,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Compute a calculation and store it, or queue it in write-behind mode"""
+    if user_id is not None:
+        # An unknown owner would fail the whole batch it is written with
+        if await run_in_threadpool(get_user_by_id, db, user_id) is None:
+            raise HTTPException(status_code=404, detail="User not found")
+    row = build_calculation_row(calculation, user_id)
+    error = non_finite_error(row["a"], row["b"], row["result"])
+    if error is not None:
+        raise HTTPException(status_code=422, detail=error)
+    if calculation_buffer.running:
+        try:
+            await calculation_buffer.enqueue(row)
+        except WriteBehindFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        response.status_code = 202
+        return CalculationCreated(**row, queued=True)
+    calc_id = await run_in_threadpool(create_calculation, db, row)
+    return CalculationCreated(id=calc_id, **row)
+
+
+@app.post(
+    "/calculations/batch", response_model=CalculationBatchResponse, status_code=201
+)
+def create_calculations_batch(
+    items: List[Dict[str, Any]],
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Validate, compute and store a batch of calculations with per-item status"""
+    if user_id is not None and get_user_by_id(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    statuses = create_calculations_bulk(db, items, user_id)
+    created = sum(1 for item in statuses if item.status == "created")
+    return CalculationBatchResponse(
+        created=created, failed=len(statuses) - created, items=statuses
+    )
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse for bodies that are produced while reading the request.
+
+    StreamingResponse normally watches for client disconnects by reading from
+    ``receive``, which would swallow request body messages the body iterator
+    is still waiting for. Here the body iterator is the only reader, and a
+    disconnect surfaces through ``request.stream()`` instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/calculations/stream")
+async def stream_calculations(request: Request):
+    """Evaluate NDJSON calculation requests as they arrive and stream results"""
+    return RequestStreamingResponse(
+        stream_calculations_ndjson(request.stream()),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/calculations/backfill", status_code=202)
+def start_result_backfill(
+    background_tasks: BackgroundTasks,
+    session_factory=Depends(get_session_factory),
+):
+    """Compute missing calculation results in the background"""
+    if not backfill_service.claim_backfill_job():
+        raise HTTPException(status_code=409, detail="A backfill is already running")
+    background_tasks.add_task(
+        backfill_service.run_backfill_job, session_factory, claimed=True
+    )
+    return {"status": "scheduled"}
+
+
+@app.get("/calculations/backfill")
+def get_result_backfill_status():
+    """Report progress of the most recent background backfill"""
+    report = backfill_service.last_backfill_report
+    if report is None:
+        return {"status": "idle"}
+    return {
+        "status": "finished" if report.finished else "running",
+        **report.to_dict(),
+    }
+
+
+@app.get("/calculations/export")
+def export_calculation_rows(
+    export_format: Literal["csv", "arrow"] = Query("csv", alias="format"),
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+):
+    """Stream all calculations, or one user's, as CSV or an Arrow IPC stream"""
+    if user_id is not None and get_user_by_id(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    extension = "csv" if export_format == "csv" else "arrows"
+    return StreamingResponse(
+        export_calculations(session_factory, export_format, user_id),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="calculations.{extension}"'
+        },
+    )
+
+
+@app.get("/users/{user_id}/calculations", response_model=CalculationPage)
+def list_user_calculations(
+    user_id: int,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Page through a user's calculations, newest first, by keyset cursor"""
+    if get_user_by_id(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        items, next_cursor = get_user_calculations_page(db, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CalculationPage(items=items, next_cursor=next_cursor)
+
+
+@app.get(
+    "/users/{user_id}/calculations/stats", response_model=List[CalculationStatsRead]
+)
+def read_user_calculation_stats(user_id: int, db: Session = Depends(get_db)):
+    """Per-operation count, sum, min, max and latest time of a user's results"""
+    if get_user_by_id(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return get_user_calculation_stats(db, user_id)
+
+
 if __name__ == "__main__":
     import uvicorn
 
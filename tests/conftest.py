@@ -1,7 +1,9 @@
 import os
 import sys
+from contextlib import contextmanager
 
 import pytest
+import pytest_asyncio
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,6 +12,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 @pytest.fixture(scope="session")
 def test_db():
     """Fixture for test database setup"""
+    import app.models  # noqa: F401 - register every table on Base.metadata
     from app.database import Base, test_engine
 
     Base.metadata.create_all(bind=test_engine)
@@ -21,6 +24,7 @@ def test_db():
 def db_session(test_db):
     """Fixture for database session"""
     from app.database import Base, TestingSessionLocal
+    from app.services.user_cache import user_cache
 
     session = TestingSessionLocal()
     try:
@@ -32,6 +36,78 @@ def db_session(test_db):
         for table in reversed(Base.metadata.sorted_tables):
             session.execute(table.delete())
         session.commit()
+        # Core deletes bypass the ORM events that keep the user cache fresh
+        if user_cache is not None:
+            user_cache.clear()
+
+
+@pytest_asyncio.fixture
+async def async_db_session(db_session):
+    """Fixture for an async database session on the test database"""
+    from app.database import AsyncTestingSessionLocal
+
+    async with AsyncTestingSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def query_budget(test_db):
+    """Context manager failing the test when a block exceeds a SQL budget.
+
+    Usage::
+
+        with query_budget(2) as statements:
+            list_users(db_session, with_calculations=True)
+
+    Statements sent through the sync and async test engines are counted; the
+    yielded list holds their SQL for further assertions. A block that ends
+    with an exception is not checked, so the original error is reported.
+    """
+    from sqlalchemy import event
+
+    from app.database import async_test_engine, test_engine
+
+    engines = [test_engine, async_test_engine.sync_engine]
+
+    @contextmanager
+    def budget(max_statements: int):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", count)
+        if len(statements) > max_statements:
+            listing = "\n".join(f"  {sql}" for sql in statements)
+            pytest.fail(
+                f"{len(statements)} SQL statements issued, budget was "
+                f"{max_statements}:\n{listing}"
+            )
+
+    return budget
+
+
+@pytest.fixture
+def client(db_session):
+    """Fixture for an API test client bound to the test database session"""
+    from fastapi.testclient import TestClient
+
+    from app.database import TestingSessionLocal, get_db, get_session_factory
+    from main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
 
 
 @pytest.fixture
@@ -48,7 +124,7 @@ def test_user(db_session):
     user = User(
         username="testuser",
         email="test@example.com",
-        hashed_password="hashed_password_here",
+        password_hash="hashed_password_here",
     )
     db_session.add(user)
     db_session.commit()
@@ -56,6 +132,38 @@ def test_user(db_session):
     return user
 
 
+@pytest.fixture
+def make_users(db_session):
+    """Factory committing users to own test data.
+
+    Usage::
+
+        alice, bob = make_users(2)
+        owners = make_users(3, prefix="owner")  # owner0, owner1, owner2
+        make_users(ids=[1, 2500])
+
+    Password hashes are placeholders, so the users cannot log in.
+    """
+    from app.models.user_model import User
+
+    def make(count: int = 1, prefix: str = "user", ids=None):
+        ids = list(ids) if ids is not None else [None] * count
+        users = [
+            User(
+                id=user_id,
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@example.com",
+                password_hash="x",
+            )
+            for i, user_id in enumerate(ids)
+        ]
+        db_session.add_all(users)
+        db_session.commit()
+        return users
+
+    return make
+
+
 @pytest.fixture
 def multiple_calculations():
     """Sample calculation data for batch testing"""
@@ -0,0 +1,205 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.orm import Session
+
+from app import cli
+from app.config import settings
+from app.database import TestingSessionLocal
+from app.models.calculation_model import Calculation
+from app.models.calculation_stats_model import UserCalculationStats
+from app.services import archive_service
+from app.services.archive_service import (
+    archive_calculations,
+    read_archived_user_calculations,
+)
+from app.services.calculation_service import get_user_calculations_page
+from app.services.calculation_stats import rebuild_user_calculation_stats
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    """Point the archive at a temporary directory"""
+    path = str(tmp_path / "archive")
+    monkeypatch.setattr(settings, "archive_dir", path)
+    return path
+
+
+@pytest.fixture
+def users(make_users):
+    return make_users(prefix="archive", ids=[1, 2500])
+
+
+def _seed(db: Session, user_id, ages_in_days):
+    """Add one calculation per age, in days before NOW"""
+    for i, days in enumerate(ages_in_days):
+        db.add(
+            Calculation(
+                a=i,
+                b=1,
+                type="Add",
+                result=i + 1.0,
+                user_id=user_id,
+                created_at=NOW - timedelta(days=days),
+            )
+        )
+    db.commit()
+
+
+def _full_history(db: Session, user_id, limit):
+    """Follow history cursors to the end"""
+    ids, cursor = [], None
+    while True:
+        items, cursor = get_user_calculations_page(db, user_id, limit, cursor)
+        ids.extend(item.id for item in items)
+        if cursor is None:
+            return ids
+
+
+class TestArchiveCalculations:
+    """Test moving old calculations into Parquet files"""
+
+    def test_archives_old_rows_by_partition(
+        self, db_session: Session, users, archive_dir
+    ):
+        """Test that old rows are written per month and user bucket, then deleted"""
+        _seed(db_session, 1, [0, 40, 70])
+        _seed(db_session, 2500, [45])
+
+        report = archive_calculations(
+            TestingSessionLocal, NOW - timedelta(days=30), chunk_size=2
+        )
+
+        assert report.archived == 3
+        assert report.chunks == 2
+        assert db_session.query(Calculation).count() == 1
+        months = sorted(os.listdir(archive_dir))
+        expected_months = {
+            f"month={(NOW - timedelta(days=d)).strftime('%Y-%m')}" for d in (40, 45, 70)
+        }
+        assert set(months) == expected_months
+        buckets = {
+            entry
+            for month in months
+            for entry in os.listdir(os.path.join(archive_dir, month))
+        }
+        assert buckets == {"user_bucket=0", "user_bucket=2000"}
+
+        files = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(archive_dir)
+            for name in names
+        ]
+        assert all(name.endswith(".parquet") for name in files)
+        metadata = pq.ParquetFile(files[0]).metadata
+        assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+    def test_archived_rows_stay_in_stats(self, db_session: Session, users):
+        """Test that archival does not change user_calculation_stats"""
+        _seed(db_session, 1, [0, 400])
+        before = db_session.query(UserCalculationStats).one().count
+
+        archive_calculations(TestingSessionLocal)
+
+        db_session.expire_all()
+        assert db_session.query(Calculation).count() == 1
+        assert db_session.query(UserCalculationStats).one().count == before == 2
+
+    def test_archived_rows_survive_recompute(self, db_session: Session, users):
+        """Test that deleting a hot min row keeps archived rows counted"""
+        for result, days in [(1, 400), (2, 400), (3, 400), (11, 0), (21, 0)]:
+            db_session.add(
+                Calculation(
+                    a=result,
+                    b=0,
+                    type="Add",
+                    result=float(result),
+                    user_id=1,
+                    created_at=NOW - timedelta(days=days),
+                )
+            )
+        db_session.commit()
+        archive_calculations(TestingSessionLocal)
+
+        db_session.expire_all()
+        # The hot minimum forces the group to be re-aggregated
+        db_session.delete(db_session.query(Calculation).filter_by(result=11.0).one())
+        db_session.commit()
+
+        stats = db_session.query(UserCalculationStats).one()
+        assert (stats.count, stats.result_sum) == (4, 27.0)
+        assert (stats.result_min, stats.result_max) == (1.0, 21.0)
+
+        rebuild_user_calculation_stats(db_session)
+        db_session.commit()
+        db_session.expire_all()
+        stats = db_session.query(UserCalculationStats).one()
+        assert (stats.count, stats.result_sum, stats.result_min) == (4, 27.0, 1.0)
+
+    def test_archive_cli(self, db_session: Session, users, monkeypatch, capsys):
+        """Test the archive-calculations command"""
+        _seed(db_session, 1, [0, 100])
+        monkeypatch.setattr(cli, "SessionLocal", TestingSessionLocal)
+
+        assert cli.main(["archive-calculations", "--older-than-days", "30"]) == 0
+
+        assert "done: archived=1 chunks=1 files=1" in capsys.readouterr().out
+
+
+class TestArchivedHistory:
+    """Test history reads across the hot table and the archive"""
+
+    def test_history_merges_hot_and_archived_rows(self, db_session: Session, users):
+        """Test that paging returns archived rows in order after hot ones"""
+        _seed(db_session, 1, [0, 0, 1, 35, 35, 65, 95, 96])
+        _seed(db_session, 2500, [40])
+        expected = _full_history(db_session, 1, limit=100)
+
+        archive_calculations(TestingSessionLocal, NOW - timedelta(days=30))
+
+        assert db_session.query(Calculation).count() == 3
+        for limit in (1, 2, 3, 5, 100):
+            assert _full_history(db_session, 1, limit) == expected
+
+    def test_history_reads_only_reachable_partitions(
+        self, db_session: Session, users, monkeypatch
+    ):
+        """Test that pages open only the reachable months of the user's bucket"""
+        _seed(db_session, 1, [0, 1, 2, 60, 90])
+        _seed(db_session, 2500, [60])
+        archive_calculations(TestingSessionLocal, NOW - timedelta(days=30))
+        opened = []
+        real_read_table = archive_service.pq.read_table
+        monkeypatch.setattr(
+            archive_service.pq,
+            "read_table",
+            lambda path, **kwargs: opened.append(path)
+            or real_read_table(path, **kwargs),
+        )
+
+        items, cursor = get_user_calculations_page(db_session, 1, limit=2)
+        assert len(items) == 2
+        assert opened == []
+
+        items, cursor = get_user_calculations_page(db_session, 1, 2, cursor)
+        assert [item.result for item in items] == [3.0, 4.0]
+        assert opened and all("user_bucket=0" in path for path in opened)
+
+    def test_read_archived_user_calculations(self, db_session: Session, users):
+        """Test reading a user's archive directly with a cursor bound"""
+        _seed(db_session, 1, [50, 50, 80])
+        archive_calculations(TestingSessionLocal, NOW - timedelta(days=30))
+
+        rows = read_archived_user_calculations(1, limit=10)
+        assert [row.result for row in rows] == [2.0, 1.0, 3.0]
+
+        bound = (rows[0].created_at, rows[0].id)
+        assert [row.id for row in read_archived_user_calculations(1, 10, bound)] == [
+            rows[1].id,
+            rows[2].id,
+        ]
+        assert read_archived_user_calculations(2500, limit=10) == []
@@ -1,16 +1,45 @@
+import asyncio
+import time
 from datetime import timedelta
 
 import pytest
 from fastapi import HTTPException
 
+from app import cli
+from app.services import auth_service
+from app.services import cache as cache_module
 from app.services.auth_service import (
+    MIN_BCRYPT_ROUNDS,
+    PasswordHashingBusyError,
+    PasswordWorkerPool,
+    calibrate_bcrypt_rounds,
     create_access_token,
+    flush_token_cache,
+    get_bcrypt_rounds,
     hash_password,
+    hash_password_async,
+    hash_passwords,
+    needs_rehash,
+    set_bcrypt_rounds,
+    token_cache_info,
+    verify_and_update_password,
     verify_password,
+    verify_password_async,
     verify_token,
 )
 
 
+@pytest.fixture(autouse=True)
+def revocations(db_session):
+    """Check token revocations against the test database"""
+    from app.database import TestingSessionLocal
+    from app.services.token_revocation import revocation_list
+
+    revocation_list.load(TestingSessionLocal)
+    yield revocation_list
+    revocation_list.clear()
+
+
 class TestPasswordHashing:
     """Test password hashing functionality."""
 
@@ -47,6 +76,120 @@ class TestPasswordHashing:
         assert verify_password("", hashed) is False
 
 
+class TestBcryptCost:
+    """Test bcrypt cost configuration and calibration."""
+
+    @pytest.fixture
+    def restore_rounds(self):
+        original = get_bcrypt_rounds()
+        yield
+        set_bcrypt_rounds(original)
+
+    def test_set_bcrypt_rounds(self, restore_rounds):
+        """Test that new hashes use the configured cost."""
+        set_bcrypt_rounds(5)
+        assert hash_password("TestPassword123!").startswith("$2b$05$")
+
+    def test_calibrate_respects_budget(self, monkeypatch):
+        """Test that calibration picks the highest cost within the budget."""
+        # Pretend a hash at cost 8 takes 1ms, doubling per round
+        monkeypatch.setattr(
+            auth_service,
+            "time_bcrypt_hash",
+            lambda rounds, samples=3: 0.001 * 2 ** (rounds - 8),
+        )
+
+        assert calibrate_bcrypt_rounds(0.1) == 14
+        assert calibrate_bcrypt_rounds(0.0001) == MIN_BCRYPT_ROUNDS == 10
+        assert calibrate_bcrypt_rounds(1000) == 16
+
+    def test_calibrate_cli(self, monkeypatch, capsys):
+        """Test that the calibrate-bcrypt command prints the cost to pin."""
+        monkeypatch.setattr(
+            auth_service,
+            "time_bcrypt_hash",
+            lambda rounds, samples=3: 0.001 * 2 ** (rounds - 8),
+        )
+
+        assert cli.main(["calibrate-bcrypt", "--target-ms", "100"]) == 0
+        assert capsys.readouterr().out == "BCRYPT_ROUNDS=14\n"
+
+    def test_calibrate_on_this_machine(self):
+        """Test a real calibration against a small budget."""
+        rounds = calibrate_bcrypt_rounds(0.05, min_rounds=4, max_rounds=10)
+        assert 4 <= rounds <= 10
+
+    def test_verify_and_update_rehashes_outdated_cost(self, restore_rounds):
+        """Test that hashes with an old cost are upgraded after verification."""
+        set_bcrypt_rounds(4)
+        old_hash = hash_password("TestPassword123!")
+        set_bcrypt_rounds(5)
+
+        verified, new_hash = verify_and_update_password("TestPassword123!", old_hash)
+
+        assert verified is True
+        assert new_hash.startswith("$2b$05$")
+        assert verify_and_update_password("TestPassword123!", new_hash) == (True, None)
+        assert verify_and_update_password("Wrong123!", old_hash) == (False, None)
+
+    def test_verify_and_update_keeps_higher_cost(self, restore_rounds):
+        """Test that hashes above the configured cost are never downgraded."""
+        set_bcrypt_rounds(5)
+        strong_hash = hash_password("TestPassword123!")
+        set_bcrypt_rounds(4)
+
+        assert not needs_rehash(strong_hash)
+        assert verify_and_update_password("TestPassword123!", strong_hash) == (
+            True,
+            None,
+        )
+
+    def test_hash_passwords_uses_current_cost(self, restore_rounds):
+        """Test that worker processes hash with the parent's cost."""
+        set_bcrypt_rounds(4)
+        hashes = hash_passwords(["Password1A", "Password2B"])
+
+        assert all(h.startswith("$2b$04$") for h in hashes)
+        assert verify_password("Password2B", hashes[1])
+
+
+class TestPasswordWorkerPool:
+    """Test async password hashing in the bounded worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_async(self):
+        """Test that async hashes verify with both sync and async helpers."""
+        hashed = await hash_password_async("TestPassword123!")
+
+        assert verify_password("TestPassword123!", hashed) is True
+        assert await verify_password_async("TestPassword123!", hashed) is True
+        assert await verify_password_async("WrongPassword123!", hashed) is False
+
+    @pytest.mark.asyncio
+    async def test_pool_rejects_jobs_beyond_max_pending(self):
+        """Test that the pool fails fast when its queue is full."""
+        pool = PasswordWorkerPool(workers=1, max_pending=1, timeout=10)
+        try:
+            running = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+            await asyncio.sleep(0)
+            with pytest.raises(PasswordHashingBusyError):
+                await pool.run(time.sleep, 0)
+            await running
+            assert pool.pending == 0
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_pool_timeout(self):
+        """Test that slow jobs raise TimeoutError."""
+        pool = PasswordWorkerPool(workers=1, max_pending=4, timeout=0.2)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.run(time.sleep, 2)
+        finally:
+            pool.shutdown()
+
+
 class TestJWTTokens:
     """Test JWT token functionality."""
 
@@ -84,3 +227,68 @@ class TestJWTTokens:
 
         with pytest.raises(HTTPException):
             verify_token(invalid_token, credentials_exception)
+
+
+class TestVerifiedTokenCache:
+    """Test caching of already-verified JWT tokens."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        flush_token_cache()
+        yield
+        flush_token_cache()
+
+    def test_repeated_token_is_served_from_cache(self, monkeypatch):
+        """Test that a second verification skips jwt.decode."""
+        token = create_access_token({"sub": "cacheduser"})
+        credentials_exception = HTTPException(status_code=401, detail="Invalid token")
+        assert verify_token(token, credentials_exception) == "cacheduser"
+
+        def fail_decode(*args, **kwargs):
+            raise AssertionError("token should come from the cache")
+
+        monkeypatch.setattr(auth_service.jwt, "decode", fail_decode)
+        assert verify_token(token, credentials_exception) == "cacheduser"
+        info = token_cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+    def test_cached_token_expires_with_exp_claim(self, monkeypatch):
+        """Test that cache entries are dropped once the token expires."""
+        token = create_access_token({"sub": "shortlived"}, timedelta(minutes=1))
+        credentials_exception = HTTPException(status_code=401, detail="Invalid token")
+        verify_token(token, credentials_exception)
+
+        later = time.time() + 120
+        monkeypatch.setattr(cache_module.time, "time", lambda: later)
+        decode_calls = []
+        real_decode = auth_service.jwt.decode
+        monkeypatch.setattr(
+            auth_service.jwt,
+            "decode",
+            lambda *args, **kwargs: decode_calls.append(1)
+            or real_decode(*args, **kwargs),
+        )
+
+        verify_token(token, credentials_exception)
+
+        assert decode_calls == [1]
+        assert token_cache_info().expirations == 1
+
+    def test_invalid_token_is_not_cached(self):
+        """Test that failed verifications leave the cache empty."""
+        credentials_exception = HTTPException(status_code=401, detail="Invalid token")
+        with pytest.raises(HTTPException):
+            verify_token("invalid.token.here", credentials_exception)
+        assert token_cache_info().currsize == 0
+
+    def test_flush_after_secret_rotation(self, monkeypatch):
+        """Test that flushing makes tokens signed with an old key fail."""
+        token = create_access_token({"sub": "rotated"})
+        credentials_exception = HTTPException(status_code=401, detail="Invalid token")
+        verify_token(token, credentials_exception)
+
+        monkeypatch.setattr(auth_service.settings, "secret_key", "rotated-secret")
+        flush_token_cache()
+
+        with pytest.raises(HTTPException):
+            verify_token(token, credentials_exception)
@@ -0,0 +1,173 @@
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import cli
+from app.database import TestingSessionLocal, get_session_factory
+from app.models.calculation_model import Calculation
+from app.services import backfill_service
+from app.services.backfill_service import (
+    BackfillAlreadyRunningError,
+    backfill_null_results,
+)
+from app.services.calculation_factory import CalculationFactory
+from app.services.calculation_stats import get_user_calculation_stats
+
+
+def _seed(db_session: Session, rows):
+    db_session.execute(insert(Calculation), rows)
+    db_session.commit()
+
+
+class TestResultBackfill:
+    """Test cases for backfilling NULL calculation results"""
+
+    def test_backfill_fills_results_in_chunks(self, db_session: Session):
+        """Test that every NULL result is computed across several chunks"""
+        _seed(db_session, [{"a": i, "b": 2, "type": "Multiply"} for i in range(25)])
+
+        report = backfill_null_results(TestingSessionLocal, chunk_size=10)
+
+        assert report.finished
+        assert (report.processed, report.updated, report.chunks) == (25, 25, 3)
+        assert report.rows_per_second > 0
+        db_session.expire_all()
+        for calc in db_session.query(Calculation).all():
+            assert calc.result == calc.a * 2
+
+    def test_backfill_skips_rows_with_results(self, db_session: Session):
+        """Test that stored results are left alone"""
+        _seed(
+            db_session,
+            [
+                {"a": 1, "b": 1, "type": "Add", "result": 99.0},
+                {"a": 1, "b": 1, "type": "Add"},
+            ],
+        )
+
+        report = backfill_null_results(TestingSessionLocal)
+
+        assert report.processed == 1
+        db_session.expire_all()
+        results = sorted(c.result for c in db_session.query(Calculation).all())
+        assert results == [2.0, 99.0]
+
+    def test_backfill_records_failures(self, db_session: Session):
+        """Test that bad rows are recorded without aborting the run"""
+        _seed(
+            db_session,
+            [
+                {"a": 1, "b": 0, "type": "Divide"},
+                {"a": 1, "b": 1, "type": "Power"},
+                {"a": 4, "b": 2, "type": "Divide"},
+            ],
+        )
+
+        report = backfill_null_results(TestingSessionLocal)
+
+        assert report.updated == 1
+        errors = sorted(failure.error for failure in report.failures)
+        assert errors == [
+            "Division by zero is not allowed",
+            "Unsupported operation type: Power",
+        ]
+        assert db_session.query(Calculation).filter_by(result=2.0).count() == 1
+
+    def test_backfill_caps_stored_failures(self, db_session: Session, monkeypatch):
+        """Test that failures beyond the cap are counted but not kept"""
+        monkeypatch.setattr(backfill_service, "MAX_REPORTED_FAILURES", 3)
+        _seed(db_session, [{"a": i, "b": 0, "type": "Divide"} for i in range(5)])
+
+        report = backfill_null_results(TestingSessionLocal)
+
+        assert report.failed == 5
+        assert len(report.failures) == 3
+
+        snapshot = report.snapshot()
+        report.record_failure(99, "later")
+        assert snapshot.failed == 5
+        assert len(snapshot.failures) == 3
+
+    def test_backfill_resumes_from_checkpoint(self, db_session: Session, tmp_path):
+        """Test that a stopped run resumes after the checkpointed id"""
+        _seed(db_session, [{"a": i, "b": 1, "type": "Add"} for i in range(10)])
+        checkpoint = str(tmp_path / "backfill.json")
+
+        first = backfill_null_results(
+            TestingSessionLocal, chunk_size=4, checkpoint_path=checkpoint, max_chunks=1
+        )
+        assert not first.finished
+        second = backfill_null_results(
+            TestingSessionLocal, chunk_size=4, checkpoint_path=checkpoint
+        )
+
+        assert second.processed == 6
+        assert db_session.query(Calculation).filter_by(result=None).count() == 0
+
+    def test_backfill_cli(self, db_session: Session, monkeypatch, capsys):
+        """Test the backfill-results command"""
+        _seed(db_session, [{"a": 1, "b": 2, "type": "Sub"}])
+        monkeypatch.setattr(cli, "SessionLocal", TestingSessionLocal)
+
+        assert cli.main(["backfill-results", "--chunk-size", "5"]) == 0
+
+        assert "done: processed=1 updated=1 failed=0" in capsys.readouterr().out
+
+    def test_backfill_endpoint(self, client, db_session: Session, monkeypatch):
+        """Test scheduling the backfill as a background task"""
+        _seed(db_session, [{"a": 3, "b": 3, "type": "Multiply"}])
+        monkeypatch.setattr(backfill_service, "last_backfill_report", None)
+        client.app.dependency_overrides[get_session_factory] = lambda: (
+            TestingSessionLocal
+        )
+
+        assert client.get("/calculations/backfill").json() == {"status": "idle"}
+        response = client.post("/calculations/backfill")
+
+        assert response.status_code == 202
+        status = client.get("/calculations/backfill").json()
+        assert status["status"] == "finished"
+        assert status["updated"] == 1
+        assert status["failed"] == 0
+
+    def test_overlapping_backfills_count_rows_once(
+        self, db_session: Session, test_user, monkeypatch
+    ):
+        """Test that a run whose rows were filled meanwhile leaves them alone"""
+        _seed(
+            db_session,
+            [
+                {"a": i, "b": 1, "type": "Add", "user_id": test_user.id}
+                for i in range(6)
+            ],
+        )
+        calculate_batch = CalculationFactory.calculate_batch
+        overlapped = []
+
+        def racing_batch(a, b, types):
+            # Another backfill finishes the same rows between read and write
+            monkeypatch.setattr(CalculationFactory, "calculate_batch", calculate_batch)
+            overlapped.append(backfill_null_results(TestingSessionLocal))
+            return calculate_batch(a, b, types)
+
+        monkeypatch.setattr(CalculationFactory, "calculate_batch", racing_batch)
+        report = backfill_null_results(TestingSessionLocal)
+
+        assert overlapped[0].updated == 6
+        assert (report.processed, report.updated) == (6, 0)
+        db_session.expire_all()
+        assert sorted(c.result for c in db_session.query(Calculation)) == [
+            float(i + 1) for i in range(6)
+        ]
+        (stats,) = get_user_calculation_stats(db_session, test_user.id)
+        assert (stats.count, stats.result_sum) == (6, 21.0)
+
+    def test_second_job_is_refused(self, client):
+        """Test that only one in-process backfill job runs at a time"""
+        assert backfill_service.claim_backfill_job()
+        try:
+            with pytest.raises(BackfillAlreadyRunningError):
+                backfill_service.run_backfill_job(TestingSessionLocal)
+            assert client.post("/calculations/backfill").status_code == 409
+        finally:
+            backfill_service._job_lock.release()
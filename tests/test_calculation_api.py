@@ -0,0 +1,352 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import String, insert, select, text, tuple_, type_coerce
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+
+from app.models.calculation_model import Calculation
+from app.services.calculation_service import (
+    create_calculations_bulk,
+    decode_history_cursor,
+    get_user_calculations_page,
+    list_calculations,
+    stream_calculations_ndjson,
+)
+
+
+async def _collect(chunks, **kwargs):
+    """Run the NDJSON stream over the given chunks and decode the output"""
+
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    output = b"".join(
+        [part async for part in stream_calculations_ndjson(source(), **kwargs)]
+    )
+    return [json.loads(line) for line in output.splitlines()]
+
+
+class TestCalculationBatchService:
+    """Test cases for the bulk calculation service"""
+
+    def test_bulk_create_stores_results(
+        self, db_session: Session, multiple_calculations
+    ):
+        """Test that valid items are computed and stored"""
+        statuses = create_calculations_bulk(db_session, multiple_calculations)
+
+        assert [s.status for s in statuses] == ["created"] * 4
+        assert [s.result for s in statuses] == [
+            c["expected"] for c in multiple_calculations
+        ]
+        stored = {c.id: c for c in db_session.query(Calculation).all()}
+        for status in statuses:
+            assert stored[status.id].result == status.result
+
+    def test_bulk_create_chunks_inserts(self, db_session: Session):
+        """Test that ids line up with input order across insert chunks"""
+        items = [{"a": i, "b": 1, "type": "Add"} for i in range(25)]
+
+        statuses = create_calculations_bulk(db_session, items, chunk_size=10)
+
+        assert db_session.query(Calculation).count() == 25
+        for i, status in enumerate(statuses):
+            assert db_session.get(Calculation, status.id).a == i
+
+    def test_bulk_create_reports_invalid_items(self, db_session: Session):
+        """Test that invalid items get an error status without aborting the batch"""
+        items = [
+            {"a": 1, "b": 2, "type": "Add"},
+            {"a": 1, "b": 0, "type": "Divide"},
+            {"a": 1, "b": 2, "type": "Power"},
+        ]
+
+        statuses = create_calculations_bulk(db_session, items)
+
+        assert [s.status for s in statuses] == ["created", "error", "error"]
+        assert statuses[1].error == "Division by zero is not allowed"
+        assert statuses[2].id is None
+        assert db_session.query(Calculation).count() == 1
+
+    @pytest.mark.filterwarnings("error::RuntimeWarning")
+    def test_bulk_create_rejects_non_finite_values(self, db_session: Session):
+        """Test that overflow and NaN or infinite operands are not stored"""
+        items = [
+            {"a": 1e308, "b": 1e308, "type": "Add"},
+            {"a": "nan", "b": 1, "type": "Add"},
+            {"a": "inf", "b": 2, "type": "Divide"},
+            {"a": 1, "b": 2, "type": "Add"},
+        ]
+
+        statuses = create_calculations_bulk(db_session, items)
+
+        assert [s.status for s in statuses] == ["error"] * 3 + ["created"]
+        assert statuses[0].error == "Result is not a finite number"
+        assert statuses[1].error == "Operands must be finite numbers"
+        assert statuses[2].error == "Operands must be finite numbers"
+        assert db_session.query(Calculation.result).all() == [(3.0,)]
+
+
+class TestCalculationBatchEndpoint:
+    """Test cases for POST /calculations/batch"""
+
+    def test_batch_endpoint(self, client, db_session: Session):
+        """Test the endpoint returns per-item status and counts"""
+        response = client.post(
+            "/calculations/batch",
+            json=[
+                {"a": 6, "b": 3, "type": "Divide"},
+                {"a": "x", "b": 3, "type": "Add"},
+            ],
+        )
+
+        assert response.status_code == 201
+        body = response.json()
+        assert body["created"] == 1
+        assert body["failed"] == 1
+        assert body["items"][0]["result"] == 2.0
+        assert body["items"][1]["status"] == "error"
+        assert db_session.query(Calculation).count() == 1
+
+    def test_batch_endpoint_with_owner(self, client, db_session: Session, test_user):
+        """Test that user_id attaches the owner and unknown users are rejected"""
+        items = [{"a": 1, "b": 2, "type": "Add"}]
+
+        response = client.post(
+            "/calculations/batch", params={"user_id": test_user.id}, json=items
+        )
+        assert response.status_code == 201
+        assert db_session.query(Calculation).one().user_id == test_user.id
+
+        response = client.post(
+            "/calculations/batch", params={"user_id": test_user.id + 1}, json=items
+        )
+        assert response.status_code == 404
+        assert db_session.query(Calculation).count() == 1
+
+    def test_batch_endpoint_reports_overflow(self, client, db_session: Session):
+        """Test that an overflowing item is an error status, not a 500"""
+        response = client.post(
+            "/calculations/batch", json=[{"a": 1e308, "b": 1e308, "type": "Add"}]
+        )
+
+        assert response.status_code == 201
+        assert response.json()["items"][0]["status"] == "error"
+        assert db_session.query(Calculation).count() == 0
+
+
+class TestCalculationStream:
+    """Test cases for NDJSON streaming evaluation"""
+
+    @pytest.mark.asyncio
+    async def test_stream_lines_split_across_chunks(self):
+        """Test that lines spanning chunk boundaries are reassembled"""
+        results = await _collect(
+            [
+                b'{"a": 1, "b": 2, "ty',
+                b'pe": "Add"}\n{"a": 6, "b"',
+                b': 3, "type": "Divide"}',
+            ]
+        )
+        assert [r["result"] for r in results] == [3.0, 2.0]
+        assert [r["line"] for r in results] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_stream_reports_errors_per_line(self):
+        """Test that invalid lines produce errors without stopping the stream"""
+        results = await _collect(
+            [
+                b"not json\n\n",
+                b'{"a": 1, "b": 0, "type": "Divide"}\n',
+                b'{"a": 1, "b": 1, "type": "Sub"}\n',
+            ]
+        )
+        assert "error" in results[0]
+        assert results[1] == {"line": 3, "error": "Division by zero is not allowed"}
+        assert results[2]["result"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_stream_reports_non_finite_values(self):
+        """Test that NaN and infinity become error lines, never bare NaN"""
+        results = await _collect(
+            [
+                b'{"a": 1e308, "b": 1e308, "type": "Add"}\n',
+                b'{"a": "nan", "b": 1, "type": "Add"}\n',
+                b'{"a": "inf", "b": "-inf", "type": "Add"}\n',
+            ]
+        )
+        assert results == [
+            {"line": 1, "error": "Result is not a finite number"},
+            {"line": 2, "error": "Operands must be finite numbers"},
+            {"line": 3, "error": "Operands must be finite numbers"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_rejects_overlong_line(self):
+        """Test that an unterminated oversized line ends the stream"""
+        results = await _collect(
+            [b'{"a": 1, "b": 1, "type": "Add"}\n', b"x" * 100], max_line_bytes=50
+        )
+        assert results[0]["result"] == 2.0
+        assert results[1] == {"line": 2, "error": "Line exceeds maximum length"}
+
+    def test_stream_endpoint(self, client):
+        """Test the endpoint streams NDJSON results"""
+        body = "".join(
+            json.dumps({"a": i, "b": 2, "type": "Multiply"}) + "\n" for i in range(100)
+        )
+        response = client.post(
+            "/calculations/stream",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["result"] for line in lines] == [i * 2.0 for i in range(100)]
+
+
+class TestCalculationHistory:
+    """Test keyset-paginated per-user calculation history"""
+
+    @pytest.fixture
+    def history(self, db_session: Session, make_users):
+        """A user with calculations sharing and differing in created_at"""
+        user, other = make_users(2, prefix="historyuser")
+        earlier = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        rows = [
+            {"a": i, "b": 1.0, "type": "Add", "result": i + 1.0, "user_id": user.id}
+            for i in range(7)
+        ]
+        rows[0]["created_at"] = rows[1]["created_at"] = earlier
+        rows.append({"a": 1, "b": 1, "type": "Add", "user_id": other.id})
+        for row in rows:
+            db_session.add(Calculation(**row))
+        db_session.commit()
+        return user
+
+    def _expected_order(self, db_session: Session, user_id: int):
+        calculations = (
+            db_session.query(Calculation).filter(Calculation.user_id == user_id).all()
+        )
+        calculations.sort(key=lambda c: (c.created_at, c.id), reverse=True)
+        return [c.id for c in calculations]
+
+    def test_pages_cover_history_once_in_order(self, db_session: Session, history):
+        """Test that following cursors returns every row once, newest first"""
+        seen, cursor, pages = [], None, 0
+        while True:
+            items, cursor = get_user_calculations_page(
+                db_session, history.id, limit=3, cursor=cursor
+            )
+            seen.extend(item.id for item in items)
+            pages += 1
+            if cursor is None:
+                break
+
+        assert pages == 3
+        assert seen == self._expected_order(db_session, history.id)
+
+    def test_history_endpoint(self, client, db_session: Session, history):
+        """Test paging through the history endpoint"""
+        first = client.get(f"/users/{history.id}/calculations", params={"limit": 5})
+        assert first.status_code == 200
+        body = first.json()
+        assert len(body["items"]) == 5
+        assert body["next_cursor"] is not None
+
+        second = client.get(
+            f"/users/{history.id}/calculations",
+            params={"limit": 5, "cursor": body["next_cursor"]},
+        ).json()
+        assert second["next_cursor"] is None
+        ids = [item["id"] for item in body["items"] + second["items"]]
+        assert ids == self._expected_order(db_session, history.id)
+
+    def test_history_endpoint_errors(self, client, history):
+        """Test unknown users and malformed cursors"""
+        assert client.get("/users/999999/calculations").status_code == 404
+        response = client.get(
+            f"/users/{history.id}/calculations", params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    def test_history_query_uses_composite_index(self, db_session: Session, history):
+        """Test that a deep page is an index range scan, not a table scan"""
+        _, cursor = get_user_calculations_page(db_session, history.id, limit=2)
+        query = (
+            select(Calculation.id)
+            .where(Calculation.user_id == history.id)
+            .where(
+                tuple_(type_coerce(Calculation.created_at, String), Calculation.id)
+                < tuple_(*decode_history_cursor(db_session, cursor))
+            )
+            .order_by(Calculation.created_at.desc(), Calculation.id.desc())
+        )
+        compiled = query.compile(
+            db_session.get_bind(), compile_kwargs={"literal_binds": True}
+        )
+        plan = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_calculations_user_id_created_at_id" in details
+        assert "TEMP B-TREE" not in details
+
+
+class TestListCalculations:
+    """Test eager loading of Calculation.user when listing calculations."""
+
+    @pytest.fixture
+    def owned_calculations(self, db_session: Session, make_users):
+        """Six calculations spread over three users"""
+        users = make_users(3, prefix="owner")
+        db_session.execute(
+            insert(Calculation),
+            [
+                {"a": float(n), "b": 1.0, "type": "Add", "user_id": users[n % 3].id}
+                for n in range(6)
+            ],
+        )
+        db_session.commit()
+        db_session.expire_all()
+        return users
+
+    def test_owners_joined_in_one_query(
+        self, db_session: Session, owned_calculations, query_budget
+    ):
+        """Test that calculations and their owners come from one statement."""
+        with query_budget(1):
+            calculations = list_calculations(db_session, with_owner=True)
+            owners = [calc.user.username for calc in calculations]
+
+        assert owners == ["owner0", "owner1", "owner2"] * 2
+
+    def test_filter_by_user(self, db_session: Session, owned_calculations):
+        """Test that user_id restricts the listing."""
+        calculations = list_calculations(db_session, user_id=owned_calculations[1].id)
+
+        assert [calc.a for calc in calculations] == [1.0, 4.0]
+
+    def test_lazy_access_raises_without_eager_loading(
+        self, db_session: Session, owned_calculations
+    ):
+        """Test that an accidental per-row owner load fails loudly."""
+        calculations = list_calculations(db_session, limit=1)
+
+        with pytest.raises(InvalidRequestError):
+            calculations[0].user
+
+    def test_history_page_is_one_query(
+        self, db_session: Session, owned_calculations, query_budget
+    ):
+        """Test that a history page costs a single statement."""
+        user_id = owned_calculations[0].id
+        with query_budget(1):
+            items, _ = get_user_calculations_page(db_session, user_id, limit=10)
+
+        assert len(items) == 2
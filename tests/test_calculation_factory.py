@@ -1,6 +1,14 @@
+import math
+import multiprocessing
+
+import numpy as np
 import pytest
 
-from app.services.calculation_factory import CalculationFactory
+from app.schemas.calculation_schemas import CalculationType
+from app.services.calculation_factory import (
+    BatchCalculationResult,
+    CalculationFactory,
+)
 
 
 class TestCalculationFactory:
@@ -73,3 +81,286 @@ class TestCalculationFactory:
 
         result = CalculationFactory.calculate(-10, -2, "Divide")
         assert result == 5
+
+    def test_register_operation(self):
+        """Test that a registered operation is dispatched by every path"""
+
+        class ModuloOperation:
+            def calculate(self, a, b):
+                return a % b
+
+            def calculate_batch(self, a, b):
+                return BatchCalculationResult(
+                    np.mod(a, b), np.zeros(a.shape, dtype=bool)
+                )
+
+        CalculationFactory.register_operation("Modulo", ModuloOperation())
+        try:
+            assert CalculationFactory.is_operation_supported("Modulo")
+            assert CalculationFactory.calculate(7, 3, "Modulo") == 1
+            batch = CalculationFactory.calculate_batch([7, 8], [3, 3], ["Modulo"] * 2)
+            assert batch.results.tolist() == [1.0, 2.0]
+        finally:
+            CalculationFactory._operations.pop("Modulo")
+
+
+class TestCalculationFactoryBatch:
+    """Test cases for vectorized batch calculations"""
+
+    def test_batch_mixed_operations(self):
+        """Test a batch containing every operation type"""
+        batch = CalculationFactory.calculate_batch(
+            [5, 5, 5, 6], [3, 3, 3, 3], ["Add", "Sub", "Multiply", "Divide"]
+        )
+        np.testing.assert_array_equal(batch.results, [8.0, 2.0, 15.0, 2.0])
+        assert not batch.errors.any()
+
+    def test_batch_matches_scalar_calculate(self):
+        """Test that batch results agree with the per-row factory path"""
+        rng = np.random.default_rng(0)
+        a = rng.uniform(-100, 100, 1000)
+        b = rng.uniform(1, 100, 1000)
+        types = rng.choice(CalculationFactory.get_supported_operations(), 1000)
+
+        batch = CalculationFactory.calculate_batch(a, b, types)
+
+        expected = [
+            CalculationFactory.calculate(x, y, str(t)) for x, y, t in zip(a, b, types)
+        ]
+        np.testing.assert_allclose(batch.results, expected)
+
+    def test_batch_division_by_zero_is_masked(self):
+        """Test that division by zero marks the row instead of raising"""
+        batch = CalculationFactory.calculate_batch(
+            [10, 10, 10], [2, 0, 0], ["Divide", "Divide", "Add"]
+        )
+        assert batch.errors.tolist() == [False, True, False]
+        assert batch.results[0] == 5.0
+        assert np.isnan(batch.results[1])
+        assert batch.results[2] == 10.0
+
+    def test_batch_accepts_enum_types(self):
+        """Test that CalculationType members are accepted as type values"""
+        batch = CalculationFactory.calculate_batch(
+            [1, 4], [2, 2], [CalculationType.ADD, CalculationType.MULTIPLY]
+        )
+        np.testing.assert_array_equal(batch.results, [3.0, 8.0])
+
+    def test_batch_accepts_enum_object_array(self):
+        """Test that an object-dtype array of CalculationType members works"""
+        types = np.array([CalculationType.DIVIDE, CalculationType.ADD], dtype=object)
+        batch = CalculationFactory.calculate_batch([1, 4], [2, 2], types)
+        np.testing.assert_array_equal(batch.results, [0.5, 6.0])
+
+    def test_batch_invalid_operation_type(self):
+        """Test that an unsupported type in the batch raises error"""
+        with pytest.raises(ValueError, match="Unsupported operation type"):
+            CalculationFactory.calculate_batch([1], [2], ["Power"])
+
+    def test_batch_length_mismatch(self):
+        """Test that columns of different lengths are rejected"""
+        with pytest.raises(ValueError, match="equal length"):
+            CalculationFactory.calculate_batch([1, 2], [2], ["Add", "Add"])
+
+    def test_batch_empty(self):
+        """Test that an empty batch returns empty columns"""
+        batch = CalculationFactory.calculate_batch([], [], [])
+        assert batch.results.size == 0
+        assert batch.errors.size == 0
+
+
+class TestCalculationFactoryCache:
+    """Test cases for the optional LRU result cache"""
+
+    @pytest.fixture(autouse=True)
+    def cache(self):
+        """Enable a small cache for the duration of each test"""
+        CalculationFactory.configure_cache(2)
+        yield
+        CalculationFactory.configure_cache(0)
+
+    def test_cache_disabled_by_default(self):
+        """Test that configuring size 0 disables the cache"""
+        CalculationFactory.configure_cache(0)
+        assert CalculationFactory.cache_info() is None
+        assert CalculationFactory.calculate(1, 2, "Add") == 3
+
+    def test_cache_hits_and_misses(self):
+        """Test that repeated lookups are counted as hits"""
+        assert CalculationFactory.calculate(5, 3, "Add") == 8
+        assert CalculationFactory.calculate(5, 3, "Add") == 8
+        assert CalculationFactory.calculate(5, 3, "Sub") == 2
+
+        info = CalculationFactory.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+        assert info.hit_rate == pytest.approx(1 / 3)
+
+    def test_cache_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        CalculationFactory.calculate(1, 1, "Add")
+        CalculationFactory.calculate(2, 2, "Add")
+        CalculationFactory.calculate(1, 1, "Add")  # refresh 1+1
+        CalculationFactory.calculate(3, 3, "Add")  # evicts 2+2
+
+        info = CalculationFactory.cache_info()
+        assert info.evictions == 1
+        CalculationFactory.calculate(1, 1, "Add")
+        assert CalculationFactory.cache_info().hits == info.hits + 1
+
+    def test_cache_division_by_zero(self):
+        """Test that cached division errors are raised again on a hit"""
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Division by zero is not allowed"):
+                CalculationFactory.calculate(5, 0, "Divide")
+        assert CalculationFactory.cache_info().hits == 1
+
+    def test_cache_negative_zero(self):
+        """Test that -0.0 and 0.0 are cached separately"""
+        assert math.copysign(1.0, CalculationFactory.calculate(0.0, 0.0, "Add")) > 0
+        result = CalculationFactory.calculate(-0.0, -0.0, "Add")
+        assert math.copysign(1.0, result) < 0
+
+    def test_cache_nan_operands(self):
+        """Test that NaN operands share one cache entry"""
+        assert math.isnan(CalculationFactory.calculate(float("nan"), 1, "Add"))
+        assert math.isnan(CalculationFactory.calculate(float("nan"), 1, "Add"))
+        assert CalculationFactory.cache_info().hits == 1
+
+    def test_cache_invalid_operation_not_cached(self):
+        """Test that unsupported types still raise and are not cached"""
+        with pytest.raises(ValueError, match="Unsupported operation type"):
+            CalculationFactory.calculate(1, 2, "Power")
+        assert CalculationFactory.cache_info().currsize == 0
+
+    def test_clear_cache(self):
+        """Test that clearing the cache resets entries and counters"""
+        CalculationFactory.calculate(1, 2, "Add")
+        CalculationFactory.clear_cache()
+        assert CalculationFactory.cache_info().currsize == 0
+        assert CalculationFactory.cache_info().misses == 0
+
+
+def _calculate_in_worker(path, a, b, operation_type):
+    """Compute through a fresh shared cache, as another uvicorn worker would"""
+    CalculationFactory.configure_cache(0)
+    CalculationFactory.configure_shared_cache(path, 100)
+    CalculationFactory.register_operation(
+        operation_type, CalculationFactory.get_operation(operation_type), True
+    )
+    result = CalculationFactory.calculate(a, b, operation_type)
+    return result, tuple(CalculationFactory.shared_cache_info())
+
+
+class TestCalculationFactorySharedCache:
+    """Test cases for the result cache shared between processes"""
+
+    @pytest.fixture
+    def shared_path(self, tmp_path, monkeypatch):
+        """Enable a small shared cache in a temporary file for each test"""
+        # Opt the built-in operations in, as an expensive operation would be
+        monkeypatch.setattr(
+            CalculationFactory, "_shared_operations", {"Add", "Multiply", "Divide"}
+        )
+        path = str(tmp_path / "results.db")
+        CalculationFactory.configure_shared_cache(path, 4)
+        yield path
+        CalculationFactory.configure_shared_cache(None, 0)
+
+    def test_shared_cache_disabled_without_path(self):
+        """Test that no path or size 0 disables the shared cache"""
+        CalculationFactory.configure_shared_cache(None, 100)
+        assert CalculationFactory.shared_cache_info() is None
+        assert CalculationFactory.calculate(1, 2, "Add") == 3
+
+    def test_hit_from_another_cache_instance(self, shared_path):
+        """Test that results stored through one connection are seen by another"""
+        assert CalculationFactory.calculate(5, 3, "Multiply") == 15
+
+        CalculationFactory.configure_shared_cache(shared_path, 4)
+        assert CalculationFactory.calculate(5, 3, "Multiply") == 15
+        info = CalculationFactory.shared_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 0, 1)
+
+    def test_hit_from_another_process(self, shared_path):
+        """Test that a result computed here is not recomputed by another worker"""
+        CalculationFactory.calculate(7, 2, "Divide")
+
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            result, info = pool.apply(
+                _calculate_in_worker, (shared_path, 7, 2, "Divide")
+            )
+
+        assert result == 3.5
+        hits, misses = info[0], info[1]
+        assert (hits, misses) == (1, 0)
+
+    def test_in_process_cache_checked_first(self, shared_path):
+        """Test that the LRU cache serves repeats without touching the file"""
+        CalculationFactory.configure_cache(8)
+        try:
+            CalculationFactory.calculate(1, 1, "Add")
+            CalculationFactory.calculate(1, 1, "Add")
+        finally:
+            CalculationFactory.configure_cache(0)
+
+        info = CalculationFactory.shared_cache_info()
+        assert (info.hits, info.misses) == (0, 1)
+
+    def test_errors_and_special_values_round_trip(self, shared_path):
+        """Test that errors, NaN, infinity and -0.0 survive the file"""
+        CalculationFactory.calculate(float("nan"), 1, "Add")
+        CalculationFactory.calculate(float("inf"), 1, "Add")
+        CalculationFactory.calculate(-0.0, -0.0, "Add")
+        with pytest.raises(ValueError):
+            CalculationFactory.calculate(5, 0, "Divide")
+
+        # A fresh instance has no in-memory state, so every value is read back
+        CalculationFactory.configure_shared_cache(shared_path, 4)
+        assert math.isnan(CalculationFactory.calculate(float("nan"), 1, "Add"))
+        assert CalculationFactory.calculate(float("inf"), 1, "Add") == float("inf")
+        negative_zero = CalculationFactory.calculate(-0.0, -0.0, "Add")
+        assert math.copysign(1.0, negative_zero) < 0
+        with pytest.raises(ValueError, match="Division by zero is not allowed"):
+            CalculationFactory.calculate(5, 0, "Divide")
+        assert CalculationFactory.shared_cache_info().hits == 4
+
+    def test_eviction_keeps_size_bounded(self, shared_path):
+        """Test that the least recently used entries are trimmed beyond maxsize"""
+        cache = CalculationFactory._shared_cache
+        cache.check_interval = 1
+        for a in range(6):
+            CalculationFactory.calculate(a, 1, "Add")
+
+        info = CalculationFactory.shared_cache_info()
+        assert info.currsize == 4
+        assert info.evictions == 2
+        # The two oldest results were the ones dropped
+        assert cache.get(("Add", 0.0, 1.0)) is None
+        assert cache.get(("Add", 5.0, 1.0)) == (True, 6.0)
+
+    def test_operations_opt_in(self, shared_path, monkeypatch):
+        """Test that only opted-in operations touch the shared cache"""
+        monkeypatch.setattr(CalculationFactory, "_shared_operations", set())
+        CalculationFactory.calculate(1, 2, "Add")
+        assert CalculationFactory.shared_cache_info().misses == 0
+
+        CalculationFactory.register_operation(
+            "Add", CalculationFactory.get_operation("Add"), shared_cache=True
+        )
+        CalculationFactory.calculate(1, 2, "Add")
+        assert CalculationFactory.shared_cache_info().misses == 1
+
+    def test_register_keeps_shared_entries(self, shared_path):
+        """Test that registering an operation does not wipe other workers' cache"""
+        CalculationFactory.calculate(1, 2, "Add")
+        CalculationFactory.register_operation(
+            "Add", CalculationFactory.get_operation("Add"), shared_cache=True
+        )
+        assert CalculationFactory.shared_cache_info().currsize == 1
+
+    def test_clear_cache_clears_shared_entries(self, shared_path):
+        """Test that clear_cache empties the shared file too"""
+        CalculationFactory.calculate(1, 2, "Add")
+        CalculationFactory.clear_cache()
+        assert CalculationFactory.shared_cache_info().currsize == 0
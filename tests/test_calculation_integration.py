@@ -80,6 +80,14 @@ class TestCalculationIntegration:
         with pytest.raises(ValueError, match="Unsupported operation type"):
             calc.calculate_result()
 
+    def test_calculation_model_uses_factory_registry(self, db_session: Session):
+        """Test that the model dispatches every factory operation"""
+        for calc_type in CalculationFactory.get_supported_operations():
+            calc = Calculation(a=9.0, b=3.0, type=calc_type)
+            assert calc.calculate_result() == CalculationFactory.calculate(
+                9.0, 3.0, calc_type
+            )
+
     def test_multiple_calculations_per_user(self, db_session: Session):
         """Test multiple calculations for same user"""
         # Create user
@@ -0,0 +1,214 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import TestingSessionLocal
+from app.models.calculation_model import Calculation
+from app.models.calculation_stats_model import UserCalculationStats
+from app.services.backfill_service import backfill_null_results
+from app.services.calculation_service import create_calculations_bulk
+from app.services.calculation_stats import (
+    get_user_calculation_stats,
+    rebuild_user_calculation_stats,
+)
+
+
+def _utc(value):
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _stats(db: Session):
+    """Maintained stats as comparable tuples keyed by (user_id, type)"""
+    db.expire_all()
+    return {
+        (row.user_id, row.type): (
+            row.count,
+            pytest.approx(row.result_sum),
+            row.result_min,
+            row.result_max,
+            _utc(row.last_calculated_at),
+        )
+        for row in db.scalars(select(UserCalculationStats))
+    }
+
+
+def _group_by(db: Session):
+    """The full aggregate the stats table replaces"""
+    query = (
+        select(
+            Calculation.user_id,
+            Calculation.type,
+            func.count(),
+            func.sum(Calculation.result),
+            func.min(Calculation.result),
+            func.max(Calculation.result),
+            func.max(Calculation.created_at),
+        )
+        .where(Calculation.user_id.is_not(None), Calculation.result.is_not(None))
+        .group_by(Calculation.user_id, Calculation.type)
+    )
+    return {
+        (user_id, type_): (count, total, low, high, _utc(last))
+        for user_id, type_, count, total, low, high, last in db.execute(query)
+    }
+
+
+@pytest.fixture
+def users(make_users):
+    return make_users(2, prefix="statsuser")
+
+
+def _add(db: Session, user, a, b, type_, **kwargs):
+    calculation = Calculation(a=a, b=b, type=type_, user_id=user.id, **kwargs)
+    calculation.result = calculation.calculate_result()
+    db.add(calculation)
+    return calculation
+
+
+class TestIncrementalStats:
+    """Test that ORM writes keep user_calculation_stats in step"""
+
+    def test_inserts(self, db_session: Session, users):
+        """Test that inserted calculations are aggregated per user and type"""
+        alice, bob = users
+        _add(db_session, alice, 1, 2, "Add")
+        _add(db_session, alice, 10, 20, "Add")
+        _add(db_session, alice, 3, 4, "Multiply")
+        _add(db_session, bob, 9, 3, "Divide")
+        db_session.add(Calculation(a=1, b=1, type="Add", user_id=alice.id))
+        db_session.add(Calculation(a=1, b=1, type="Add", result=2.0))
+        db_session.commit()
+
+        stats = _stats(db_session)
+        assert stats == _group_by(db_session)
+        assert stats[(alice.id, "Add")][:4] == (2, 33.0, 3.0, 30.0)
+
+    def test_updates_and_deletes(self, db_session: Session, users):
+        """Test changes of result, type and owner, and deletes"""
+        alice, bob = users
+        low = _add(db_session, alice, 1, 1, "Add")
+        mid = _add(db_session, alice, 5, 5, "Add")
+        high = _add(db_session, alice, 50, 50, "Add")
+        db_session.commit()
+
+        mid.a, mid.result = 6, 11.0  # not an extreme: adjusted in place
+        db_session.commit()
+        assert _stats(db_session) == _group_by(db_session)
+
+        high.result = 1.0  # the old max must be recomputed
+        db_session.commit()
+        assert _stats(db_session) == _group_by(db_session)
+
+        low.type = "Multiply"
+        mid.user_id = bob.id
+        db_session.commit()
+        assert _stats(db_session) == _group_by(db_session)
+
+        db_session.delete(high)
+        db_session.commit()
+        stats = _stats(db_session)
+        assert stats == _group_by(db_session)
+        assert (alice.id, "Add") not in stats
+
+    def test_updates_on_expired_instances(self, db_session: Session, users):
+        """Test that old values are loaded for instances expired by commit"""
+        alice, _ = users
+        calculation = _add(db_session, alice, 2, 3, "Add")
+        db_session.commit()
+
+        calculation.result = 7.0
+        db_session.commit()
+
+        assert _stats(db_session)[(alice.id, "Add")][:4] == (1, 7.0, 7.0, 7.0)
+
+    def test_rollback_discards_stats(self, db_session: Session, users):
+        """Test that stats are written in the calculation's transaction"""
+        alice, _ = users
+        _add(db_session, alice, 2, 3, "Add")
+        db_session.flush()
+        db_session.rollback()
+
+        assert _stats(db_session) == {}
+
+    def test_stats_read_does_not_aggregate(self, db_session: Session, users):
+        """Test that reading stats selects only the stats table"""
+        alice, _ = users
+        _add(db_session, alice, 2, 3, "Add")
+        db_session.commit()
+
+        rows = get_user_calculation_stats(db_session, alice.id)
+
+        assert [(row.type, row.count, row.result_sum) for row in rows] == [
+            ("Add", 1, 5.0)
+        ]
+
+
+class TestBulkStats:
+    """Test explicit stats deltas on paths that bypass the ORM"""
+
+    def test_bulk_create(self, db_session: Session, users):
+        """Test that batched Core inserts update the stats"""
+        alice, _ = users
+        create_calculations_bulk(
+            db_session,
+            [{"a": i, "b": 2, "type": "Multiply"} for i in range(5)],
+            user_id=alice.id,
+        )
+
+        stats = _stats(db_session)
+        assert stats.keys() == _group_by(db_session).keys()
+        assert stats[(alice.id, "Multiply")][:4] == (5, 20.0, 0.0, 8.0)
+
+    def test_backfill(self, db_session: Session, users):
+        """Test that backfilled results are added to the stats"""
+        alice, _ = users
+        for i in range(4):
+            db_session.add(Calculation(a=i, b=1, type="Add", user_id=alice.id))
+        db_session.commit()
+        assert _stats(db_session) == {}
+
+        backfill_null_results(TestingSessionLocal, chunk_size=3)
+
+        assert _stats(db_session) == _group_by(db_session)
+
+    def test_rebuild(self, db_session: Session, users):
+        """Test a full rebuild from the calculations table"""
+        alice, bob = users
+        _add(db_session, alice, 1, 2, "Add")
+        _add(db_session, bob, 1, 2, "Sub")
+        db_session.commit()
+        db_session.query(UserCalculationStats).delete()
+        db_session.commit()
+
+        rebuild_user_calculation_stats(db_session, alice.id)
+        db_session.commit()
+        assert set(_stats(db_session)) == {(alice.id, "Add")}
+
+        rebuild_user_calculation_stats(db_session)
+        db_session.commit()
+        assert _stats(db_session) == _group_by(db_session)
+
+
+class TestStatsEndpoint:
+    """Test the per-user stats endpoint"""
+
+    def test_stats_endpoint(self, client, db_session: Session, users):
+        """Test that stats are returned per operation type"""
+        alice, _ = users
+        _add(db_session, alice, 1, 2, "Add", created_at=datetime(2024, 5, 1))
+        _add(db_session, alice, 4, 2, "Divide")
+        db_session.commit()
+
+        response = client.get(f"/users/{alice.id}/calculations/stats")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [item["type"] for item in body] == ["Add", "Divide"]
+        assert body[0]["count"] == 1
+        assert body[0]["result_sum"] == 3.0
+        assert body[0]["last_calculated_at"].startswith("2024-05-01")
+        assert client.get("/users/999999/calculations/stats").status_code == 404
@@ -0,0 +1,244 @@
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - register every table on Base.metadata
+from app.config import settings
+from app.database import (
+    Base,
+    InstrumentedQueuePool,
+    RoutingSession,
+    configure_sqlite,
+    engine_options,
+    pool_metrics,
+    replica_reads,
+    sqlite_pragmas,
+    to_async_url,
+)
+from app.models.calculation_model import Calculation
+from app.models.user_model import User
+from app.schemas.user_schemas import UserCreate
+from app.services import user_service
+from app.services.calculation_service import get_user_calculations_page
+from app.services.calculation_stats import get_user_calculation_stats
+
+
+class TestPoolConfiguration:
+    """Test cases for engine pool options built from settings"""
+
+    def test_engine_options_use_settings(self, monkeypatch):
+        """Test that pool settings are passed through to the engine"""
+        monkeypatch.setattr(settings, "db_pool_size", 7)
+        monkeypatch.setattr(settings, "db_echo", False)
+
+        options = engine_options("postgresql://user:pw@localhost/db")
+
+        assert options["pool_size"] == 7
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["echo"] is False
+
+    def test_engine_options_in_memory_sqlite(self):
+        """Test that in-memory SQLite keeps its single-connection pool"""
+        assert "pool_size" not in engine_options("sqlite://")
+
+
+def _pragma(connection, name):
+    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+class TestSQLiteProfile:
+    """Test cases for the SQLite connection pragmas"""
+
+    def test_profile_applied_to_new_connections(self, tmp_path, monkeypatch):
+        """Test that every pragma of the profile is set on connect"""
+        monkeypatch.setattr(settings, "sqlite_cache_size_kib", 32768)
+        engine = create_engine(f"sqlite:///{tmp_path}/profile.db")
+        try:
+            assert configure_sqlite(engine)
+            with engine.connect() as connection:
+                assert _pragma(connection, "journal_mode") == "wal"
+                assert _pragma(connection, "synchronous") == 1  # NORMAL
+                assert _pragma(connection, "busy_timeout") == 5000
+                assert _pragma(connection, "mmap_size") == settings.sqlite_mmap_size
+                assert _pragma(connection, "cache_size") == -32768
+                assert _pragma(connection, "temp_store") == 2  # MEMORY
+        finally:
+            engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_profile_applied_to_async_engine(self, tmp_path):
+        """Test that aiosqlite connections get the profile too"""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/profile.db")
+        try:
+            assert configure_sqlite(engine)
+            async with engine.connect() as connection:
+                result = await connection.exec_driver_sql("PRAGMA journal_mode")
+                assert result.scalar() == "wal"
+                result = await connection.exec_driver_sql("PRAGMA busy_timeout")
+                assert result.scalar() == 5000
+        finally:
+            await engine.dispose()
+
+    def test_profile_disabled(self, tmp_path, monkeypatch):
+        """Test that SQLITE_PROFILE=false leaves SQLite defaults alone"""
+        monkeypatch.setattr(settings, "sqlite_profile", False)
+        engine = create_engine(f"sqlite:///{tmp_path}/plain.db")
+        try:
+            assert not configure_sqlite(engine)
+            with engine.connect() as connection:
+                assert _pragma(connection, "journal_mode") == "delete"
+        finally:
+            engine.dispose()
+
+    def test_other_databases_untouched(self):
+        """Test that non-SQLite engines are not given SQLite pragmas"""
+        engine = create_engine("postgresql://user:pw@localhost/db")
+
+        assert not configure_sqlite(engine)
+        assert sqlite_pragmas()["journal_mode"] == "WAL"
+
+
+class TestPoolMetrics:
+    """Test cases for connection pool instrumentation"""
+
+    def test_pool_metrics_track_checkouts_and_timeouts(self, tmp_path):
+        """Test that an exhausted pool reports occupancy and timeouts"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path}/pool.db",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        with engine.connect() as held:
+            held.execute(text("select 1"))
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+            metrics = pool_metrics(engine)
+            assert metrics["checked_out"] == 1
+            assert metrics["checkouts"] == 1
+            assert metrics["checkout_timeouts"] == 1
+            assert metrics["max_wait_ms"] >= 50
+
+        assert pool_metrics(engine)["checked_out"] == 0
+        engine.dispose()
+
+    def test_pool_metrics_uninstrumented_engine(self):
+        """Test that engines without the instrumented pool report None"""
+        assert pool_metrics(create_engine("sqlite://")) is None
+
+    def test_pool_metrics_endpoint(self, client):
+        """Test the pool metrics endpoint"""
+        response = client.get("/metrics/db-pool")
+
+        assert response.status_code == 200
+        assert set(response.json()) == {"sync", "async"}
+
+
+@pytest.fixture
+def primary_and_replica(tmp_path, monkeypatch):
+    """Two SQLite databases standing in for a primary and a lagging replica"""
+    monkeypatch.setattr(user_service, "user_cache", None)
+    engines = []
+    for name in ("primary", "replica"):
+        url = f"sqlite:///{tmp_path}/{name}.db"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        engines.append(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+def _add_user(engine, username):
+    with engine.begin() as connection:
+        return connection.execute(
+            insert(User).returning(User.id),
+            {"username": username, "email": f"{username}@x.com", "password_hash": "x"},
+        ).scalar_one()
+
+
+class TestReadReplicaRouting:
+    """Test routing of read-only service calls to a read replica"""
+
+    def test_service_reads_use_replica(self, primary_and_replica):
+        """Test that lookups, history and stats read from the replica"""
+        primary, replica = primary_and_replica
+        user_id = _add_user(replica, "onreplica")
+        with replica.begin() as connection:
+            connection.execute(
+                insert(Calculation),
+                {"a": 1, "b": 2, "type": "Add", "result": 3, "user_id": user_id},
+            )
+        Session = sessionmaker(
+            class_=RoutingSession, bind=primary, replica_bind=replica
+        )
+
+        with Session() as db:
+            assert user_service.get_user_by_username(db, "onreplica").id == user_id
+            items, _ = get_user_calculations_page(db, user_id)
+            assert [item.result for item in items] == [3.0]
+            assert get_user_calculation_stats(db, user_id) == []
+            # Reads outside replica_reads stay on the primary
+            assert db.scalar(select(User).where(User.username == "onreplica")) is None
+
+    def test_reads_follow_writes_to_primary(self, primary_and_replica):
+        """Test that a session reads its own writes after writing"""
+        primary, replica = primary_and_replica
+        Session = sessionmaker(
+            class_=RoutingSession, bind=primary, replica_bind=replica
+        )
+
+        with Session() as db:
+            user_service.create_user(
+                db,
+                UserCreate(username="fresh", email="f@x.com", password="Password123!"),
+            )
+            assert user_service.get_user_by_username(db, "fresh") is not None
+
+        with Session() as db:
+            # A new request reads the replica, which has not caught up
+            assert user_service.get_user_by_username(db, "fresh") is None
+
+    def test_locking_reads_and_unconfigured_replica_use_primary(
+        self, primary_and_replica
+    ):
+        """Test that FOR UPDATE reads and replica-less sessions hit the primary"""
+        primary, replica = primary_and_replica
+        _add_user(primary, "onprimary")
+        query = select(User).where(User.username == "onprimary")
+
+        with sessionmaker(class_=RoutingSession, bind=primary)() as db:
+            with replica_reads(db):
+                assert db.scalar(query) is not None
+        routed = sessionmaker(class_=RoutingSession, bind=primary, replica_bind=replica)
+        with routed() as db:
+            with replica_reads(db):
+                assert db.scalar(query) is None
+                assert db.scalar(query.with_for_update()) is not None
+                # The locking read pins the rest of the session to the primary
+                assert db.scalar(query) is not None
+
+    @pytest.mark.asyncio
+    async def test_async_reads_use_replica(self, primary_and_replica):
+        """Test routing through an AsyncSession"""
+        primary, replica = primary_and_replica
+        _add_user(replica, "asyncreplica")
+        engines = [
+            create_async_engine(to_async_url(str(e.url))) for e in (primary, replica)
+        ]
+        Session = async_sessionmaker(
+            engines[0],
+            sync_session_class=RoutingSession,
+            replica_bind=engines[1].sync_engine,
+        )
+        try:
+            async with Session() as db:
+                user = await user_service.get_user_by_username_async(db, "asyncreplica")
+                assert user is not None
+        finally:
+            for engine in engines:
+                await engine.dispose()
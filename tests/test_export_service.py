@@ -0,0 +1,184 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pytest
+from sqlalchemy import event, insert
+
+from app.config import settings
+from app.database import TestingSessionLocal, test_engine
+from app.models.calculation_model import Calculation
+from app.services.archive_service import archive_calculations
+from app.services.export_service import EXPORT_SCHEMA, export_calculations
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(tmp_path, monkeypatch):
+    """Point the archive at a temporary directory"""
+    path = str(tmp_path / "archive")
+    monkeypatch.setattr(settings, "archive_dir", path)
+    return path
+
+
+@pytest.fixture
+def owners(db_session, make_users):
+    """Two users with calculations, plus one unowned calculation"""
+    users = make_users(2, prefix="exporter")
+    rows = [
+        {"a": float(i), "b": 1.0, "type": "Add", "result": i + 1.0, "user_id": user}
+        for i, user in enumerate(
+            [users[0].id, users[1].id, users[0].id, None, users[0].id]
+        )
+    ]
+    db_session.execute(insert(Calculation), rows)
+    db_session.commit()
+    return users
+
+
+def _read_csv(chunks) -> list:
+    return list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+
+
+def _read_arrow(chunks) -> pa.Table:
+    return pa.ipc.open_stream(b"".join(chunks)).read_all()
+
+
+class TestExportCalculations:
+    """Test streaming CSV and Arrow exports of the calculations table."""
+
+    def test_csv_streams_one_piece_per_chunk(self, owners):
+        """Test that rows are encoded and yielded chunk by chunk, in id order."""
+        chunks = list(export_calculations(TestingSessionLocal, "csv", chunk_size=2))
+
+        assert len(chunks) == 3
+        rows = _read_csv(chunks)
+        assert list(rows[0]) == EXPORT_SCHEMA.names
+        assert [float(row["a"]) for row in rows] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert rows[3]["user_id"] == ""
+
+    def test_filters_by_user(self, owners):
+        """Test that a user export only contains that user's rows."""
+        rows = _read_csv(
+            export_calculations(TestingSessionLocal, "csv", user_id=owners[0].id)
+        )
+
+        assert [float(row["a"]) for row in rows] == [0.0, 2.0, 4.0]
+
+    def test_arrow_round_trip(self, owners):
+        """Test that the Arrow IPC stream reads back with the export schema."""
+        table = _read_arrow(
+            export_calculations(TestingSessionLocal, "arrow", chunk_size=2)
+        )
+
+        assert table.schema == EXPORT_SCHEMA
+        assert table.num_rows == 5
+        assert table.column("result").to_pylist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert table.column("created_at").null_count == 0
+
+    def test_empty_export(self, db_session):
+        """Test that an empty table still yields a header or a schema."""
+        csv_output = b"".join(export_calculations(TestingSessionLocal, "csv"))
+        table = _read_arrow(export_calculations(TestingSessionLocal, "arrow"))
+
+        assert csv_output.decode().strip() == ",".join(EXPORT_SCHEMA.names)
+        assert table.num_rows == 0
+        assert table.schema == EXPORT_SCHEMA
+
+    def test_streams_tuples_without_orm_objects(self, owners):
+        """Test that the export uses a streaming cursor and loads no entities."""
+        loaded = []
+        options = []
+
+        def on_load(target, context):
+            loaded.append(target)
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            options.append(context.execution_options)
+
+        event.listen(Calculation, "load", on_load)
+        event.listen(test_engine, "before_cursor_execute", on_execute)
+        try:
+            list(export_calculations(TestingSessionLocal, "arrow", chunk_size=2))
+        finally:
+            event.remove(Calculation, "load", on_load)
+            event.remove(test_engine, "before_cursor_execute", on_execute)
+
+        assert loaded == []
+        assert options[-1].get("stream_results") is True
+        assert options[-1].get("yield_per") == 2
+
+    def test_includes_archived_rows(self, db_session, owners):
+        """Test that rows moved to the archive are exported before stored ones."""
+        old = datetime(2020, 1, 15, tzinfo=timezone.utc)
+        db_session.execute(
+            insert(Calculation),
+            [
+                {
+                    "a": 10.0 + i,
+                    "b": 1.0,
+                    "type": "Add",
+                    "result": 11.0 + i,
+                    "user_id": user.id,
+                    "created_at": old,
+                }
+                for i, user in enumerate(owners)
+            ],
+        )
+        db_session.commit()
+        archive_calculations(
+            TestingSessionLocal, datetime(2021, 1, 1, tzinfo=timezone.utc)
+        )
+
+        rows = _read_csv(export_calculations(TestingSessionLocal, "csv", chunk_size=2))
+        archived, stored = [10.0, 11.0], [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert [float(row["a"]) for row in rows] == archived + stored
+
+        table = _read_arrow(
+            export_calculations(TestingSessionLocal, "arrow", user_id=owners[1].id)
+        )
+        assert table.column("a").to_pylist() == [11.0, 1.0]
+        assert table.column("created_at")[0].as_py() == old
+
+    def test_unsupported_format(self):
+        """Test that an unknown format is rejected before any query runs."""
+        with pytest.raises(ValueError, match="Unsupported export format"):
+            export_calculations(TestingSessionLocal, "xlsx")
+
+
+class TestExportEndpoint:
+    """Test GET /calculations/export."""
+
+    def test_csv_download(self, client, owners):
+        """Test that the whole table is streamed as a CSV attachment."""
+        response = client.get("/calculations/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "calculations.csv" in response.headers["content-disposition"]
+        assert len(_read_csv([response.content])) == 5
+
+    def test_arrow_download_for_user(self, client, owners):
+        """Test that one user's rows are streamed as Arrow IPC."""
+        response = client.get(
+            "/calculations/export",
+            params={"format": "arrow", "user_id": owners[1].id},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == (
+            "application/vnd.apache.arrow.stream"
+        )
+        assert _read_arrow([response.content]).column("a").to_pylist() == [1.0]
+
+    def test_unknown_user(self, client, db_session):
+        """Test that exporting a missing user's rows returns 404."""
+        response = client.get("/calculations/export", params={"user_id": 999999})
+
+        assert response.status_code == 404
+
+    def test_unknown_format(self, client, db_session):
+        """Test that an unsupported format is a validation error."""
+        response = client.get("/calculations/export", params={"format": "xml"})
+
+        assert response.status_code == 422
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from app.services.expression_engine import (
+    Constant,
+    ExpressionError,
+    Operation,
+    Variable,
+    compile_expression,
+    compile_tree,
+    compiled_cache_info,
+    parse_expression,
+)
+
+
+class TestExpressionParsing:
+    """Test cases for parsing expressions into operation trees"""
+
+    def test_parse_precedence(self):
+        """Test that * and / bind tighter than + and -"""
+        tree = parse_expression("a + b * c")
+        assert tree == Operation(
+            "Add", Variable("a"), Operation("Multiply", Variable("b"), Variable("c"))
+        )
+
+    def test_parse_parentheses_and_left_associativity(self):
+        """Test grouping and left-to-right evaluation of equal precedence"""
+        tree = parse_expression("(a - b) - 2")
+        assert tree == Operation(
+            "Sub", Operation("Sub", Variable("a"), Variable("b")), Constant(2.0)
+        )
+
+    @pytest.mark.parametrize("text", ["", "a +", "(a + b", "a b", "a $ b", "*a"])
+    def test_parse_errors(self, text):
+        """Test that malformed expressions raise ExpressionError"""
+        with pytest.raises(ExpressionError):
+            parse_expression(text)
+
+
+class TestExpressionCompilation:
+    """Test cases for compiling and evaluating expressions"""
+
+    def test_evaluate(self):
+        """Test evaluating a compiled expression"""
+        program = compile_expression("(a + b) * c / d")
+        assert program.variables == ("a", "b", "c", "d")
+        assert program.evaluate({"a": 1, "b": 3, "c": 5, "d": 2}) == 10.0
+
+    def test_unary_minus(self):
+        """Test unary minus on variables and groups"""
+        program = compile_expression("-a * -(b - 1)")
+        assert program.evaluate({"a": 2, "b": 4}) == 6.0
+
+    def test_constant_folding(self):
+        """Test that constant sub-expressions are evaluated at compile time"""
+        program = compile_expression("a * (2 + 3) - 10 / 4")
+        assert len(program) == 2
+        assert program.evaluate({"a": 2}) == 7.5
+
+    def test_fully_constant_expression(self):
+        """Test that a constant expression compiles to no instructions"""
+        program = compile_expression("(1 + 2) * 3")
+        assert len(program) == 0
+        assert program.evaluate({}) == 9.0
+
+    def test_common_subexpression_elimination(self):
+        """Test that repeated sub-expressions are computed once"""
+        program = compile_expression("(a + b) * (a + b) + (a + b)")
+        assert len(program) == 3
+        assert program.evaluate({"a": 1, "b": 2}) == 12.0
+
+    def test_division_by_zero(self):
+        """Test that division by zero is raised at evaluation time"""
+        program = compile_expression("a / (b - b)")
+        with pytest.raises(ValueError, match="Division by zero is not allowed"):
+            program.evaluate({"a": 1, "b": 2})
+
+        constant = compile_expression("1 / 0")
+        with pytest.raises(ValueError, match="Division by zero is not allowed"):
+            constant.evaluate({})
+
+    def test_missing_variable(self):
+        """Test that evaluating without a variable raises ExpressionError"""
+        with pytest.raises(ExpressionError, match="b"):
+            compile_expression("a + b").evaluate({"a": 1})
+
+    def test_compiled_programs_are_cached(self):
+        """Test that the same text reuses the compiled program"""
+        before = compiled_cache_info().hits
+        first = compile_expression("x * y + 1")
+        assert compile_expression("x * y + 1") is first
+        assert compiled_cache_info().hits == before + 1
+
+    def test_long_flat_expression(self):
+        """Test that a long chain of terms compiles without recursing per term"""
+        program = compile_expression("+".join(f"x{i}" for i in range(5000)))
+        assert len(program) == 4999
+        assert program.evaluate({f"x{i}": 1 for i in range(5000)}) == 5000.0
+
+    def test_deep_nesting_is_an_expression_error(self):
+        """Test that parentheses nested past the recursion limit are rejected"""
+        with pytest.raises(ExpressionError, match="too deeply nested"):
+            compile_expression("(" * 5000 + "a" + ")" * 5000)
+
+    def test_compile_tree(self):
+        """Test compiling a hand-built tree"""
+        tree = Operation("Divide", Variable("a"), Constant(4.0))
+        assert compile_tree(tree).evaluate({"a": 2}) == 0.5
+
+
+class TestExpressionColumns:
+    """Test cases for vectorized evaluation over variable columns"""
+
+    def test_evaluate_many_matches_scalar(self):
+        """Test that column evaluation agrees with row-by-row evaluation"""
+        program = compile_expression("(a + b) * c / d - a")
+        rng = np.random.default_rng(1)
+        columns = {name: rng.uniform(1, 10, 500) for name in "abcd"}
+
+        batch = program.evaluate_many(columns)
+
+        expected = [
+            program.evaluate({name: columns[name][i] for name in "abcd"})
+            for i in range(500)
+        ]
+        np.testing.assert_allclose(batch.results, expected)
+        assert not batch.errors.any()
+
+    def test_evaluate_many_division_by_zero(self):
+        """Test that rows dividing by zero at any step are flagged"""
+        program = compile_expression("a / b + 1")
+        batch = program.evaluate_many({"a": [1, 2, 3], "b": [1, 0, 3]})
+        assert batch.errors.tolist() == [False, True, False]
+        assert np.isnan(batch.results[1])
+
+    def test_evaluate_many_length_mismatch(self):
+        """Test that columns of different lengths are rejected"""
+        program = compile_expression("a + b")
+        with pytest.raises(ExpressionError, match="equal length"):
+            program.evaluate_many({"a": [1, 2], "b": [1]})
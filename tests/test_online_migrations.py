@@ -0,0 +1,262 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from alembic import command
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from app import online_migrations
+from app.online_migrations import (
+    backfill_in_batches,
+    checkpoints,
+    clear_checkpoint,
+    create_index_online,
+    drop_index_online,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Large enough for many batches, small enough for the test suite
+SEEDED_ROWS = 50_000
+
+metadata = sa.MetaData()
+items = sa.Table(
+    "items",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("source", sa.Float, nullable=False),
+    sa.Column("target", sa.Float, nullable=True),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A scratch SQLite database"""
+    engine = sa.create_engine(f"sqlite:///{tmp_path}/online.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded(engine):
+    """A table of SEEDED_ROWS rows, every tenth id missing, to backfill"""
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            items.insert(),
+            [
+                {"id": i, "source": float(i)}
+                for i in range(1, SEEDED_ROWS + SEEDED_ROWS // 9 + 1)
+                if i % 10
+            ],
+        )
+    return engine
+
+
+def _copy_source(connection, **kwargs):
+    return backfill_in_batches(
+        connection,
+        "items_target",
+        items,
+        {"target": items.c.source * 2},
+        where=items.c.target.is_(None),
+        **kwargs,
+    )
+
+
+def _remaining(connection) -> int:
+    return connection.scalar(sa.select(sa.func.count()).where(items.c.target.is_(None)))
+
+
+class TestBackfillInBatches:
+    """Test batched, throttled and resumable backfills."""
+
+    def test_backfills_whole_table_in_batches(self, seeded):
+        """Test that every row is updated, one committed batch at a time."""
+        with seeded.connect() as connection:
+            progress = _copy_source(connection, batch_size=1000)
+
+            assert progress.finished
+            assert progress.rows == SEEDED_ROWS
+            assert progress.batches == SEEDED_ROWS // 1000
+            assert _remaining(connection) == 0
+            assert connection.scalar(sa.select(items.c.target).where(items.c.id == 7))
+            stored = connection.execute(sa.select(checkpoints)).one()
+            assert stored.finished
+
+    def test_resumes_from_checkpoint(self, seeded):
+        """Test that a stopped run continues after its last committed batch."""
+        with seeded.connect() as connection:
+            first = _copy_source(connection, batch_size=1000, max_batches=5)
+            assert not first.finished
+            assert first.rows == 5000
+            assert _remaining(connection) == SEEDED_ROWS - 5000
+
+        with seeded.connect() as connection:
+            second = _copy_source(connection, batch_size=1000)
+
+            assert second.finished
+            assert second.batches == SEEDED_ROWS // 1000 - 5
+            assert second.rows == SEEDED_ROWS - 5000
+            assert _remaining(connection) == 0
+
+    def test_interrupted_run_keeps_committed_batches(self, seeded):
+        """Test that a failure mid-run loses only the batch in flight."""
+
+        def crash(progress):
+            if progress.batches == 3:
+                raise RuntimeError("killed")
+
+        with seeded.connect() as connection:
+            with pytest.raises(RuntimeError):
+                _copy_source(connection, batch_size=1000, on_progress=crash)
+
+        with seeded.connect() as connection:
+            assert _remaining(connection) == SEEDED_ROWS - 3000
+            assert _copy_source(connection, batch_size=1000).rows == SEEDED_ROWS - 3000
+
+    def test_finished_backfill_is_skipped(self, seeded):
+        """Test that a finished backfill does nothing until it is cleared."""
+        with seeded.connect() as connection:
+            _copy_source(connection, batch_size=5000)
+            connection.execute(items.update().values(target=None))
+            connection.commit()
+
+            assert _copy_source(connection).batches == 0
+            clear_checkpoint(connection, "items_target")
+            connection.commit()
+            assert _copy_source(connection, batch_size=5000).rows == SEEDED_ROWS
+
+    def test_pauses_between_batches(self, seeded, monkeypatch):
+        """Test that the throttle sleeps after every batch."""
+        sleeps = []
+        monkeypatch.setattr(online_migrations.time, "sleep", sleeps.append)
+
+        with seeded.connect() as connection:
+            progress = _copy_source(connection, batch_size=10_000, pause_seconds=0.2)
+
+        assert sleeps == [0.2] * progress.batches
+
+    def test_empty_table(self, engine):
+        """Test that an empty table finishes immediately."""
+        metadata.create_all(engine)
+        with engine.connect() as connection:
+            progress = _copy_source(connection)
+
+        assert progress.finished
+        assert progress.batches == 0
+
+
+class TestOnlineIndexes:
+    """Test index helpers on a dialect without concurrent builds."""
+
+    def test_create_and_drop_are_idempotent(self, seeded):
+        """Test that reruns of the helpers do not fail."""
+        with seeded.begin() as connection:
+            op = Operations(MigrationContext.configure(connection))
+            for _ in range(2):
+                create_index_online(op, "ix_items_target", "items", ["target"])
+            assert "ix_items_target" in {
+                index["name"] for index in sa.inspect(connection).get_indexes("items")
+            }
+
+            for _ in range(2):
+                drop_index_online(op, "ix_items_target", "items")
+            assert sa.inspect(connection).get_indexes("items") == []
+
+
+@pytest.fixture
+def legacy_users(engine, monkeypatch):
+    """A users table at revision 004, still using hashed_password"""
+    legacy = sa.MetaData()
+    users = sa.Table(
+        "users",
+        legacy,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False, unique=True),
+        sa.Column("email", sa.String(100), nullable=False, unique=True),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("is_active", sa.Boolean),
+    )
+    legacy.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            users.insert(),
+            [
+                {
+                    "username": f"user{i}",
+                    "email": f"user{i}@example.com",
+                    "hashed_password": f"hash-{i}",
+                }
+                for i in range(SEEDED_ROWS)
+            ],
+        )
+
+    monkeypatch.setenv("DATABASE_URL", str(engine.url))
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    command.stamp(config, "004")
+    # Keep the migration's throttle from dominating the test run
+    monkeypatch.setattr(online_migrations.time, "sleep", lambda seconds: None)
+    return config
+
+
+def _columns(engine) -> dict:
+    return {
+        column["name"]: column for column in sa.inspect(engine).get_columns("users")
+    }
+
+
+class TestPasswordColumnMigration:
+    """Test revision 005 on a seeded legacy users table."""
+
+    def test_upgrade_moves_hashes_to_password_hash(self, engine, legacy_users):
+        """Test that hashes are copied and hashed_password is dropped."""
+        command.upgrade(legacy_users, "005")
+
+        columns = _columns(engine)
+        assert "hashed_password" not in columns
+        assert columns["password_hash"]["nullable"] is False
+        with engine.connect() as connection:
+            hashes = connection.execute(
+                sa.text("SELECT id, password_hash FROM users ORDER BY id")
+            ).all()
+            assert len(hashes) == SEEDED_ROWS
+            assert all(value == f"hash-{id - 1}" for id, value in hashes)
+            assert connection.execute(sa.select(checkpoints)).all() == []
+
+    def test_downgrade_restores_hashed_password(self, engine, legacy_users):
+        """Test that the migration reverses cleanly."""
+        command.upgrade(legacy_users, "005")
+        command.downgrade(legacy_users, "004")
+
+        columns = _columns(engine)
+        assert "password_hash" not in columns
+        assert columns["hashed_password"]["nullable"] is False
+        with engine.connect() as connection:
+            assert (
+                connection.scalar(
+                    sa.text(
+                        "SELECT hashed_password FROM users WHERE username = 'user5'"
+                    )
+                )
+                == "hash-5"
+            )
+
+    def test_models_schema_left_untouched(self, engine, monkeypatch):
+        """Test that a database built from the models is already migrated."""
+        import app.models  # noqa: F401 - register every table on Base.metadata
+        from app.database import Base
+
+        Base.metadata.create_all(engine)
+        monkeypatch.setenv("DATABASE_URL", str(engine.url))
+        config = Config()
+        config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+        command.stamp(config, "004")
+
+        command.upgrade(config, "head")
+
+        assert "password_hash" in _columns(engine)
+        assert "hashed_password" not in _columns(engine)
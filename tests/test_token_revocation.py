@@ -0,0 +1,222 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import TestingSessionLocal, test_engine
+from app.models.revoked_token_model import RevokedToken
+from app.services.auth_service import (
+    create_access_token,
+    flush_token_cache,
+    revoke_token,
+    token_cache_info,
+    verify_token,
+)
+from app.services.bloom_filter import BloomFilter
+from app.services.token_revocation import REFRESH_OVERLAP, TokenRevocationList
+
+credentials_exception = HTTPException(status_code=401, detail="Invalid token")
+
+
+@pytest.fixture
+def revocations(db_session):
+    """The shared revocation list, loaded from the test database"""
+    from app.services.token_revocation import revocation_list
+
+    flush_token_cache()
+    revocation_list.load(TestingSessionLocal)
+    yield revocation_list
+    revocation_list.clear()
+    flush_token_cache()
+
+
+class TestBloomFilter:
+    """Test the Bloom filter used as the revocation fast path."""
+
+    def test_no_false_negatives(self):
+        """Test that every added key is reported as present."""
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"key-{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        assert all(key in bloom for key in keys)
+        assert len(bloom) == 1000
+
+    def test_false_positive_rate_near_target(self):
+        """Test that unseen keys rarely match a filter at capacity."""
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"key-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+    def test_invalid_parameters(self):
+        """Test that impossible sizes are rejected."""
+        with pytest.raises(ValueError):
+            BloomFilter(0)
+        with pytest.raises(ValueError):
+            BloomFilter(10, 1.5)
+
+
+class TestTokenRevocationList:
+    """Test the database-backed revocation list."""
+
+    def test_unrevoked_check_skips_database(self, db_session):
+        """Test that a filter miss answers without a query."""
+        revocations = TokenRevocationList(TestingSessionLocal)
+        revocations.rebuild(db_session)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", record)
+        try:
+            assert revocations.is_revoked("never-revoked", db_session) is False
+        finally:
+            event.remove(test_engine, "before_cursor_execute", record)
+
+        assert statements == []
+        assert revocations.stats().filter_negatives == 1
+
+    def test_revoked_jti_is_confirmed_in_database(self, db_session):
+        """Test that revocations are stored and found."""
+        revocations = TokenRevocationList(TestingSessionLocal)
+        revocations.rebuild(db_session)
+
+        revocations.revoke(db_session, "abc", time.time() + 60)
+        revocations.revoke(db_session, "abc", time.time() + 60)
+
+        assert revocations.is_revoked("abc", db_session) is True
+        assert db_session.query(RevokedToken).count() == 1
+        assert revocations.stats().database_checks == 1
+
+    def test_rebuild_loads_revocations_from_other_processes(self, db_session):
+        """Test that the filter is rebuilt from the table on startup."""
+        db_session.add(RevokedToken(jti="elsewhere", expires_at=int(time.time()) + 60))
+        db_session.commit()
+        revocations = TokenRevocationList(TestingSessionLocal)
+
+        assert revocations.load(TestingSessionLocal) is True
+        assert revocations.stats().filter_size == 1
+        assert revocations.is_revoked("elsewhere") is True
+
+    def test_refresh_picks_up_revocations_from_other_workers(self, db_session):
+        """Test that a refresh adds revocations made by another process."""
+        worker_a = TokenRevocationList(TestingSessionLocal)
+        worker_b = TokenRevocationList(TestingSessionLocal)
+        worker_a.rebuild(db_session)
+        worker_b.rebuild(db_session)
+        worker_a.revoke(db_session, "first", time.time() + 60)
+
+        # Stale until worker B refreshes
+        assert worker_b.is_revoked("first") is False
+        assert worker_b.refresh() == 1
+        assert worker_b.is_revoked("first") is True
+
+        worker_a.revoke(db_session, "second", time.time() + 60)
+        worker_b.refresh()
+        assert worker_b.is_revoked("second") is True
+        assert worker_b.stats().filter_size == 2
+
+    def test_refresh_reads_only_recent_revocations(self, db_session):
+        """Test that a refresh skips rows older than its watermark."""
+        old = datetime.now(timezone.utc) - 2 * REFRESH_OVERLAP
+        expires_at = int(time.time()) + 60
+        db_session.add(RevokedToken(jti="old", expires_at=expires_at, revoked_at=old))
+        db_session.add(RevokedToken(jti="newer", expires_at=expires_at))
+        db_session.commit()
+        revocations = TokenRevocationList(TestingSessionLocal)
+        revocations.rebuild(db_session)
+        revocations.revoke(db_session, "recent", time.time() + 60)
+
+        # "newer" falls inside the overlap, "old" does not
+        assert revocations.refresh(db_session) == 2
+        assert revocations.stats().filter_size == 3
+
+    def test_unloaded_filter_falls_back_to_database(self, db_session):
+        """Test that checks stay correct before the filter is built."""
+        revocations = TokenRevocationList(TestingSessionLocal)
+        revocations.revoke(db_session, "abc", time.time() + 60)
+
+        assert revocations.loaded is False
+        assert revocations.is_revoked("abc") is True
+        assert revocations.is_revoked("xyz") is False
+
+    def test_compact_drops_expired_revocations(self, db_session):
+        """Test that expired rows are deleted and leave the filter."""
+        revocations = TokenRevocationList(TestingSessionLocal)
+        revocations.rebuild(db_session)
+        revocations.revoke(db_session, "old", time.time() - 1)
+        revocations.revoke(db_session, "current", time.time() + 60)
+
+        assert revocations.compact(db_session) == 1
+
+        assert [row.jti for row in db_session.query(RevokedToken)] == ["current"]
+        assert revocations.stats().filter_size == 1
+        assert revocations.is_revoked("current", db_session) is True
+
+
+class TestRevokeToken:
+    """Test revoking access tokens end to end."""
+
+    def test_tokens_have_unique_jti(self):
+        """Test that every token carries its own jti claim."""
+        claims = [
+            jwt.get_unverified_claims(create_access_token({"sub": "u"}))
+            for _ in range(2)
+        ]
+        assert claims[0]["jti"] != claims[1]["jti"]
+
+    def test_revoked_token_fails_verification(self, revocations, db_session):
+        """Test that a revoked token is rejected, even if already cached."""
+        token = create_access_token({"sub": "revoked"}, timedelta(minutes=5))
+        other = create_access_token({"sub": "kept"}, timedelta(minutes=5))
+        assert verify_token(token, credentials_exception, db_session) == "revoked"
+
+        assert revoke_token(db_session, token) is True
+
+        with pytest.raises(HTTPException):
+            verify_token(token, credentials_exception, db_session)
+        assert verify_token(other, credentials_exception, db_session) == "kept"
+        assert token_cache_info().currsize == 1
+
+    def test_revocation_reaches_cached_token_in_other_process(
+        self, revocations, db_session
+    ):
+        """Test that a cached token is rejected once the filter learns its jti."""
+        token = create_access_token({"sub": "cached"}, timedelta(minutes=5))
+        verify_token(token, credentials_exception, db_session)
+        claims = jwt.get_unverified_claims(token)
+        db_session.add(RevokedToken(jti=claims["jti"], expires_at=claims["exp"]))
+        db_session.commit()
+
+        revocations.rebuild(db_session)
+
+        with pytest.raises(HTTPException):
+            verify_token(token, credentials_exception, db_session)
+
+    def test_expired_token_needs_no_revocation(self, revocations, db_session):
+        """Test that revoking an expired token stores nothing."""
+        token = create_access_token({"sub": "old"}, timedelta(seconds=-1))
+
+        assert revoke_token(db_session, token) is False
+        assert db_session.query(RevokedToken).count() == 0
+
+    def test_token_without_jti_cannot_be_revoked(self, revocations, db_session):
+        """Test that legacy tokens are rejected by revoke_token."""
+        token = jwt.encode(
+            {"sub": "legacy", "exp": int(time.time()) + 60},
+            settings.secret_key,
+            algorithm=settings.algorithm,
+        )
+
+        with pytest.raises(ValueError):
+            revoke_token(db_session, token)
+        assert verify_token(token, credentials_exception, db_session) == "legacy"
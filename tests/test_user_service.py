@@ -1,12 +1,32 @@
+import time
+
 import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app import cli
+from app.database import TestingSessionLocal
+from app.models.calculation_model import Calculation
+from app.models.user_model import User
 from app.schemas.user_schemas import UserCreate
+from app.services import cache as cache_module
+from app.services.auth_service import get_bcrypt_rounds, set_bcrypt_rounds
+from app.services.user_cache import user_cache
 from app.services.user_service import (
     authenticate_user,
+    authenticate_user_async,
     create_user,
+    create_user_async,
+    create_users_bulk,
     get_user_by_email,
+    get_user_by_email_async,
+    get_user_by_id,
+    get_user_by_id_async,
     get_user_by_username,
+    get_user_by_username_async,
+    list_users,
 )
 
 
@@ -103,6 +123,29 @@ class TestUserService:
         assert authenticated_user is not None
         assert authenticated_user.username == "testuser"
 
+    def test_authenticate_user_rehashes_outdated_cost(self, db_session: Session):
+        """Test that login upgrades a hash made with an old bcrypt cost."""
+        original = get_bcrypt_rounds()
+        try:
+            set_bcrypt_rounds(4)
+            user = create_user(
+                db_session,
+                UserCreate(
+                    username="testuser",
+                    email="test@example.com",
+                    password="Password123!",
+                ),
+            )
+            set_bcrypt_rounds(5)
+
+            authenticate_user(db_session, "testuser", "Password123!")
+
+            db_session.refresh(user)
+            assert user.password_hash.startswith("$2b$05$")
+            assert authenticate_user(db_session, "testuser", "Password123!")
+        finally:
+            set_bcrypt_rounds(original)
+
     def test_authenticate_user_wrong_password(self, db_session: Session):
         """Test user authentication with wrong password."""
         user_data = UserCreate(
@@ -120,3 +163,295 @@ class TestUserService:
             db_session, "nonexistent", "Password123!"
         )
         assert authenticated_user is None
+
+
+class TestAsyncUserService:
+    """Test async counterparts of the user CRUD operations."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_get_user_async(self, async_db_session: AsyncSession):
+        """Test creating a user and reading it back by every key."""
+        user_data = UserCreate(
+            username="asyncuser", email="async@example.com", password="Password123!"
+        )
+
+        user = await create_user_async(async_db_session, user_data)
+
+        assert user.id is not None
+        assert user.password_hash != "Password123!"
+        by_name = await get_user_by_username_async(async_db_session, "asyncuser")
+        by_email = await get_user_by_email_async(async_db_session, "async@example.com")
+        by_id = await get_user_by_id_async(async_db_session, user.id)
+        assert by_name.id == by_email.id == by_id.id == user.id
+
+    @pytest.mark.asyncio
+    async def test_create_user_async_duplicate(self, async_db_session: AsyncSession):
+        """Test async user creation with duplicate username."""
+        await create_user_async(
+            async_db_session,
+            UserCreate(username="dup", email="a@example.com", password="Password123!"),
+        )
+
+        with pytest.raises(ValueError, match="Username already exists"):
+            await create_user_async(
+                async_db_session,
+                UserCreate(
+                    username="dup", email="b@example.com", password="Password123!"
+                ),
+            )
+
+    @pytest.mark.asyncio
+    async def test_authenticate_user_async(self, async_db_session: AsyncSession):
+        """Test async authentication with right and wrong passwords."""
+        await create_user_async(
+            async_db_session,
+            UserCreate(
+                username="asyncauth", email="auth@example.com", password="Password123!"
+            ),
+        )
+
+        user = await authenticate_user_async(
+            async_db_session, "asyncauth", "Password123!"
+        )
+        assert user is not None
+        assert (
+            await authenticate_user_async(async_db_session, "asyncauth", "Wrong123!")
+            is None
+        )
+        assert (
+            await authenticate_user_async(async_db_session, "nobody", "Password123!")
+            is None
+        )
+
+
+class TestUserCache:
+    """Test the TTL user cache behind the lookup services."""
+
+    def _create(self, db_session: Session):
+        return create_user(
+            db_session,
+            UserCreate(
+                username="cached", email="cached@example.com", password="Password123!"
+            ),
+        )
+
+    def test_repeat_lookups_skip_the_database(self, db_session: Session, query_budget):
+        """Test that one load serves lookups by id, username and email."""
+        created = self._create(db_session)
+
+        with query_budget(1):
+            first = get_user_by_username(db_session, "cached")
+            assert get_user_by_username(db_session, "cached") is first
+            assert get_user_by_email(db_session, "cached@example.com").id == created.id
+            assert get_user_by_id(db_session, created.id).username == "cached"
+
+    def test_cache_hit_in_new_session(self, db_session: Session, query_budget):
+        """Test that a hit returns a user attached to the caller's session."""
+        self._create(db_session)
+        get_user_by_username(db_session, "cached")
+
+        other = TestingSessionLocal()
+        try:
+            with query_budget(0):
+                user = get_user_by_username(other, "cached")
+                assert user in other
+                assert user.email == "cached@example.com"
+        finally:
+            other.close()
+
+    def test_update_invalidates_cache(self, db_session: Session):
+        """Test that an ORM update evicts the cached row."""
+        user = self._create(db_session)
+        get_user_by_email(db_session, "cached@example.com")
+
+        user.email = "changed@example.com"
+        user.is_active = False
+        db_session.commit()
+
+        assert get_user_by_email(db_session, "cached@example.com") is None
+        assert get_user_by_username(db_session, "cached").is_active is False
+
+    def test_hit_keeps_unflushed_changes(self, db_session: Session):
+        """Test that a hit returns the session's own instance unchanged."""
+        created = self._create(db_session)
+        get_user_by_username(db_session, "cached")
+        user = get_user_by_id(db_session, created.id)
+        user.is_active = False
+
+        assert get_user_by_username(db_session, "cached") is user
+        assert user.is_active is False
+        assert user in db_session.dirty
+        db_session.commit()
+        db_session.expire_all()
+        assert get_user_by_id(db_session, created.id).is_active is False
+
+    @pytest.mark.asyncio
+    async def test_async_hit_keeps_unflushed_changes(self, async_db_session):
+        """Test the same for async sessions."""
+        created = await create_user_async(
+            async_db_session,
+            UserCreate(
+                username="cached", email="cached@example.com", password="Password123!"
+            ),
+        )
+        await get_user_by_username_async(async_db_session, "cached")
+        user = await get_user_by_id_async(async_db_session, created.id)
+        user.is_active = False
+
+        assert await get_user_by_username_async(async_db_session, "cached") is user
+        assert user.is_active is False
+
+    def test_cache_entries_expire(self, db_session: Session, query_budget, monkeypatch):
+        """Test that entries older than the TTL are reloaded."""
+        self._create(db_session)
+        get_user_by_username(db_session, "cached")
+
+        later = time.time() + user_cache.ttl + 1
+        monkeypatch.setattr(cache_module.time, "time", lambda: later)
+
+        with query_budget(1) as statements:
+            assert get_user_by_username(db_session, "cached") is not None
+        assert len(statements) == 1
+
+
+class TestBulkUserImport:
+    """Test bulk user creation."""
+
+    def test_bulk_import_creates_users(self, db_session: Session):
+        """Test that valid records are hashed and inserted across batches."""
+        records = [
+            {
+                "username": f"bulk{i}",
+                "email": f"bulk{i}@example.com",
+                "password": "Password123!",
+            }
+            for i in range(7)
+        ]
+
+        results = create_users_bulk(db_session, records, batch_size=3)
+
+        assert [r.status for r in results] == ["created"] * 7
+        assert db_session.query(User).count() == 7
+        user = authenticate_user(db_session, "bulk5", "Password123!")
+        assert user is not None
+        assert user.id == results[5].id
+
+    def test_bulk_import_reports_conflicts_and_invalid_rows(self, db_session: Session):
+        """Test per-row errors for duplicates and validation failures."""
+        create_user(
+            db_session,
+            UserCreate(
+                username="existing",
+                email="existing@example.com",
+                password="Password123!",
+            ),
+        )
+        records = [
+            {
+                "username": "existing",
+                "email": "new@example.com",
+                "password": "Password123!",
+            },
+            {
+                "username": "fresh",
+                "email": "existing@example.com",
+                "password": "Password123!",
+            },
+            {
+                "username": "twice",
+                "email": "twice1@example.com",
+                "password": "Password123!",
+            },
+            {
+                "username": "twice",
+                "email": "twice2@example.com",
+                "password": "Password123!",
+            },
+            {"username": "weak", "email": "weak@example.com", "password": "short"},
+            {
+                "username": "okay",
+                "email": "okay@example.com",
+                "password": "Password123!",
+            },
+        ]
+
+        results = create_users_bulk(db_session, records)
+
+        assert [r.status for r in results] == [
+            "error",
+            "error",
+            "created",
+            "error",
+            "error",
+            "created",
+        ]
+        assert results[0].error == "Username already exists"
+        assert results[1].error == "Email already exists"
+        assert results[3].error == "Username already exists"
+        assert "at least 8 characters" in results[4].error
+        assert db_session.query(User).count() == 3
+
+    def test_import_users_cli(self, db_session: Session, tmp_path, monkeypatch, capsys):
+        """Test the import-users command with a CSV file."""
+        path = tmp_path / "users.csv"
+        path.write_text(
+            "username,email,password\n"
+            "csvuser1,csv1@example.com,Password123!\n"
+            "csvuser2,csv2@example.com,Password123!\n"
+        )
+        monkeypatch.setattr(cli, "SessionLocal", TestingSessionLocal)
+
+        assert cli.main(["import-users", str(path), "--workers", "2"]) == 0
+
+        assert "done: created=2 failed=0" in capsys.readouterr().out
+        assert db_session.query(User).count() == 2
+
+
+@pytest.fixture
+def users_with_calculations(db_session, make_users):
+    """Five users with three calculations each"""
+    users = make_users(5, prefix="lister")
+    db_session.execute(
+        insert(Calculation),
+        [
+            {"a": float(n), "b": 1.0, "type": "Add", "result": n + 1.0, "user_id": u.id}
+            for u in users
+            for n in range(3)
+        ],
+    )
+    db_session.commit()
+    db_session.expire_all()
+    return users
+
+
+class TestListUsers:
+    """Test eager loading of User.calculations when listing users."""
+
+    def test_calculations_loaded_in_one_extra_query(
+        self, db_session, users_with_calculations, query_budget
+    ):
+        """Test that a page of users and their calculations costs two queries."""
+        with query_budget(2):
+            users = list_users(db_session, with_calculations=True)
+            counts = [len(user.calculations) for user in users]
+
+        assert counts == [3] * 5
+
+    def test_lazy_access_raises_without_eager_loading(
+        self, db_session, users_with_calculations
+    ):
+        """Test that an accidental per-row load fails loudly."""
+        users = list_users(db_session, limit=2)
+
+        assert [user.username for user in users] == ["lister0", "lister1"]
+        with pytest.raises(InvalidRequestError):
+            users[0].calculations
+
+    def test_budget_catches_n_plus_one(
+        self, db_session, users_with_calculations, query_budget
+    ):
+        """Test that default lazy loading over a listing exceeds the budget."""
+        with pytest.raises(pytest.fail.Exception, match="6 SQL statements"):
+            with query_budget(2):
+                for user in db_session.scalars(select(User)):
+                    user.calculations
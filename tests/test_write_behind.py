@@ -0,0 +1,268 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.database import TestingSessionLocal
+from app.models.calculation_model import Calculation
+from app.models.calculation_stats_model import UserCalculationStats
+from app.services.write_behind import (
+    WriteBehindBuffer,
+    WriteBehindFullError,
+    calculation_buffer,
+)
+
+
+def _row(a: float, user_id=None) -> dict:
+    return {"a": a, "b": 1.0, "type": "Add", "result": a + 1.0, "user_id": user_id}
+
+
+async def _eventually(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def owner(make_users):
+    """A user that buffered calculations can belong to"""
+    return make_users(prefix="buffered")[0]
+
+
+class TestWriteBehindBuffer:
+    """Test batching, flushing and backpressure of the write-behind buffer."""
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_max_rows_reached(self, db_session):
+        """Test that a full batch is written without waiting for the interval."""
+        buffer = WriteBehindBuffer(
+            TestingSessionLocal, max_rows=3, flush_interval_ms=10000
+        )
+        buffer.start()
+        try:
+            for a in range(3):
+                await buffer.enqueue(_row(a))
+
+            assert await _eventually(lambda: buffer.stats().flushed == 3)
+            assert buffer.stats().batches == 1
+            assert db_session.query(Calculation).count() == 3
+        finally:
+            await buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_flushes_partial_batch_after_interval(self, db_session):
+        """Test that rows below max_rows are written once the interval passes."""
+        buffer = WriteBehindBuffer(
+            TestingSessionLocal, max_rows=1000, flush_interval_ms=20
+        )
+        buffer.start()
+        try:
+            await buffer.enqueue(_row(1))
+            await buffer.enqueue(_row(2))
+
+            assert await _eventually(lambda: buffer.stats().flushed == 2)
+            assert buffer.stats().batches == 1
+            results = {c.result for c in db_session.query(Calculation)}
+            assert results == {2.0, 3.0}
+        finally:
+            await buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_queued_rows(self, db_session):
+        """Test that stop writes every queued row before returning."""
+        buffer = WriteBehindBuffer(
+            TestingSessionLocal, max_rows=2, flush_interval_ms=10000
+        )
+        buffer.start()
+        for a in range(5):
+            await buffer.enqueue(_row(a))
+
+        await buffer.stop()
+
+        assert not buffer.running
+        assert buffer.stats().flushed == 5
+        assert db_session.query(Calculation).count() == 5
+        with pytest.raises(RuntimeError, match="not running"):
+            await buffer.enqueue(_row(6))
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_applies_backpressure(self, db_session):
+        """Test that enqueue waits for room and fails after its timeout."""
+        gate = threading.Event()
+
+        def slow_session():
+            gate.wait(5)
+            return TestingSessionLocal()
+
+        buffer = WriteBehindBuffer(
+            slow_session,
+            max_rows=1,
+            flush_interval_ms=10,
+            max_pending=2,
+            enqueue_timeout=0.05,
+        )
+        buffer.start()
+        try:
+            await buffer.enqueue(_row(1))
+            # The flusher takes the first row and blocks writing it
+            assert await _eventually(lambda: buffer.stats().pending == 0)
+            await buffer.enqueue(_row(2))
+            await buffer.enqueue(_row(3))
+
+            with pytest.raises(WriteBehindFullError):
+                await buffer.enqueue(_row(4))
+        finally:
+            gate.set()
+            await buffer.stop()
+
+        assert buffer.stats().flushed == 3
+        assert db_session.query(Calculation).count() == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_counted(self, db_session):
+        """Test that a batch the database rejects is reported and dropped."""
+
+        def broken_session():
+            raise RuntimeError("database unavailable")
+
+        buffer = WriteBehindBuffer(broken_session, max_rows=2, flush_interval_ms=10)
+        buffer.start()
+        await buffer.enqueue(_row(1))
+        await buffer.enqueue(_row(2))
+        await buffer.stop()
+
+        stats = buffer.stats()
+        assert stats.flushed == 0
+        assert stats.failed_rows == 2
+        assert stats.last_error == "database unavailable"
+
+    @pytest.mark.asyncio
+    async def test_bad_row_only_loses_itself(self, db_session, owner):
+        """Test that a constraint violation drops the bad row, not its batch."""
+        buffer = WriteBehindBuffer(
+            TestingSessionLocal, max_rows=8, flush_interval_ms=10000
+        )
+        buffer.start()
+        for a in range(8):
+            row = _row(a, owner.id)
+            if a == 5:
+                row["b"] = None  # violates NOT NULL
+            await buffer.enqueue(row)
+        await buffer.stop()
+
+        stats = buffer.stats()
+        assert (stats.flushed, stats.failed_rows) == (7, 1)
+        assert "NOT NULL" in stats.last_error
+        stored = sorted(c.a for c in db_session.query(Calculation))
+        assert stored == [0, 1, 2, 3, 4, 6, 7]
+        assert db_session.get(UserCalculationStats, (owner.id, "Add")).count == 7
+
+    @pytest.mark.asyncio
+    async def test_flushed_rows_update_user_stats(self, db_session, owner):
+        """Test that batched inserts are folded into the per-user stats."""
+        buffer = WriteBehindBuffer(TestingSessionLocal, flush_interval_ms=10)
+        buffer.start()
+        await buffer.enqueue(_row(1, owner.id))
+        await buffer.enqueue(_row(4, owner.id))
+        await buffer.stop()
+
+        stats = db_session.get(UserCalculationStats, (owner.id, "Add"))
+        assert stats.count == 2
+        assert stats.result_sum == 7.0
+        assert stats.result_max == 5.0
+
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    """Start the shared buffer with the app and flush it quickly"""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "write_behind_enabled", True)
+    monkeypatch.setattr(calculation_buffer, "flush_interval_ms", 10)
+    yield calculation_buffer
+
+
+class TestCreateCalculationEndpoint:
+    """Test POST /calculations with and without write-behind."""
+
+    def test_stores_synchronously_by_default(self, client, db_session, owner):
+        """Test that the calculation is stored before the response is sent."""
+        response = client.post(
+            "/calculations",
+            params={"user_id": owner.id},
+            json={"a": 6, "b": 3, "type": "Divide"},
+        )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["result"] == 2.0
+        assert data["queued"] is False
+        stored = db_session.get(Calculation, data["id"])
+        assert stored.result == 2.0
+        assert stored.user_id == owner.id
+
+    def test_queues_in_write_behind_mode(self, write_behind, client, db_session):
+        """Test that the response returns before the row is written."""
+        response = client.post("/calculations", json={"a": 2, "b": 5, "type": "Add"})
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["queued"] is True
+        assert data["id"] is None
+        assert data["result"] == 7.0
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if client.get("/metrics/write-behind").json()["flushed"] >= 1:
+                break
+            time.sleep(0.01)
+        db_session.expire_all()
+        assert db_session.query(Calculation).one().result == 7.0
+
+    def test_unknown_user_is_rejected(self, write_behind, client):
+        """Test that a row that would break its batch is refused up front."""
+        response = client.post(
+            "/calculations",
+            params={"user_id": 999999},
+            json={"a": 1, "b": 1, "type": "Add"},
+        )
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"a": "inf", "b": "-inf", "type": "Add"},
+            {"a": 1e308, "b": 10, "type": "Multiply"},
+        ],
+    )
+    def test_non_finite_result_is_rejected(
+        self, write_behind, client, db_session, payload
+    ):
+        """Test that NaN or infinite values are refused before being queued."""
+        enqueued = client.get("/metrics/write-behind").json()["enqueued"]
+        response = client.post("/calculations", json=payload)
+
+        assert response.status_code == 422
+        assert client.get("/metrics/write-behind").json()["enqueued"] == enqueued
+        assert db_session.query(Calculation).count() == 0
+
+    def test_non_finite_result_is_not_stored(self, client, db_session):
+        """Test that the synchronous path refuses NaN results the same way."""
+        response = client.post(
+            "/calculations", json={"a": "inf", "b": "-inf", "type": "Add"}
+        )
+
+        assert response.status_code == 422
+        assert response.json()["detail"] == "Operands must be finite numbers"
+        assert db_session.query(Calculation).count() == 0
+
+    def test_invalid_calculation_is_rejected(self, client):
+        """Test that schema validation still applies."""
+        response = client.post("/calculations", json={"a": 1, "b": 0, "type": "Divide"})
+
+        assert response.status_code == 422